@@ -0,0 +1,162 @@
+"""
+Fixtures of realistic size for the hot-path micro-benchmarks.
+
+Sizes follow what Nova sees on a large customer repo: a 2,000-line module
+patched in 40 places, a test run of 5,000 tests with 250 failures, a
+5,000-file source tree, and traces of a few thousand events.
+"""
+
+import difflib
+import json
+import sys
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+SOURCE_LINES = 2000
+HUNKS = 40
+TESTS = 5000
+FAILURES = 250
+REPO_PACKAGES = 50
+REPO_MODULES_PER_PACKAGE = 100  # 5,000 files
+
+
+def _module_source(lines: int) -> str:
+    out = []
+    for i in range(lines // 5):
+        out.append(f"def function_{i}(value):\n")
+        out.append(f'    """Compute result {i}."""\n')
+        out.append(f"    total = value * {i} + {i % 7}\n")
+        out.append("    return total\n")
+        out.append("\n")
+    return "".join(out)
+
+
+def _fixed_source(source: str) -> str:
+    lines = source.splitlines(keepends=True)
+    step = len(lines) // HUNKS
+    for i in range(0, len(lines), step):
+        if "total =" in lines[i + 2]:
+            lines[i + 2] = lines[i + 2].replace("* ", "+ ")
+    return "".join(lines)
+
+
+@pytest.fixture(scope="session")
+def large_source():
+    """(original, fixed) contents of a 2,000-line module."""
+    source = _module_source(SOURCE_LINES)
+    return source, _fixed_source(source)
+
+
+@pytest.fixture(scope="session")
+def large_diff(large_source):
+    """A unified diff touching the module in 40 places."""
+    original, fixed = large_source
+    return "".join(
+        difflib.unified_diff(
+            original.splitlines(keepends=True),
+            fixed.splitlines(keepends=True),
+            fromfile="a/src/module.py",
+            tofile="b/src/module.py",
+        )
+    )
+
+
+@pytest.fixture(scope="session")
+def llm_diff(large_diff):
+    """The same diff the way an LLM often returns it: fenced, with a trailing %."""
+    return "```diff\n" + large_diff + "```%"
+
+
+def _longrepr(i: int) -> str:
+    frames = "".join(
+        f"src/pkg_{i % 50}/module_{i % 100}.py:{10 + j}: in function_{j}\n"
+        f"    total = value * {j}\n"
+        for j in range(15)
+    )
+    return frames + f"E       AssertionError: assert {i} == {i + 1}\n"
+
+
+@pytest.fixture(scope="session")
+def json_report(tmp_path_factory):
+    """pytest-json-report output for 5,000 tests with 250 failures."""
+    tests = []
+    for i in range(TESTS):
+        nodeid = f"tests/test_module_{i % 200}.py::TestCase{i % 10}::test_case_{i}"
+        if i % (TESTS // FAILURES) == 0:
+            tests.append(
+                {
+                    "nodeid": nodeid,
+                    "outcome": "failed",
+                    "call": {"outcome": "failed", "longrepr": _longrepr(i)},
+                }
+            )
+        else:
+            tests.append({"nodeid": nodeid, "outcome": "passed"})
+    path = tmp_path_factory.mktemp("reports") / "report.json"
+    path.write_text(json.dumps({"tests": tests, "collectors": []}))
+    return path
+
+
+@pytest.fixture(scope="session")
+def junit_report(tmp_path_factory):
+    """JUnit XML for 5,000 tests with 250 failures."""
+    cases = []
+    for i in range(TESTS):
+        attrs = f'classname="tests.test_module_{i % 200}" name="test_case_{i}"'
+        if i % (TESTS // FAILURES) == 0:
+            cases.append(
+                f'<testcase {attrs}><failure message="assert {i} == {i + 1}">'
+                f"{escape(_longrepr(i))}</failure></testcase>"
+            )
+        else:
+            cases.append(f"<testcase {attrs}/>")
+    xml = (
+        '<?xml version="1.0" encoding="utf-8"?><testsuites>'
+        f'<testsuite name="pytest" tests="{TESTS}">{"".join(cases)}</testsuite>'
+        "</testsuites>"
+    )
+    path = tmp_path_factory.mktemp("reports") / "report.xml"
+    path.write_text(xml)
+    return path
+
+
+@pytest.fixture(scope="session")
+def trace_payload():
+    """An event payload the size of a large planner call: prompts plus metadata."""
+    return {
+        "prompt": _module_source(400) + "Authorization: Bearer sk-live-abc123\n",
+        "messages": [
+            {"role": "user", "content": _longrepr(i)} for i in range(FAILURES // 3)
+        ],
+        "failing_tests": [
+            {"name": f"test_case_{i}", "file": f"tests/test_{i}.py", "line": i}
+            for i in range(FAILURES)
+        ],
+    }
+
+
+@pytest.fixture(scope="session")
+def synthetic_repo(tmp_path_factory):
+    """A 5,000-file source tree plus a test importing ten of its modules."""
+    root = tmp_path_factory.mktemp("repo")
+    for p in range(REPO_PACKAGES):
+        package = root / "src" / f"pkg_{p}"
+        package.mkdir(parents=True)
+        (package / "__init__.py").write_text("")
+        for m in range(REPO_MODULES_PER_PACKAGE - 1):
+            (package / f"module_{p}_{m}.py").write_text(f"VALUE = {m}\n")
+    imports = "".join(
+        f"from pkg_{p}.module_{p}_{p} import VALUE as V{p}\n" for p in range(10)
+    )
+    (root / "tests").mkdir()
+    test_file = root / "tests" / "test_values.py"
+    test_file.write_text(
+        "import pytest\n" + imports + "\ndef test_values():\n    assert V1 == 1\n"
+    )
+    return root, test_file
@@ -0,0 +1,93 @@
+"""
+Micro-benchmarks for Nova's hot paths.
+
+Run with ``make bench`` (needs pytest-benchmark). ``make bench-baseline``
+stores a baseline under .benchmarks/; ``make bench`` then fails when a
+median regresses by more than 20%.
+"""
+
+import io
+
+from nova.agent.llm_agent_enhanced import EnhancedLLMAgent
+from nova.agent.llm_client_fixed import convert_full_file_to_patch
+from nova.config import NovaSettings
+from nova.runner.test_runner import TestRunner
+from nova.telemetry.logger import JSONLLogger, redact_secrets
+from nova.tools.fs import _build_content_from_hunks
+from nova.tools.patch_fixer import fix_patch_format, validate_patch
+
+TRACE_EVENTS = 1000
+
+
+def test_build_content_from_hunks(benchmark, large_source, large_diff):
+    from unidiff import PatchSet
+
+    original, fixed = large_source
+    patched_file = PatchSet(io.StringIO(large_diff))[0]
+    prev = original.encode("utf-8")
+
+    result = benchmark(_build_content_from_hunks, prev, patched_file)
+    assert result.decode("utf-8") == fixed
+
+
+def test_fix_patch_format(benchmark, llm_diff):
+    result = benchmark(fix_patch_format, llm_diff)
+    assert "@@" in result
+
+
+def test_validate_patch(benchmark, large_diff):
+    valid, _ = benchmark(validate_patch, large_diff)
+    assert valid
+
+
+def test_convert_full_file_to_patch(benchmark, tmp_path, large_source):
+    original, fixed = large_source
+    (tmp_path / "module.py").write_text(original)
+
+    patch = benchmark(convert_full_file_to_patch, "module.py", fixed, tmp_path)
+    assert patch.startswith("--- a/module.py")
+
+
+def test_parse_json_report(benchmark, json_report):
+    runner = TestRunner(json_report.parent)
+    failures = benchmark(runner._parse_json_report, str(json_report))
+    assert len(failures) == 250
+
+
+def test_parse_junit_report(benchmark, junit_report):
+    runner = TestRunner(junit_report.parent)
+    failures = benchmark(runner._parse_junit_report, str(junit_report))
+    assert len(failures) == 250
+
+
+def test_redact_secrets(benchmark, trace_payload):
+    secrets = ["sk-live-abc123", "ghp_exampletoken0123456789", None]
+    redacted = benchmark(redact_secrets, trace_payload, secrets)
+    assert "sk-live-abc123" not in redacted["prompt"]
+
+
+def test_find_source_files_from_test(benchmark, synthetic_repo):
+    root, test_file = synthetic_repo
+    agent = EnhancedLLMAgent.__new__(EnhancedLLMAgent)
+    agent.repo_path = root
+
+    sources = benchmark(agent.find_source_files_from_test, test_file)
+    assert "src/pkg_3/module_3_3.py" in sources
+
+
+def test_jsonl_logger_throughput(benchmark, tmp_path, trace_payload):
+    """Log 1,000 events and wait until they are on disk."""
+    settings = NovaSettings(telemetry_dir=str(tmp_path), openai_api_key="sk-bench")
+    logger = JSONLLogger(settings)
+    logger.start_run(tmp_path)
+    event = {"failing_tests": trace_payload["failing_tests"][:20], "phase": "actor"}
+
+    def log_events():
+        for i in range(TRACE_EVENTS):
+            logger.log_event("tick", dict(event, i=i))
+        logger.flush()
+
+    try:
+        benchmark(log_events)
+    finally:
+        logger.end_run(True)
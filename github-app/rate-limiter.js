@@ -0,0 +1,398 @@
+import fs from 'fs';
+import net from 'net';
+import path from 'path';
+
+/**
+ * Token-bucket rate limiter with pluggable storage.
+ *
+ * Each key (an installation or a repository) has a bucket holding up to
+ * `burst` tokens that refills at `perMinute` tokens per minute. A request
+ * takes one token from every bucket it is checked against, and only if all of
+ * them have one, so a request denied by its repo bucket costs its
+ * installation nothing.
+ *
+ * Stores:
+ * - MemoryStore: per process; resets on restart
+ * - FileStore: JSON file on the Fly volume; survives deploys on one machine
+ * - RedisStore: any Redis-compatible server; shared by every replica. Buckets
+ *   are updated by a Lua script, so concurrent replicas never double-spend.
+ */
+
+function refill(bucket, limit, now) {
+  const ratePerMs = limit.perMinute / 60000;
+  const elapsed = Math.max(0, now - bucket.updatedAt);
+  return {
+    tokens: Math.min(limit.burst, bucket.tokens + elapsed * ratePerMs),
+    updatedAt: now,
+  };
+}
+
+/**
+ * Take one token from each of `checks` ([{ key, limit }]) if every bucket has
+ * one. Returns the updated buckets and `{ allowed, denied, retryAfterMs }`,
+ * where `denied` is the index of the first bucket that was empty.
+ */
+function takeFromBuckets(stored, checks, now) {
+  const buckets = checks.map(({ limit }, i) =>
+    refill(stored[i] || { tokens: limit.burst, updatedAt: now }, limit, now)
+  );
+  const denied = buckets.findIndex((bucket) => bucket.tokens < 1);
+  if (denied === -1) {
+    buckets.forEach((bucket) => { bucket.tokens -= 1; });
+    return { buckets, result: { allowed: true, denied: -1, retryAfterMs: 0 } };
+  }
+  const ratePerMs = checks[denied].limit.perMinute / 60000;
+  const retryAfterMs = Math.ceil((1 - buckets[denied].tokens) / ratePerMs);
+  return { buckets, result: { allowed: false, denied, retryAfterMs } };
+}
+
+export class MemoryStore {
+  constructor() {
+    this.name = 'memory';
+    this.buckets = new Map();
+  }
+
+  async takeAll(checks, now = Date.now()) {
+    const { buckets, result } = takeFromBuckets(
+      checks.map(({ key }) => this.buckets.get(key)), checks, now
+    );
+    checks.forEach(({ key }, i) => this.buckets.set(key, buckets[i]));
+    return result;
+  }
+
+  async size() {
+    return this.buckets.size;
+  }
+}
+
+export class FileStore {
+  constructor(file, { lockTimeoutMs = 2000, maxIdleMs = 24 * 60 * 60 * 1000 } = {}) {
+    this.name = 'file';
+    this.file = file;
+    this.lockFile = `${file}.lock`;
+    this.lockTimeoutMs = lockTimeoutMs;
+    this.maxIdleMs = maxIdleMs;
+  }
+
+  // Cross-process lock (several app processes may share a volume). A lock older
+  // than the timeout belongs to a process that died holding it and is broken.
+  async withLock(fn) {
+    fs.mkdirSync(path.dirname(this.file), { recursive: true });
+    for (;;) {
+      try {
+        fs.closeSync(fs.openSync(this.lockFile, 'wx'));
+        break;
+      } catch (error) {
+        if (error.code !== 'EEXIST') throw error;
+      }
+      let stale = false;
+      try {
+        stale = Date.now() - fs.statSync(this.lockFile).mtimeMs > this.lockTimeoutMs;
+      } catch {
+        continue; // released between our open and stat
+      }
+      if (stale) {
+        fs.rmSync(this.lockFile, { force: true });
+        continue;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 5));
+    }
+    try {
+      return fn();
+    } finally {
+      fs.rmSync(this.lockFile, { force: true });
+    }
+  }
+
+  read() {
+    try {
+      return JSON.parse(fs.readFileSync(this.file, 'utf8'));
+    } catch {
+      return {};
+    }
+  }
+
+  write(buckets) {
+    const tmp = `${this.file}.${process.pid}.tmp`;
+    fs.writeFileSync(tmp, JSON.stringify(buckets));
+    fs.renameSync(tmp, this.file);
+  }
+
+  async takeAll(checks, now = Date.now()) {
+    return this.withLock(() => {
+      const stored = this.read();
+      const { buckets, result } = takeFromBuckets(
+        checks.map(({ key }) => stored[key]), checks, now
+      );
+      checks.forEach(({ key }, i) => { stored[key] = buckets[i]; });
+      for (const [other, state] of Object.entries(stored)) {
+        if (now - state.updatedAt > this.maxIdleMs) delete stored[other];
+      }
+      this.write(stored);
+      return result;
+    });
+  }
+
+  async size() {
+    return Object.keys(this.read()).length;
+  }
+}
+
+// KEYS: buckets; ARGV: now (ms), then burst, perMinute, ttl (ms) per key.
+// Takes a token from every bucket only if all have one. Returns {allowed, denied index (0 = none), retryAfterMs}
+const TAKE_SCRIPT = `
+local now = tonumber(ARGV[1])
+local tokens = {}
+local denied = 0
+local retry = 0
+for i, key in ipairs(KEYS) do
+  local burst = tonumber(ARGV[i * 3 - 1])
+  local rate = tonumber(ARGV[i * 3]) / 60000
+  local state = redis.call('HMGET', key, 'tokens', 'updated_at')
+  local t = tonumber(state[1]) or burst
+  local updated = tonumber(state[2]) or now
+  t = math.min(burst, t + math.max(0, now - updated) * rate)
+  tokens[i] = t
+  if t < 1 and denied == 0 then
+    denied = i
+    retry = math.ceil((1 - t) / rate)
+  end
+end
+for i, key in ipairs(KEYS) do
+  local t = tokens[i]
+  if denied == 0 then t = t - 1 end
+  redis.call('HSET', key, 'tokens', tostring(t), 'updated_at', tostring(now))
+  redis.call('PEXPIRE', key, ARGV[i * 3 + 1])
+end
+if denied == 0 then return {1, 0, 0} end
+return {0, denied, retry}
+`;
+
+function encodeCommand(args) {
+  let out = `*${args.length}\r\n`;
+  for (const arg of args) {
+    const value = String(arg);
+    out += `$${Buffer.byteLength(value)}\r\n${value}\r\n`;
+  }
+  return out;
+}
+
+// Parse one RESP reply from buf at offset; returns [value, nextOffset] or null if incomplete
+function parseReply(buf, offset) {
+  const end = buf.indexOf('\r\n', offset);
+  if (end === -1) return null;
+  const type = String.fromCharCode(buf[offset]);
+  const line = buf.toString('utf8', offset + 1, end);
+  const next = end + 2;
+  if (type === '+') return [line, next];
+  if (type === '-') return [new Error(line), next];
+  if (type === ':') return [parseInt(line, 10), next];
+  if (type === '$') {
+    const len = parseInt(line, 10);
+    if (len === -1) return [null, next];
+    if (buf.length < next + len + 2) return null;
+    return [buf.toString('utf8', next, next + len), next + len + 2];
+  }
+  if (type === '*') {
+    const count = parseInt(line, 10);
+    if (count === -1) return [null, next];
+    const items = [];
+    let pos = next;
+    for (let i = 0; i < count; i++) {
+      const parsed = parseReply(buf, pos);
+      if (!parsed) return null;
+      items.push(parsed[0]);
+      pos = parsed[1];
+    }
+    return [items, pos];
+  }
+  throw new Error(`Unexpected Redis reply type ${type}`);
+}
+
+export class RedisStore {
+  constructor(url, { prefix = 'nova:ratelimit:', timeoutMs = 1000 } = {}) {
+    this.name = 'redis';
+    this.url = new URL(url);
+    this.prefix = prefix;
+    this.timeoutMs = timeoutMs;
+    this.socket = null;
+    this.pending = [];
+    this.buffer = Buffer.alloc(0);
+  }
+
+  connect() {
+    if (this.socket) return;
+    const socket = net.createConnection({
+      host: this.url.hostname || '127.0.0.1',
+      port: parseInt(this.url.port || '6379', 10),
+    });
+    socket.setNoDelay(true);
+    socket.on('data', (chunk) => {
+      this.buffer = Buffer.concat([this.buffer, chunk]);
+      let parsed;
+      while (this.pending.length && (parsed = parseReply(this.buffer, 0))) {
+        this.buffer = this.buffer.subarray(parsed[1]);
+        const { resolve, reject, timer } = this.pending.shift();
+        clearTimeout(timer);
+        parsed[0] instanceof Error ? reject(parsed[0]) : resolve(parsed[0]);
+      }
+    });
+    const fail = (error) => {
+      if (this.socket !== socket) return; // an older connection closing late
+      for (const { reject, timer } of this.pending.splice(0)) {
+        clearTimeout(timer);
+        reject(error || new Error('Redis connection closed'));
+      }
+      this.socket = null;
+      this.buffer = Buffer.alloc(0);
+    };
+    socket.on('error', fail);
+    socket.on('close', () => fail());
+    this.socket = socket;
+    if (this.url.password) {
+      const auth = this.url.username
+        ? ['AUTH', decodeURIComponent(this.url.username), decodeURIComponent(this.url.password)]
+        : ['AUTH', decodeURIComponent(this.url.password)];
+      this.command(auth).catch(() => {});
+    }
+  }
+
+  command(args) {
+    this.connect();
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        // A reply that never comes would desync the pipeline; start over
+        this.socket?.destroy(new Error('Redis command timed out'));
+      }, this.timeoutMs);
+      this.pending.push({ resolve, reject, timer });
+      this.socket.write(encodeCommand(args));
+    });
+  }
+
+  async takeAll(checks, now = Date.now()) {
+    const keys = checks.map(({ key }) => this.prefix + key);
+    const args = [now];
+    for (const { limit } of checks) {
+      const ttlMs = Math.ceil((limit.burst / limit.perMinute) * 60000) + 60000;
+      args.push(limit.burst, limit.perMinute, ttlMs);
+    }
+    const [allowed, denied, retryAfterMs] = await this.command([
+      'EVAL', TAKE_SCRIPT, keys.length, ...keys, ...args,
+    ]);
+    return { allowed: allowed === 1, denied: denied - 1, retryAfterMs };
+  }
+
+  async size() {
+    return null; // counting would need a SCAN over a shared keyspace
+  }
+
+  close() {
+    this.socket?.end();
+  }
+}
+
+export function createStore(env = process.env, dataDir = '/data') {
+  const kind = env.RATE_LIMIT_STORE || (env.RATE_LIMIT_REDIS_URL ? 'redis' : 'file');
+  if (kind === 'redis') {
+    return new RedisStore(env.RATE_LIMIT_REDIS_URL || 'redis://127.0.0.1:6379');
+  }
+  if (kind === 'file') {
+    return new FileStore(env.RATE_LIMIT_FILE || path.join(dataDir, 'rate-limits.json'));
+  }
+  return new MemoryStore();
+}
+
+export function limitsFromEnv(env = process.env) {
+  const int = (name, fallback) => parseInt(env[name] || String(fallback), 10);
+  return {
+    installation: {
+      burst: int('RATE_LIMIT_INSTALLATION_BURST', 30),
+      perMinute: int('RATE_LIMIT_INSTALLATION_PER_MINUTE', 30),
+    },
+    repo: {
+      burst: int('RATE_LIMIT_REPO_BURST', 10),
+      perMinute: int('RATE_LIMIT_REPO_PER_MINUTE', 6),
+    },
+  };
+}
+
+export class RateLimiter {
+  constructor(store, limits, { log } = {}) {
+    this.store = store;
+    this.limits = limits;
+    this.log = log;
+    this.counters = {
+      allowed: { installation: 0, repo: 0 },
+      denied: { installation: 0, repo: 0 },
+      store_errors: 0,
+    };
+  }
+
+  /**
+   * Take a token for the installation and, if given, the repository.
+   * Store failures let the request through (and are counted), so an
+   * unreachable Redis never stops rescues entirely.
+   */
+  async check(installationId, repoFullName) {
+    const scopes = [['installation', `installation:${installationId}`]];
+    if (repoFullName) {
+      scopes.push(['repo', `repo:${repoFullName.toLowerCase()}`]);
+    }
+    let result;
+    try {
+      result = await this.store.takeAll(
+        scopes.map(([scope, key]) => ({ key, limit: this.limits[scope] }))
+      );
+    } catch (error) {
+      this.counters.store_errors++;
+      this.log?.warn('Rate limit store unavailable; allowing request', {
+        store: this.store.name,
+        error: error.message,
+      });
+      return { allowed: true };
+    }
+    if (!result.allowed) {
+      const scope = scopes[result.denied][0];
+      this.counters.denied[scope]++;
+      return { allowed: false, scope, retryAfterMs: result.retryAfterMs };
+    }
+    for (const [scope] of scopes) {
+      this.counters.allowed[scope]++;
+    }
+    return { allowed: true };
+  }
+
+  async metrics() {
+    const lines = [
+      '# HELP nova_rate_limit_requests_total Rate limit decisions by scope and result.',
+      '# TYPE nova_rate_limit_requests_total counter',
+    ];
+    for (const result of ['allowed', 'denied']) {
+      for (const scope of ['installation', 'repo']) {
+        lines.push(
+          `nova_rate_limit_requests_total{scope="${scope}",result="${result}"} ${this.counters[result][scope]}`
+        );
+      }
+    }
+    lines.push(
+      '# HELP nova_rate_limit_store_errors_total Store failures (requests were allowed).',
+      '# TYPE nova_rate_limit_store_errors_total counter',
+      `nova_rate_limit_store_errors_total{store="${this.store.name}"} ${this.counters.store_errors}`,
+      '# HELP nova_rate_limit_limit Configured bucket sizes and refill rates.',
+      '# TYPE nova_rate_limit_limit gauge'
+    );
+    for (const [scope, limit] of Object.entries(this.limits)) {
+      lines.push(`nova_rate_limit_limit{scope="${scope}",kind="burst"} ${limit.burst}`);
+      lines.push(`nova_rate_limit_limit{scope="${scope}",kind="per_minute"} ${limit.perMinute}`);
+    }
+    const buckets = await this.store.size().catch(() => null);
+    if (buckets !== null) {
+      lines.push(
+        '# HELP nova_rate_limit_buckets Buckets currently tracked by the store.',
+        '# TYPE nova_rate_limit_buckets gauge',
+        `nova_rate_limit_buckets{store="${this.store.name}"} ${buckets}`
+      );
+    }
+    return lines.join('\n') + '\n';
+  }
+}
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold `nova` startup per subcommand.
+
+- Runs each subcommand (with --help, so nothing real executes) in a fresh
+  interpreter several times and reports median and best wall time
+- Uses `python -X importtime` on one extra run to list the slowest imports
+- Flags heavy modules (provider SDKs, agent stack) imported at startup
+- --json writes machine-readable results; --baseline compares against a
+  previous --json file and fails when a command regresses by more than
+  --tolerance percent
+- Exit code: 0 if within budget; 1 on regression or --max-ms exceeded
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_COMMANDS = ["help", "version", "config", "trace", "fix", "lock-server"]
+# Importing any of these means a command paid for code it does not need
+HEAVY_MODULES = ["openai", "anthropic", "nova.runner", "nova.agent.llm_client"]
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    src = str(REPO_ROOT / "src")
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (src, env.get("PYTHONPATH")) if p)
+    return env
+
+
+def _argv(command: str) -> List[str]:
+    args = [sys.executable, "-m", "nova.cli"]
+    # "help" is the bare `nova --help` entry point
+    return args + (["--help"] if command == "help" else [command, "--help"])
+
+
+def time_command(command: str, runs: int) -> List[float]:
+    """Wall-clock milliseconds for ``runs`` fresh invocations."""
+    env = _env()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(_argv(command), env=env, capture_output=True, check=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def import_profile(command: str, top: int) -> Tuple[List[Tuple[float, str]], List[str]]:
+    """(cumulative ms, module) for the slowest top-level imports, plus heavy modules seen."""
+    argv = _argv(command)
+    argv.insert(1, "-X")
+    argv.insert(2, "importtime")
+    proc = subprocess.run(argv, env=_env(), capture_output=True, text=True)
+    rows = []
+    seen = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        try:
+            micros = int(cumulative.strip())
+        except ValueError:
+            continue
+        module = name.strip()
+        seen.add(module)
+        # Only top-level entries (no indentation) to avoid double counting
+        if not name.startswith("  "):
+            rows.append((micros / 1000, module))
+    rows.sort(reverse=True)
+    heavy = [m for m in HEAVY_MODULES if m in seen]
+    return rows[:top], heavy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("commands", nargs="*", default=DEFAULT_COMMANDS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list")
+    parser.add_argument("--json", dest="json_out", type=Path, help="write results")
+    parser.add_argument("--baseline", type=Path, help="previous --json results")
+    parser.add_argument("--tolerance", type=float, default=20.0)
+    parser.add_argument("--max-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else {}
+    results = {}
+    failed = False
+    for command in args.commands:
+        samples = time_command(command, args.runs)
+        slow, heavy = import_profile(command, args.top)
+        median = statistics.median(samples)
+        results[command] = {
+            "median_ms": round(median, 1),
+            "best_ms": round(min(samples), 1),
+            "heavy_imports": heavy,
+            "slowest_imports": [{"module": m, "ms": round(ms, 1)} for ms, m in slow],
+        }
+        line = (
+            f"nova {command:<12} median {median:7.1f} ms  best {min(samples):7.1f} ms"
+        )
+        previous = baseline.get(command, {}).get("median_ms")
+        if previous:
+            change = (median - previous) / previous * 100
+            line += f"  ({change:+.0f}% vs baseline)"
+            if change > args.tolerance:
+                failed = True
+                line += "  REGRESSION"
+        if args.max_ms and median > args.max_ms:
+            failed = True
+            line += "  OVER BUDGET"
+        print(line)
+        if heavy:
+            print(f"  heavy imports at startup: {', '.join(heavy)}")
+        for ms, module in slow:
+            print(f"    {ms:7.1f} ms  {module}")
+
+    if args.json_out:
+        args.json_out.write_text(json.dumps(results, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Checkpoints that let an interrupted ``nova fix`` run pick up where it stopped.
+
+After every completed step (discovery, a reviewed patch, a verification run)
+and when the run is interrupted, the fix loop writes ``.nova/checkpoint.json``
+in the repository. It holds the full ``AgentState`` (plan, critic feedback,
+cached file reads, applied patches), the last test results, and the fix
+branch with the SHA it pointed at. An interrupt mid-step records the last
+completed step, so a patch committed but not yet verified is not resumed
+from. ``nova fix --resume`` restores the branch at
+that SHA and continues from the saved iteration without re-running discovery.
+
+Usage:
+    checkpointer = Checkpointer(state, git_manager)
+    checkpointer.save("discovery")
+    ...
+    checkpoint = load_checkpoint(repo_path)
+    if checkpoint:
+        state = checkpoint.state
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from nova.agent.state import AgentState
+
+CHECKPOINT_VERSION = 1
+
+
+def checkpoint_path(repo_path: Path) -> Path:
+    return Path(repo_path) / ".nova" / "checkpoint.json"
+
+
+@dataclass
+class Checkpoint:
+    """A saved fix run: agent state plus the git position it belongs to."""
+
+    state: AgentState
+    branch_name: Optional[str]
+    branch_sha: Optional[str]
+    original_head: Optional[str]
+    original_branch: Optional[str]
+    step: str
+    saved_at: float
+
+    @property
+    def last_test_results(self) -> List[Dict[str, Any]]:
+        return self.state.failing_tests
+
+    def failing_tests(self) -> List[Any]:
+        """The last test results as ``FailingTest`` objects."""
+        from nova.runner.test_runner import FailingTest
+
+        return [
+            FailingTest(
+                name=test.get("name", ""),
+                file=test.get("file", ""),
+                line=test.get("line", 0),
+                short_traceback=test.get("short_traceback", ""),
+            )
+            for test in self.last_test_results
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": CHECKPOINT_VERSION,
+            "step": self.step,
+            "saved_at": self.saved_at,
+            "branch_name": self.branch_name,
+            "branch_sha": self.branch_sha,
+            "original_head": self.original_head,
+            "original_branch": self.original_branch,
+            "state": self.state.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Checkpoint":
+        return cls(
+            state=AgentState.from_dict(data["state"]),
+            branch_name=data.get("branch_name"),
+            branch_sha=data.get("branch_sha"),
+            original_head=data.get("original_head"),
+            original_branch=data.get("original_branch"),
+            step=data.get("step", ""),
+            saved_at=data.get("saved_at", 0.0),
+        )
+
+
+def load_checkpoint(repo_path: Path) -> Optional[Checkpoint]:
+    """The repository's checkpoint, or None if there is no usable one."""
+    path = checkpoint_path(repo_path)
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != CHECKPOINT_VERSION:
+        return None
+    return Checkpoint.from_dict(data)
+
+
+def clear_checkpoint(repo_path: Path) -> None:
+    try:
+        checkpoint_path(repo_path).unlink()
+    except FileNotFoundError:
+        pass
+
+
+class Checkpointer:
+    """Writes a run's checkpoint; attached to the run's ``GitBranchManager``."""
+
+    def __init__(self, state: AgentState, git_manager: Optional[Any] = None):
+        self.state = state
+        self.git_manager = git_manager
+        self.path = checkpoint_path(state.repo_path)
+        self.saves = 0
+        # JSON of the last completed step, which an interrupt saves again
+        self._completed: Optional[str] = None
+
+    def save(self, step: str) -> Path:
+        """
+        Write the checkpoint atomically, so a kill mid-write keeps the last one.
+
+        ``step="interrupted"`` writes the state and SHA of the last completed
+        step rather than the current ones.
+        """
+        if step == "interrupted" and self._completed is not None:
+            data = json.loads(self._completed)
+            data["step"] = step
+            data["saved_at"] = time.time()
+        else:
+            git = self.git_manager
+            data = Checkpoint(
+                state=self.state,
+                branch_name=getattr(git, "branch_name", None) or self.state.branch_name,
+                branch_sha=git._get_current_head() if git is not None else None,
+                original_head=getattr(git, "original_head", None),
+                original_branch=getattr(git, "original_branch", None),
+                step=step,
+                saved_at=time.time(),
+            ).to_dict()
+            if step != "interrupted":
+                self._completed = json.dumps(data, default=str)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        ignore = self.path.parent / ".gitignore"
+        if not ignore.exists():
+            # Keep run files out of `git add -A` step commits
+            ignore.write_text("*\n")
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".checkpoint-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, default=str)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        self.saves += 1
+        return self.path
+
+    def clear(self) -> None:
+        clear_checkpoint(self.state.repo_path)
+
+
+__all__ = [
+    "Checkpoint",
+    "Checkpointer",
+    "checkpoint_path",
+    "clear_checkpoint",
+    "load_checkpoint",
+]
@@ -0,0 +1,241 @@
+"""
+Group failing tests that share a root cause.
+
+A suite with 200 failures usually has a handful of causes. Failures are keyed
+by a signature built from their traceback:
+
+- the exception type (``AssertionError`` for bare ``assert`` failures)
+- the error message with literals, numbers and addresses normalized away
+- the innermost frame (``path:function``) outside the test files
+- the suspect source file: the innermost frame that is not a test file
+
+Plain assertion failures whose innermost frame is the test itself are keyed
+by the functions pytest reports in its ``where`` lines, so ``assert add(2, 3)
+== 5`` and ``assert add(1, 1) == 2`` land together.
+
+Prompts then carry one representative traceback per cluster, largest cluster
+first, instead of an arbitrary slice of the failures.
+
+The full traceback a signature needs stays off the test dicts, which are
+logged and checkpointed; ``AgentState.full_tracebacks`` holds it instead.
+
+Usage:
+    clusters = cluster_failures(state.failing_tests, state.full_tracebacks)
+    prompt_tests = representatives(clusters, state.full_tracebacks)
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Member names listed next to a representative
+MAX_LISTED_MEMBERS = 10
+# Lines of a representative's traceback shown in prompts
+MAX_TRACEBACK_LINES = 20
+
+# `path/to/file.py:12: in func` (pytest --tb=short/long)
+_PYTEST_FRAME = re.compile(r"^\s*([^\s:][^:]*\.py):(\d+):(?: in (\S+))?")
+# `File "path/to/file.py", line 12, in func` (native tracebacks)
+_NATIVE_FRAME = re.compile(r'^\s*File "([^"]+\.py)", line (\d+), in (\S+)')
+_EXCEPTION = re.compile(
+    r"^((?:[A-Za-z_]\w*\.)*[A-Z]\w*(?:Error|Exception|Exit|Interrupt|Warning|Failed|Failure))\b:?\s*(.*)$"
+)
+_WHERE_CALL = re.compile(r"where .*? = (?:<[^>]*>\.)?([A-Za-z_][\w.]*)\(")
+
+_NORMALIZE = [
+    (re.compile(r"0x[0-9a-fA-F]+"), "<addr>"),
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "<str>"),
+    (re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e-?\d+)?"), "<n>"),
+    (re.compile(r"/(?:tmp|var|private)/\S+"), "<path>"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def is_test_file(path: str) -> bool:
+    name = path.replace("\\", "/").rsplit("/", 1)[-1]
+    return (
+        name.startswith("test_")
+        or name.endswith("_test.py")
+        or name == "conftest.py"
+        or "/tests/" in f"/{path}"
+        or "/test/" in f"/{path}"
+    )
+
+
+def _is_library(path: str) -> bool:
+    return "site-packages" in path or "/lib/python" in path or path.startswith("<")
+
+
+def normalize_message(message: str) -> str:
+    for pattern, replacement in _NORMALIZE:
+        message = pattern.sub(replacement, message)
+    return message.strip()[:200]
+
+
+def _frames(traceback: str) -> List[Tuple[str, str]]:
+    """``(path, function)`` for every frame in the traceback, outermost first."""
+    frames = []
+    for line in traceback.splitlines():
+        match = _NATIVE_FRAME.match(line) or _PYTEST_FRAME.match(line)
+        if match:
+            frames.append((match.group(1), match.group(3) or ""))
+    return frames
+
+
+def _error(traceback: str) -> Tuple[str, str, List[str]]:
+    """Exception type, message and the ``E`` lines after the first one."""
+    e_lines = [
+        line.strip()[1:].strip()
+        for line in traceback.splitlines()
+        if line.strip().startswith("E ") or line.strip() == "E"
+    ]
+    for i, line in enumerate(e_lines):
+        match = _EXCEPTION.match(line)
+        if match:
+            return match.group(1).rsplit(".", 1)[-1], match.group(2), e_lines[i + 1 :]
+        if line.startswith("assert "):
+            return "AssertionError", line, e_lines[i + 1 :]
+    if e_lines:
+        return "Error", e_lines[0], e_lines[1:]
+    # Native tracebacks end with `TypeError: ...`; source lines are never the error
+    for line in reversed(traceback.splitlines()):
+        match = _EXCEPTION.match(line.strip())
+        if match:
+            return match.group(1).rsplit(".", 1)[-1], match.group(2), []
+    return "Error", "", []
+
+
+def _prompt_traceback(traceback: str) -> str:
+    """The traceback without caret lines, keeping its head and the error at the end."""
+    lines = [
+        line
+        for line in traceback.splitlines()
+        if line.strip() and set(line.strip()) - set("^~")
+    ]
+    if len(lines) > MAX_TRACEBACK_LINES:
+        tail = MAX_TRACEBACK_LINES - 5
+        lines = lines[:4] + ["..."] + lines[-tail:]
+    return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class FailureSignature:
+    exception_type: str
+    message: str
+    frame: Optional[str]
+    suspect_file: Optional[str]
+
+
+def full_traceback(
+    test: Any, tracebacks: Optional[Mapping[Tuple[str, str], str]] = None
+) -> Optional[str]:
+    """The full traceback of a ``FailingTest``, or of a test dict from ``tracebacks``."""
+    if not isinstance(test, dict):
+        return getattr(test, "full_traceback", None)
+    if tracebacks:
+        return tracebacks.get((test.get("file", ""), test.get("name", "")))
+    return None
+
+
+def failure_signature(
+    test: Any, full_traceback: Optional[str] = None
+) -> FailureSignature:
+    """The signature of a ``FailingTest`` or its dict form."""
+    get = test.get if isinstance(test, dict) else lambda k, d=None: getattr(test, k, d)
+    traceback = full_traceback or get("full_traceback") or get("short_traceback") or ""
+    exception_type, message, rest = _error(traceback)
+
+    frames = [f for f in _frames(traceback) if not _is_library(f[0])]
+    source_frames = [f for f in frames if not is_test_file(f[0])]
+    suspect = source_frames[-1][0] if source_frames else None
+    if source_frames:
+        frame = "{}:{}".format(*source_frames[-1])
+    else:
+        # The test itself raised: what it called is the closest thing to a cause
+        calls = sorted({m.group(1) for m in map(_WHERE_CALL.search, rest) if m})
+        frame = ",".join(calls) or get("file") or None
+    return FailureSignature(
+        exception_type=exception_type,
+        message=normalize_message(message),
+        frame=frame,
+        suspect_file=suspect,
+    )
+
+
+@dataclass
+class FailureCluster:
+    """Failing tests with the same signature, in the order they failed."""
+
+    signature: FailureSignature
+    tests: List[Any] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        return len(self.tests)
+
+    @property
+    def representative(self) -> Any:
+        return self.tests[0]
+
+    def describe(self) -> str:
+        sig = self.signature
+        where = f" in {sig.frame}" if sig.frame else ""
+        return f"{sig.exception_type}: {sig.message}{where}"
+
+
+def cluster_failures(
+    failing_tests: List[Any],
+    tracebacks: Optional[Mapping[Tuple[str, str], str]] = None,
+) -> List[FailureCluster]:
+    """
+    Clusters of ``failing_tests``, largest first (ties keep failure order).
+
+    ``tracebacks`` maps ``(file, name)`` of test dicts to their full traceback.
+    """
+    clusters: Dict[FailureSignature, FailureCluster] = {}
+    for test in failing_tests:
+        signature = failure_signature(test, full_traceback(test, tracebacks))
+        clusters.setdefault(signature, FailureCluster(signature)).tests.append(test)
+    return sorted(clusters.values(), key=lambda c: -c.size)
+
+
+def representatives(
+    clusters: List[FailureCluster],
+    tracebacks: Optional[Mapping[Tuple[str, str], str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    One test dict per cluster for prompts, with the cluster's size, signature
+    and the names of the other tests in it.
+    """
+    result = []
+    for cluster in clusters:
+        rep = cluster.representative
+        test = dict(rep) if isinstance(rep, dict) else rep.to_dict()
+        others = [
+            t.get("name") if isinstance(t, dict) else t.name for t in cluster.tests[1:]
+        ]
+        full = full_traceback(rep, tracebacks) or test.pop("full_traceback", None)
+        if full:
+            # The short traceback stops after 5 lines, often before the error
+            test["short_traceback"] = _prompt_traceback(full)
+        test["cluster_size"] = cluster.size
+        test["cluster_signature"] = cluster.describe()
+        test["cluster_members"] = others[:MAX_LISTED_MEMBERS]
+        if cluster.signature.suspect_file:
+            test["suspect_file"] = cluster.signature.suspect_file
+        result.append(test)
+    return result
+
+
+__all__ = [
+    "FailureCluster",
+    "FailureSignature",
+    "cluster_failures",
+    "failure_signature",
+    "full_traceback",
+    "is_test_file",
+    "normalize_message",
+    "representatives",
+]
@@ -0,0 +1,13 @@
+"""
+The original ``nova.agent.llm_agent`` import path.
+
+``LLMAgent`` is ``EnhancedLLMAgent``: the same planner/actor/critic methods
+(``create_plan``, ``generate_patch``, ``review_patch``), with model routing,
+shared sessions and failure clustering.
+"""
+
+from nova.agent.llm_agent_enhanced import EnhancedLLMAgent
+
+LLMAgent = EnhancedLLMAgent
+
+__all__ = ["LLMAgent"]
@@ -3,18 +3,28 @@ Enhanced LLM agent that implements the full Planner, Actor, and Critic workflow.
 This is the production agent for Nova CI-Rescue that uses GPT-4/5 or Claude.
 """
 
+import hashlib
 import json
 import re
 import ast
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Set, Tuple
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple
 from nova.agent.llm_client import (
     LLMClient,
+    LLMSession,
 )
+from nova.agent.model_router import ModelRouter, Route
 from nova.config import get_settings
+from nova.telemetry.tracing import current_span, traced
+from nova.agent.clustering import cluster_failures, representatives
 from nova.agent.llm_client_complete_fix import (
+    SESSION_SYSTEM_PROMPT,
     build_comprehensive_planner_prompt,
     build_complete_fix_prompt,
+    build_critic_turn,
+    build_fix_turn,
+    build_planner_turn,
+    build_session_context,
     build_strict_critic_prompt,
     parse_comprehensive_plan,
 )
@@ -26,8 +36,221 @@ class EnhancedLLMAgent:
     def __init__(self, repo_path: Path, verbose: bool = False):
         self.repo_path = repo_path
         self.settings = get_settings()
-        self.llm = LLMClient()  # Use the unified LLM client
+        self.llm = LLMClient(repo=str(repo_path))  # Use the unified LLM client
         self.verbose = verbose
+        self.router = ModelRouter.from_settings(
+            self.settings,
+            self.llm.provider,
+            self.llm.model,
+            ledger=self.llm.usage_ledger,
+            repo=str(repo_path),
+        )
+        self._plan_route: Optional[Route] = None
+        self._actor_route: Optional[Route] = None
+        # Routes of the approved patch whose test run hasn't been reported yet
+        self._unverified: Tuple[Optional[Route], Optional[Route]] = (None, None)
+        # Conversation shared by planner/actor/critic while the context holds
+        self._session: Optional[LLMSession] = None
+        self._session_key: Optional[str] = None
+        self._last_patch: Optional[str] = None
+        self.closed_sessions: List[Dict[str, int]] = []
+
+    def _route(
+        self,
+        phase: str,
+        failing_count: int,
+        *prompts: str,
+        reviews: Optional[Route] = None,
+    ) -> Route:
+        """Choose the model for this phase call and note it on the phase span."""
+        route = self.router.choose(
+            phase, failing_count, sum(len(p) for p in prompts), reviews=reviews
+        )
+        phase_span = current_span()
+        if phase_span is not None:
+            phase_span.set("model", route.model)
+            phase_span.set("tier", route.tier)
+        return route
+
+    def _session_for(
+        self,
+        failing_tests: List[Dict[str, Any]],
+        test_contents: Dict[str, str],
+        source_contents: Dict[str, str],
+    ) -> Optional[LLMSession]:
+        """The conversation for this context; a new one once files or failures change."""
+        if not self.settings.llm_sessions:
+            return None
+        context = build_session_context(failing_tests, test_contents, source_contents)
+        key = hashlib.sha256(context.encode("utf-8")).hexdigest()
+        if self._session is not None and self._session_key == key:
+            if not self._session.full:
+                return self._session
+        self._close_session()
+        self._session = self.llm.session(
+            SESSION_SYSTEM_PROMPT,
+            context,
+            max_turns=self.settings.llm_session_max_turns,
+        )
+        self._session_key = key
+        return self._session
+
+    def _close_session(self) -> None:
+        if self._session is not None and self._session.turns:
+            self.closed_sessions.append(dict(self._session.usage))
+        self._session = None
+        self._session_key = None
+        self._last_patch = None
+
+    def conversation_mark(self) -> Callable[[], None]:
+        """
+        Undo for the conversation turns made after this call.
+
+        The pipelined loop uses it to take a discarded speculative plan back
+        out of the session, so later phases don't see it.
+        """
+        session, key, last_patch = self._session, self._session_key, self._last_patch
+        history_len = len(session.history) if session is not None else 0
+        closed = len(self.closed_sessions)
+
+        def undo() -> None:
+            if self._session is not session:
+                # The discarded call opened a new conversation: drop it, resume ours
+                if (
+                    session is not None
+                    and session.turns
+                    and len(self.closed_sessions) > closed
+                ):
+                    del self.closed_sessions[closed]  # counted again when it closes
+                self._close_session()
+                self._session, self._session_key = session, key
+            if session is not None:
+                session.rollback(history_len)
+            self._last_patch = last_patch
+
+        return undo
+
+    def session_usage(self) -> Dict[str, int]:
+        """Token totals over every session of this run, including the open one."""
+        sessions = list(self.closed_sessions)
+        if self._session is not None and self._session.turns:
+            sessions.append(self._session.usage)
+        totals: Dict[str, int] = {"sessions": len(sessions)}
+        for usage in sessions:
+            for key, value in usage.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def _complete(
+        self,
+        session: Optional[LLMSession],
+        system_prompt: str,
+        prompt: str,
+        route: Route,
+        **kwargs: Any,
+    ) -> str:
+        """One phase call: a session turn when a session is open, else single-turn."""
+        if session is None:
+            return self.llm.complete(
+                system=system_prompt,
+                user=prompt,
+                model=route.model,
+                reasoning_effort=route.reasoning_effort,
+                **kwargs,
+            )
+        response = session.ask(
+            prompt,
+            model=route.model,
+            reasoning_effort=route.reasoning_effort,
+            **kwargs,
+        )
+        phase_span = current_span()
+        if phase_span is not None:
+            phase_span.set("session_turn", session.turns)
+            phase_span.set("session_prompt_tokens", session.usage["prompt_tokens"])
+            phase_span.set("session_cached_tokens", session.usage["cached_tokens"])
+        return response
+
+    def _prompt_failures(
+        self,
+        failing_tests: List[Any],
+        tracebacks: Optional[Dict[Tuple[str, str], str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        The failures to show the LLM: one per root-cause cluster, largest first.
+
+        ``failing_tests`` are ``FailingTest`` objects or their dicts; the full
+        tracebacks of dicts come from ``tracebacks`` (``AgentState.full_tracebacks``).
+        """
+        if not getattr(self.settings, "cluster_failures", True):
+            return [t.to_dict() if hasattr(t, "to_dict") else t for t in failing_tests]
+        clusters = cluster_failures(failing_tests, tracebacks)
+        phase_span = current_span()
+        if phase_span is not None:
+            phase_span.set("failure_clusters", len(clusters))
+        return representatives(clusters, tracebacks)
+
+    def _gather_context(
+        self, failing_tests: List[Dict[str, Any]], state=None
+    ) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Read the failing tests' files and the source files they import."""
+        test_contents = {}
+        source_contents = {}
+        source_files = set()
+
+        for test in failing_tests[:5]:  # Largest 5 failure clusters for context
+            test_file = test.get("file", "")
+            if test_file and test_file not in test_contents:
+                # Handle case where test_file might already include the project path
+                test_path = Path(test_file)
+                if not test_path.is_absolute():
+                    # Check if test_file already contains repo name
+                    if self.repo_path.name in test_file and str(
+                        self.repo_path
+                    ) not in str(test_path):
+                        # Strip the redundant path prefix
+                        parts = test_file.split(self.repo_path.name)
+                        if len(parts) > 1:
+                            test_file = parts[-1].lstrip("/")
+                    test_path = self.repo_path / test_file
+
+                if test_path.exists():
+                    test_contents[test_file] = self._read_file_with_cache(
+                        test_path, state
+                    )
+                    # Find source files imported by this test
+                    source_files.update(self.find_source_files_from_test(test_path))
+
+        # Read source files
+        for source_file in source_files:
+            source_path = self.repo_path / source_file
+            if source_path.exists():
+                source_contents[source_file] = self._read_file_with_cache(
+                    source_path, state
+                )
+        return test_contents, source_contents
+
+    def _credit(
+        self, routes: Tuple[Optional[Route], Optional[Route]], accepted: bool
+    ) -> None:
+        plan_route, actor_route = routes
+        self.router.record(
+            "planner", plan_route, accepted, counts_toward_escalation=False
+        )
+        self.router.record("actor", actor_route, accepted)
+
+    def _record_patch_outcome(self, accepted: bool) -> None:
+        """Credit the planner/actor routes that produced the latest patch."""
+        self._credit((self._plan_route, self._actor_route), accepted)
+        self._plan_route = self._actor_route = None
+
+    def record_verification(self, passed: bool) -> None:
+        """
+        Credit the routes of the last approved patch with its test results:
+        ``passed`` when it applied and the suite has fewer failures after it.
+        """
+        routes, self._unverified = self._unverified, (None, None)
+        self._credit(routes, passed)
 
     def _read_file_with_cache(self, file_path: Path, state=None) -> str:
         """Read file with caching to prevent re-reading."""
@@ -103,6 +326,7 @@ class EnhancedLLMAgent:
 
         return source_files
 
+    @traced("actor")
     def generate_patch(
         self,
         failing_tests: List[Dict[str, Any]],
@@ -125,69 +349,52 @@ class EnhancedLLMAgent:
         """
         if not failing_tests:
             return None
+        failure_count = len(failing_tests)
+        failing_tests = self._prompt_failures(
+            failing_tests, getattr(state, "full_tracebacks", None)
+        )
 
         # Read test files and identify source files
-        test_contents = {}
-        source_contents = {}
-        source_files = set()
-
-        # Debug log removed for demo
-
-        for test in failing_tests[:5]:  # Limit to first 5 tests for context
-            test_file = test.get("file", "")
-            if test_file and test_file not in test_contents:
-                # Handle case where test_file might already include the project path
-                test_path = Path(test_file)
-                if not test_path.is_absolute():
-                    # Check if test_file already contains repo name
-                    if self.repo_path.name in test_file and str(
-                        self.repo_path
-                    ) not in str(test_path):
-                        # Strip the redundant path prefix
-                        parts = test_file.split(self.repo_path.name)
-                        if len(parts) > 1:
-                            test_file = parts[-1].lstrip("/")
-                    test_path = self.repo_path / test_file
-
-                # Debug log removed for demo
-                if test_path.exists():
-                    test_contents[test_file] = self._read_file_with_cache(
-                        test_path, state
-                    )
-                    # Find source files imported by this test
-                    found_files = self.find_source_files_from_test(test_path)
-                    # Debug log removed for demo
-                    source_files.update(found_files)
-
-        # Read source files
-        for source_file in source_files:
-            source_path = self.repo_path / source_file
-            if source_path.exists():
-                source_contents[source_file] = self._read_file_with_cache(
-                    source_path, state
-                )
+        test_contents, source_contents = self._gather_context(failing_tests, state)
 
         # Use comprehensive prompt that demands complete fix
         from nova.agent.llm_client_fixed import convert_full_file_to_patch
 
-        prompt = build_complete_fix_prompt(
-            plan, failing_tests, test_contents, source_contents, critic_feedback
-        )
+        session = self._session_for(failing_tests, test_contents, source_contents)
+        if session is not None:
+            # Files and failures are already in the conversation
+            prompt = build_fix_turn(plan, critic_feedback)
+        else:
+            prompt = build_complete_fix_prompt(
+                plan, failing_tests, test_contents, source_contents, critic_feedback
+            )
 
         try:
             # Use the unified LLM client
             system_prompt = (
                 "You are a coding assistant who MUST fix ALL test failures in ONE complete solution. "
-                "Generate the COMPLETE corrected file contents that fix ALL {0} failing tests. "
+                "Generate the COMPLETE corrected file contents that fix ALL failing tests. "
                 "Partial solutions are FAILURES. Fix EVERYTHING in one go. "
                 "DO NOT add any new comments about bugs or fixes (no '# BUG:', '# FIX:', etc.). "
                 "Follow the exact format requested."
-            ).format(len(failing_tests))
+            )  # no per-run values here: the system prompt heads the cached prefix
+
+            if session is not None:
+                system_prompt = session.system
 
             # Model-specific params (e.g., GPT-5 temperature) are handled inside LLMClient.
-            response = self.llm.complete(
-                system=system_prompt,
-                user=prompt,
+            self._actor_route = self._route(
+                "actor",
+                failure_count,
+                system_prompt,
+                session.context if session is not None else "",
+                prompt,
+            )
+            response = self._complete(
+                session,
+                system_prompt,
+                prompt,
+                self._actor_route,
                 max_tokens=40000,  # Set to 40k as requested
             )
 
@@ -221,6 +428,7 @@ class EnhancedLLMAgent:
             # Convert full files to patches
             if not files_to_fix:
                 print("Warning: No files found in LLM response")
+                self._record_patch_outcome(False)
                 return None
 
             # Check if we're in whole file mode
@@ -232,7 +440,8 @@ class EnhancedLLMAgent:
                     combined_output += f"FILE_REPLACE:{file_path}\n"
                     combined_output += new_content
                     combined_output += "\nEND_FILE_REPLACE\n"
-                return combined_output.strip()
+                self._last_patch = combined_output.strip()
+                return self._last_patch
             else:
                 # Generate unified diff for each file (normal patch mode)
                 combined_diff = ""
@@ -242,10 +451,12 @@ class EnhancedLLMAgent:
                     )
                     combined_diff += file_diff + "\n"
 
-                return combined_diff.strip()
+                self._last_patch = combined_diff.strip()
+                return self._last_patch
 
         except Exception as e:
             print(f"Error generating patch: {e}")
+            self._record_patch_outcome(False)
             return None
 
     def _create_enhanced_prompt(
@@ -373,12 +584,14 @@ class EnhancedLLMAgent:
 
         return "\n".join(fixed_lines)
 
+    @traced("critic")
     def review_patch(
         self,
         patch: str,
         failing_tests: List[Dict[str, Any]],
         test_runner=None,
         repo_path=None,
+        tracebacks: Optional[Dict[Tuple[str, str], str]] = None,
     ) -> Tuple[bool, str]:
         """
         Review a patch using LLM (Critic node) with actual test results.
@@ -388,10 +601,30 @@ class EnhancedLLMAgent:
             failing_tests: List of failing tests this patch should fix
             test_runner: Optional TestRunner to actually run tests (if provided)
             repo_path: Optional repo path for applying patch temporarily
+            tracebacks: Optional full tracebacks of the failing tests by (file, name)
 
         Returns:
             Tuple of (approved: bool, reason: str)
         """
+        approved, reason = self._review_patch(
+            patch, failing_tests, test_runner, repo_path, tracebacks
+        )
+        if approved:
+            # Only the tests can vouch for the patch; see record_verification
+            self._unverified = (self._plan_route, self._actor_route)
+            self._plan_route = self._actor_route = None
+        else:
+            self._record_patch_outcome(False)
+        return approved, reason
+
+    def _review_patch(
+        self,
+        patch: str,
+        failing_tests: List[Dict[str, Any]],
+        test_runner=None,
+        repo_path=None,
+        tracebacks: Optional[Dict[Tuple[str, str], str]] = None,
+    ) -> Tuple[bool, str]:
         if not patch:
             return False, "Empty patch"
 
@@ -446,17 +679,18 @@ class EnhancedLLMAgent:
         actual_test_results = None
         if test_runner and repo_path:
             try:
-                import subprocess
+                from nova.tools.executor import get_executor
 
                 # Import here to avoid circular dependency
                 from nova.tools.fs import apply_and_commit_patch
 
+                executor = get_executor()
+
                 # Save current state
-                stash_result = subprocess.run(
+                stash_result = executor.run(
                     ["git", "stash", "push", "-m", "nova-critic-backup"],
-                    cwd=repo_path,
-                    capture_output=True,
-                    text=True,
+                    repo_path,
+                    label="git",
                 )
 
                 try:
@@ -534,11 +768,8 @@ class EnhancedLLMAgent:
 
                 finally:
                     # Always restore original state
-                    pop_result = subprocess.run(
-                        ["git", "stash", "pop"],
-                        cwd=repo_path,
-                        capture_output=True,
-                        text=True,
+                    pop_result = executor.run(
+                        ["git", "stash", "pop"], repo_path, label="git"
                     )
                     if self.verbose and pop_result.stderr:
                         console.print(
@@ -548,9 +779,9 @@ class EnhancedLLMAgent:
             except Exception as e:
                 # If anything goes wrong, make sure we restore state
                 try:
-                    subprocess.run(
-                        ["git", "stash", "pop"], cwd=repo_path, capture_output=True
-                    )
+                    from nova.tools.executor import get_executor
+
+                    get_executor().run(["git", "stash", "pop"], repo_path, label="git")
                 except Exception:
                     pass
                 actual_test_results = {"error": f"Failed to test patch: {str(e)}"}
@@ -562,19 +793,45 @@ class EnhancedLLMAgent:
                 "Consider: correctness, safety, side effects, and whether it addresses the test failures."
             )
 
-            # Use strict critic prompt that rejects partial solutions
-            user_prompt = build_strict_critic_prompt(
-                patch, failing_tests, len(failing_tests), actual_test_results
-            )
+            session = self._session
+            if session is not None and not session.full:
+                # The critic joins the actor's conversation; if the patch is
+                # the actor's last reply it is not sent again
+                system_prompt = session.system
+                user_prompt = build_critic_turn(
+                    patch,
+                    len(failing_tests),
+                    actual_test_results,
+                    patch_in_history=patch == self._last_patch,
+                )
+            else:
+                session = None
+                # Use strict critic prompt that rejects partial solutions
+                user_prompt = build_strict_critic_prompt(
+                    patch,
+                    self._prompt_failures(failing_tests, tracebacks),
+                    len(failing_tests),
+                    actual_test_results,
+                )
 
             # Log critic prompt for debugging
             # Debug logs removed for demo
 
             # Increased max_tokens for better responses
             # Debug log removed for demo
-            response = self.llm.complete(
-                system=system_prompt,
-                user=user_prompt,
+            route = self._route(
+                "critic",
+                len(failing_tests),
+                system_prompt,
+                session.context if session is not None else "",
+                user_prompt,
+                reviews=self._actor_route,
+            )
+            response = self._complete(
+                session,
+                system_prompt,
+                user_prompt,
+                route,
                 temperature=1.0,
                 max_tokens=40000,  # Set to 40k as requested
             )
@@ -651,11 +908,13 @@ class EnhancedLLMAgent:
                 return True, "Auto-approved: critic errored but patch is small & safe"
             return False, "Review failed due to error, patch not approved"
 
+    @traced("planner")
     def create_plan(
         self,
-        failing_tests: List[Dict[str, Any]],
+        failing_tests: List[Any],
         iteration: int,
         critic_feedback: Optional[str] = None,
+        tracebacks: Optional[Dict[Tuple[str, str], str]] = None,
     ) -> Dict[str, Any]:
         """
         Create a plan for fixing the failing tests (Planner node).
@@ -664,15 +923,27 @@ class EnhancedLLMAgent:
             failing_tests: List of failing test details
             iteration: Current iteration number
             critic_feedback: Optional feedback from previous critic rejection
+            tracebacks: Optional full tracebacks of the failing tests by (file, name)
 
         Returns:
             Plan dictionary with approach and steps
         """
         if not failing_tests:
             return {"approach": "No failures to fix", "target_tests": [], "steps": []}
-
-        # Build comprehensive planner prompt that pushes for complete solution
-        prompt = build_comprehensive_planner_prompt(failing_tests, critic_feedback)
+        failure_count = len(failing_tests)
+        failing_tests = self._prompt_failures(failing_tests, tracebacks)
+
+        session = None
+        if self.settings.llm_sessions:
+            # Open the conversation with the files so later phases only add turns
+            session = self._session_for(
+                failing_tests, *self._gather_context(failing_tests)
+            )
+        if session is not None:
+            prompt = build_planner_turn(critic_feedback)
+        else:
+            # Build comprehensive planner prompt that pushes for complete solution
+            prompt = build_comprehensive_planner_prompt(failing_tests, critic_feedback)
 
         try:
             system_prompt = (
@@ -680,10 +951,21 @@ class EnhancedLLMAgent:
                 "Partial fixes are UNACCEPTABLE. Analyze ALL failures, find common patterns, and create a COMPLETE fix strategy. "
                 "Your plan must address EVERY SINGLE failing test in one go."
             )
-
-            response = self.llm.complete(
-                system=system_prompt,
-                user=prompt,
+            if session is not None:
+                system_prompt = session.system
+
+            self._plan_route = self._route(
+                "planner",
+                failure_count,
+                system_prompt,
+                session.context if session is not None else "",
+                prompt,
+            )
+            response = self._complete(
+                session,
+                system_prompt,
+                prompt,
+                self._plan_route,
                 temperature=1.0,
                 max_tokens=40000,  # Set to 40k as requested
             )
@@ -698,7 +980,7 @@ class EnhancedLLMAgent:
 
             # Identify source files that need fixes
             source_files = set()
-            for test in failing_tests[:5]:  # Check first 5 tests
+            for test in failing_tests[:5]:  # Largest 5 failure clusters
                 test_file = test.get("file", "")
                 if test_file:
                     # Handle case where test_file might already include the project path
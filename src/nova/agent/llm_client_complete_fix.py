@@ -0,0 +1,356 @@
+"""
+Prompts for the enhanced agent that demand one complete fix for ALL failing tests.
+
+Each single-turn builder returns a ``CacheablePrompt``. Instructions and file
+contents come first and do not change between iterations, so the provider can
+serve them from its prompt cache. Failures, the plan and critic feedback come
+last.
+
+The ``build_*_turn`` builders are for ``LLMSession``: the shared context from
+``build_session_context`` is sent once, and each phase adds only its turn.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from nova.agent.llm_client import CacheablePrompt, parse_plan
+
+SESSION_SYSTEM_PROMPT = (
+    "You are an expert software engineer who MUST fix ALL test failures in ONE complete solution. "
+    "In this conversation you will plan the fix, write it, and review it. "
+    "Partial solutions are FAILURES. "
+    "Follow the exact format requested in each message."
+)
+
+_PLANNER_INSTRUCTIONS = (
+    "Analyze ALL of the failing tests and create ONE plan that fixes every one of them.\n\n"
+    "Look for a shared root cause before planning per-test changes.\n"
+    "Respond with JSON only, in this format:\n"
+    "{\n"
+    '  "approach": "<overall strategy>",\n'
+    '  "root_causes": ["<cause>", ...],\n'
+    '  "steps": ["<specific change>", ...],\n'
+    '  "files_to_fix": ["<path>", ...]\n'
+    "}\n"
+)
+
+_FIX_INSTRUCTIONS = (
+    "Generate the COMPLETE corrected contents of every file needed to fix ALL failing tests.\n\n"
+    "INSTRUCTIONS:\n"
+    "1. Fix the root cause in the source code; the tests define correct behavior\n"
+    "2. Only change a test if its expectation is obviously wrong (e.g., 2+2=5)\n"
+    "3. DO NOT hardcode values or special-case test inputs\n"
+    "4. REMOVE any existing BUG comments (e.g., '# BUG:', '# BUG: ...', etc.)\n"
+    "5. DO NOT add any new comments about bugs or fixes\n"
+    "6. The response format should be:\n\n"
+    "FILE: <filename>\n"
+    "```python\n"
+    "<complete corrected file contents>\n"
+    "```\n\n"
+    "If multiple files need to be fixed, include each one with the FILE: header.\n"
+    "Return ONLY the file contents, no explanations.\n"
+)
+
+_CRITIC_INSTRUCTIONS = (
+    "Review the proposed patch. APPROVE it only if it fixes ALL failing tests.\n\n"
+    "REJECT the patch if it:\n"
+    "- Leaves any of the failing tests unfixed\n"
+    "- Hardcodes values or special-cases test inputs\n"
+    "- Weakens or deletes tests instead of fixing the code\n"
+    "- Modifies configuration, CI or dependency files\n"
+    "- Introduces unrelated changes or obvious regressions\n\n"
+    "If test results are given, trust them over your own reading of the code.\n"
+    "Respond with JSON only:\n"
+    '{"approved": true|false, "reason": "<short explanation>"}\n'
+)
+
+
+def _total_failures(failing_tests: List[Dict[str, Any]]) -> int:
+    # Cluster representatives (see nova.agent.clustering) stand for their whole cluster
+    return sum(test.get("cluster_size", 1) for test in failing_tests)
+
+
+def _cluster_note(test: Dict[str, Any], indent: str = "   ") -> str:
+    if test.get("cluster_size", 1) <= 1:
+        return ""
+    note = f"{indent}Same failure in {test['cluster_size'] - 1} more tests"
+    note += f" ({test['cluster_signature']})"
+    if test.get("suspect_file"):
+        note += f", suspect file: {test['suspect_file']}"
+    note += "\n"
+    if test.get("cluster_members"):
+        note += f"{indent}Also failing: {', '.join(test['cluster_members'])}"
+        listed = len(test["cluster_members"])
+        if test["cluster_size"] - 1 > listed:
+            note += f" and {test['cluster_size'] - 1 - listed} more"
+        note += "\n"
+    return note
+
+
+def _failing_tests_table(failing_tests: List[Dict[str, Any]], limit: int = 20) -> str:
+    clustered = any("cluster_size" in test for test in failing_tests)
+    table = "| Test Name | File | Line | Error |"
+    table += " Tests |\n" if clustered else "\n"
+    table += "|-----------|------|------|-------|"
+    table += "-------|\n" if clustered else "\n"
+    for test in failing_tests[:limit]:
+        error = (
+            test.get("cluster_signature")
+            or (test.get("short_traceback") or "No error details").split("\n")[0]
+        )
+        table += (
+            f"| {test.get('name', 'unknown')[:60]} | {test.get('file', 'unknown')} "
+            f"| {test.get('line', 0)} | {error[:120]} |"
+        )
+        table += f" {test.get('cluster_size', 1)} |\n" if clustered else "\n"
+    if len(failing_tests) > limit:
+        rest = _total_failures(failing_tests[limit:])
+        table += f"\n... and {rest} more failing tests\n"
+    return table
+
+
+def _failing_tests_details(failing_tests: List[Dict[str, Any]]) -> str:
+    total = _total_failures(failing_tests)
+    details = f"FAILING TESTS TO FIX ({total} total, fix ALL of them):\n"
+    if total > len(failing_tests):
+        details += (
+            f"They fall into {len(failing_tests)} groups that share a cause, "
+            "largest first; each group shows one representative failure.\n"
+        )
+    for i, test in enumerate(failing_tests[:10], 1):
+        details += f"\n{i}. Test: {test.get('name', 'unknown')}\n"
+        details += f"   File: {test.get('file', 'unknown')}\n"
+        details += f"   Line: {test.get('line', 0)}\n"
+        details += f"   Error:\n{test.get('short_traceback', 'No traceback')}\n"
+        details += _cluster_note(test)
+    if len(failing_tests) > 10:
+        details += (
+            f"\n... and {_total_failures(failing_tests[10:])} more failing tests\n"
+        )
+    return details
+
+
+def _files_section(
+    source_contents: Optional[Dict[str, str]], test_contents: Optional[Dict[str, str]]
+) -> str:
+    # Sorted so the same files always produce the same prefix
+    section = ""
+    if source_contents:
+        section += "\n\nCURRENT SOURCE CODE (FIX THIS):\n"
+        for file_path, content in sorted(source_contents.items()):
+            section += f"\n=== {file_path} ===\n"
+            section += content
+    if test_contents:
+        section += "\n\nTEST FILE CONTENTS (for reference):\n"
+        for file_path, content in sorted(test_contents.items()):
+            section += f"\n=== {file_path} ===\n"
+            section += content
+    return section
+
+
+def _plan_section(plan: Optional[Dict[str, Any]]) -> str:
+    if not plan:
+        return ""
+    section = "\nPLAN:\n"
+    if isinstance(plan.get("approach"), str):
+        section += f"Approach: {plan['approach']}\n"
+    if plan.get("steps"):
+        section += "Steps:\n"
+        for i, step in enumerate(plan["steps"][:10], 1):
+            section += f"  {i}. {step}\n"
+    return section
+
+
+def _critic_feedback_section(critic_feedback: Optional[str], what: str) -> str:
+    if not critic_feedback:
+        return ""
+    section = f"\n⚠️ PREVIOUS {what} REJECTED:\n"
+    section += f'"{critic_feedback}"\n\n'
+    section += f"Generate a DIFFERENT {what.lower()} that avoids these issues.\n"
+    return section
+
+
+def _test_results_section(actual_test_results: Optional[Dict[str, Any]]) -> str:
+    if not actual_test_results:
+        return ""
+    section = "\nTEST RESULTS WITH THE PATCH APPLIED:\n"
+    return section + json.dumps(actual_test_results, indent=2) + "\n"
+
+
+def build_comprehensive_planner_prompt(
+    failing_tests: List[Dict[str, Any]], critic_feedback: Optional[str] = None
+) -> CacheablePrompt:
+    """
+    Build a planner prompt that asks for one strategy covering every failure.
+
+    Args:
+        failing_tests: List of failing test details
+        critic_feedback: Optional feedback from previous critic rejection
+
+    Returns:
+        Prompt with the instructions as its cacheable prefix
+    """
+    suffix = f"\nFAILING TESTS ({_total_failures(failing_tests)} total):\n"
+    suffix += _failing_tests_table(failing_tests)
+    suffix += _critic_feedback_section(critic_feedback, "PLAN")
+
+    return CacheablePrompt(_PLANNER_INSTRUCTIONS, suffix)
+
+
+def parse_comprehensive_plan(response: str) -> Dict[str, Any]:
+    """
+    Parse the planner's JSON response, falling back to ``parse_plan``.
+
+    Args:
+        response: The LLM's response text
+
+    Returns:
+        Plan dictionary with at least ``approach`` and ``steps``
+    """
+    plan: Dict[str, Any] = {}
+    if "{" in response and "}" in response:
+        try:
+            parsed = json.loads(response[response.find("{") : response.rfind("}") + 1])
+            if isinstance(parsed, dict):
+                plan = parsed
+        except json.JSONDecodeError:
+            pass
+    if not plan:
+        plan = parse_plan(response)
+    plan.setdefault("approach", "Fix all failing tests")
+    plan.setdefault("steps", [])
+    return plan
+
+
+def build_complete_fix_prompt(
+    plan: Dict[str, Any],
+    failing_tests: List[Dict[str, Any]],
+    test_contents: Dict[str, str] = None,
+    source_contents: Dict[str, str] = None,
+    critic_feedback: Optional[str] = None,
+) -> CacheablePrompt:
+    """
+    Build an actor prompt asking for complete corrected files.
+
+    Args:
+        plan: The plan created by the planner
+        failing_tests: List of failing test details
+        test_contents: Optional dict of test file contents
+        source_contents: Optional dict of source file contents
+        critic_feedback: Optional feedback from previous critic rejection
+
+    Returns:
+        Prompt with instructions, source and test files as its cacheable prefix
+    """
+    # Stable prefix: instructions, then source files, then test files
+    prompt = _FIX_INSTRUCTIONS + _files_section(source_contents, test_contents)
+
+    # Volatile suffix: failures, plan and critic feedback change every iteration
+    suffix = "\n\n" + _failing_tests_details(failing_tests)
+    suffix += _plan_section(plan)
+    suffix += _critic_feedback_section(critic_feedback, "FIX")
+
+    return CacheablePrompt(prompt, suffix)
+
+
+def build_strict_critic_prompt(
+    patch: str,
+    failing_tests: List[Dict[str, Any]],
+    total_failures: int,
+    actual_test_results: Optional[Dict[str, Any]] = None,
+) -> CacheablePrompt:
+    """
+    Build a critic prompt that rejects patches which leave failures behind.
+
+    Args:
+        patch: The proposed patch (unified diff or FILE_REPLACE blocks)
+        failing_tests: List of failing test details
+        total_failures: Number of tests failing before the patch
+        actual_test_results: Results of running the tests with the patch applied
+
+    Returns:
+        Prompt with the review criteria as its cacheable prefix
+    """
+    suffix = f"\nFAILING TESTS BEFORE THE PATCH ({total_failures} total):\n"
+    suffix += _failing_tests_table(failing_tests, limit=10)
+    suffix += _test_results_section(actual_test_results)
+    suffix += f"\nPROPOSED PATCH:\n{patch}\n"
+
+    return CacheablePrompt(_CRITIC_INSTRUCTIONS, suffix)
+
+
+def build_session_context(
+    failing_tests: List[Dict[str, Any]],
+    test_contents: Dict[str, str] = None,
+    source_contents: Dict[str, str] = None,
+) -> str:
+    """
+    Build the context that opens an ``LLMSession``: files first, then failures.
+
+    Args:
+        failing_tests: List of failing test details
+        test_contents: Optional dict of test file contents
+        source_contents: Optional dict of source file contents
+
+    Returns:
+        Context string shared by every turn of the session
+    """
+    context = "CONTEXT FOR THIS FIX SESSION"
+    context += _files_section(source_contents, test_contents)
+    context += "\n\n" + _failing_tests_details(failing_tests)
+    return context + "\n---\n\n"
+
+
+def build_planner_turn(critic_feedback: Optional[str] = None) -> str:
+    """Planner turn of a session: the instructions plus any critic feedback."""
+    return _PLANNER_INSTRUCTIONS + _critic_feedback_section(critic_feedback, "PLAN")
+
+
+def build_fix_turn(
+    plan: Optional[Dict[str, Any]] = None, critic_feedback: Optional[str] = None
+) -> str:
+    """Actor turn of a session: the instructions, the plan and any critic feedback."""
+    turn = _FIX_INSTRUCTIONS + _plan_section(plan)
+    return turn + _critic_feedback_section(critic_feedback, "FIX")
+
+
+def build_critic_turn(
+    patch: str,
+    total_failures: int,
+    actual_test_results: Optional[Dict[str, Any]] = None,
+    patch_in_history: bool = False,
+) -> str:
+    """
+    Critic turn of a session.
+
+    Args:
+        patch: The proposed patch (unified diff or FILE_REPLACE blocks)
+        total_failures: Number of tests failing before the patch
+        actual_test_results: Results of running the tests with the patch applied
+        patch_in_history: The patch is the actor's previous reply, so it is
+            referenced rather than sent again
+
+    Returns:
+        Turn text
+    """
+    turn = _CRITIC_INSTRUCTIONS
+    turn += f"\nThere were {total_failures} failing tests before the patch.\n"
+    turn += _test_results_section(actual_test_results)
+    if patch_in_history:
+        turn += "\nThe proposed patch is the set of files in your previous reply.\n"
+    else:
+        turn += f"\nPROPOSED PATCH:\n{patch}\n"
+    return turn
+
+
+__all__ = [
+    "SESSION_SYSTEM_PROMPT",
+    "build_comprehensive_planner_prompt",
+    "build_complete_fix_prompt",
+    "build_critic_turn",
+    "build_fix_turn",
+    "build_planner_turn",
+    "build_session_context",
+    "build_strict_critic_prompt",
+    "parse_comprehensive_plan",
+]
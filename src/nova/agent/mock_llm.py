@@ -0,0 +1,387 @@
+"""
+Deterministic offline stand-in for the OpenAI and Anthropic APIs.
+
+``MockLLMServer`` speaks just enough of both wire formats
+(``POST /v1/chat/completions`` and ``POST /v1/messages``) for the provider SDKs
+used by ``LLMClient``. Point the client at it with
+``NOVA_LLM_BASE_URL=http://127.0.0.1:<port>/v1``; no API key or network is
+needed. Replies come from a ``MockScript``:
+
+* scripted rules: the first rule whose ``match`` regex is found in the last
+  user message answers, optionally only ``times`` times;
+* recordings: a JSONL file written by ``NOVA_LLM_RECORD`` replays one recorded
+  reply per request, in order, with its recorded latency and token counts.
+
+When no rule answers, the planner gets a one-step plan, the critic approves,
+and anything else gets the script's ``default`` text.
+
+Latency is ``latency_ms`` plus ``ms_per_token`` per completion token. Token
+counts are ~4 characters per token. Repeated prompt prefixes are reported as
+cached the way each provider bills them: OpenAI in 128-token steps once a
+prompt reaches 1024 tokens, Anthropic up to the last ``cache_control``
+breakpoint.
+"""
+
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass
+class MockRule:
+    """One scripted reply."""
+
+    response: str
+    match: Optional[str] = None  # regex searched in the last user message
+    times: Optional[int] = None  # None = unlimited
+    latency_ms: Optional[float] = None  # overrides the script's latency
+    completion_tokens: Optional[int] = None  # None = ~len(response) / 4
+    status: int = 200  # e.g. 429 to exercise the retry scheduler
+    retry_after: Optional[float] = None  # Retry-After seconds for error replies
+
+
+@dataclass
+class MockScript:
+    """Replies, latency and token settings for ``MockLLMServer``."""
+
+    rules: List[MockRule] = field(default_factory=list)
+    default: str = ""
+    latency_ms: float = 0.0
+    ms_per_token: float = 0.0
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+        self._used = [0] * len(self.rules)
+
+    def reply(self, prompt: str) -> MockRule:
+        """The rule answering ``prompt`` (the last user message)."""
+        with self._lock:
+            for i, rule in enumerate(self.rules):
+                if rule.times is not None and self._used[i] >= rule.times:
+                    continue
+                if rule.match is None or re.search(rule.match, prompt):
+                    self._used[i] += 1
+                    return rule
+        return MockRule(response=self._default_reply(prompt))
+
+    def _default_reply(self, prompt: str) -> str:
+        if '"approved"' in prompt:
+            return json.dumps({"approved": True, "reason": "offline stand-in"})
+        if "FILE: <filename>" not in prompt and "approach" in prompt.lower():
+            return json.dumps(
+                {"approach": "Fix the failing tests", "steps": ["Fix the code"]}
+            )
+        return self.default
+
+    def latency_for(self, rule: MockRule, completion_tokens: int) -> float:
+        """Seconds to wait before answering with ``rule``."""
+        if rule.latency_ms is not None:
+            return rule.latency_ms / 1000.0
+        return (self.latency_ms + self.ms_per_token * completion_tokens) / 1000.0
+
+
+def _rule_from_dict(data: Dict[str, Any], base_dir: Path, times: Optional[int]):
+    known = {f.name for f in fields(MockRule)}
+    values = {k: v for k, v in data.items() if k in known}
+    if "response_file" in data:
+        values["response"] = (base_dir / data["response_file"]).read_text(
+            encoding="utf-8"
+        )
+    if "response" not in values:
+        raise ValueError(f"Mock rule needs 'response' or 'response_file': {data}")
+    values.setdefault("times", times)
+    return MockRule(**values)
+
+
+def load_script(path: Path) -> MockScript:
+    """
+    Load a ``MockScript`` from YAML/JSON, or replay a JSONL recording.
+
+    A YAML/JSON script is a mapping with ``rules`` (a list of ``MockRule``
+    fields; ``response_file`` is read relative to the script), ``default``,
+    ``latency_ms`` and ``ms_per_token``. Each JSONL line is one rule used once.
+
+    Raises:
+        ValueError: If the script is malformed
+    """
+    path = Path(path)
+    base_dir = path.parent
+    if path.suffix == ".jsonl":
+        lines = path.read_text(encoding="utf-8").splitlines()
+        rules = [
+            _rule_from_dict(json.loads(line), base_dir, times=1)
+            for line in lines
+            if line.strip()
+        ]
+        return MockScript(rules=rules)
+
+    if path.suffix == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+    else:
+        from nova.config import load_yaml_config
+
+        data = load_yaml_config(path)
+    if not isinstance(data, dict):
+        raise ValueError(f"Mock script must be a mapping: {path}")
+    return MockScript(
+        rules=[_rule_from_dict(r, base_dir, None) for r in data.get("rules") or []],
+        default=str(data.get("default", "")),
+        latency_ms=float(data.get("latency_ms", 0.0)),
+        ms_per_token=float(data.get("ms_per_token", 0.0)),
+    )
+
+
+# OpenAI caches prompts of 1024+ tokens, in 128-token steps (~4 chars/token)
+_OPENAI_MIN_CACHE_CHARS = 1024 * 4
+_OPENAI_CACHE_STEP_CHARS = 128 * 4
+
+
+def _tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def _text(content: Any) -> str:
+    """Plain text of a message's content (a string or a list of blocks)."""
+    if isinstance(content, str):
+        return content
+    return "".join(b.get("text", "") for b in content or [] if isinstance(b, dict))
+
+
+def _blocks(content: Any) -> List[Dict[str, Any]]:
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return [b for b in content or [] if isinstance(b, dict)]
+
+
+class _MockLLMHandler(BaseHTTPRequestHandler):
+    server: "MockLLMServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # keep benchmark output clean
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.server.stats())
+        elif self.path.rstrip("/").endswith("/health"):
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+            return
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.endswith("/chat/completions"):
+            self._send_json(*self.server.complete_openai(body))
+        elif path.endswith("/messages"):
+            self._send_json(*self.server.complete_anthropic(body))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _send_json(
+        self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None
+    ) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """OpenAI/Anthropic-compatible HTTP stand-in on localhost."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        script: Optional[MockScript] = None,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+    ):
+        super().__init__(address, _MockLLMHandler)
+        self.script = script or MockScript()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._seen_prefixes: set = set()
+        self._stats = {
+            "requests": 0,
+            "errors": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+    @property
+    def base_url(self) -> str:
+        """Value for NOVA_LLM_BASE_URL."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def serve_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def __enter__(self) -> "MockLLMServer":
+        self.serve_in_background()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def _cached(self, prefix: str) -> bool:
+        """Whether ``prefix`` was seen before; remembers it either way."""
+        if not prefix:
+            return False
+        digest = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        with self._lock:
+            if digest in self._seen_prefixes:
+                return True
+            self._seen_prefixes.add(digest)
+            return False
+
+    def _cached_chars(self, text: str) -> int:
+        """
+        Length of the longest seen prefix of ``text``, OpenAI style: prompts of
+        1024+ tokens are cached in 128-token steps.
+        """
+        if len(text) < _OPENAI_MIN_CACHE_CHARS:
+            return 0
+        step = _OPENAI_CACHE_STEP_CHARS
+        digest = hashlib.sha256()
+        cached = 0
+        with self._lock:
+            for end in range(step, len(text) + 1, step):
+                digest.update(text[end - step : end].encode("utf-8"))
+                key = digest.hexdigest()
+                if key in self._seen_prefixes and cached == end - step:
+                    cached = end
+                self._seen_prefixes.add(key)
+        return cached if cached >= _OPENAI_MIN_CACHE_CHARS else 0
+
+    def _answer(
+        self, prompt: str, prompt_tokens: int, cached_tokens: int
+    ) -> Tuple[MockRule, int]:
+        """Pick the reply, wait out its latency and count it."""
+        rule = self.script.reply(prompt)
+        completion_tokens = (
+            rule.completion_tokens
+            if rule.completion_tokens is not None
+            else _tokens(rule.response)
+        )
+        time.sleep(self.script.latency_for(rule, completion_tokens))
+        with self._lock:
+            self._stats["requests"] += 1
+            if rule.status != 200:
+                self._stats["errors"] += 1
+            else:
+                self._stats["prompt_tokens"] += prompt_tokens
+                self._stats["cached_tokens"] += cached_tokens
+                self._stats["completion_tokens"] += completion_tokens
+        return rule, completion_tokens
+
+    @staticmethod
+    def _error(rule: MockRule) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        headers = {}
+        if rule.retry_after is not None:
+            headers["Retry-After"] = str(rule.retry_after)
+        payload = {
+            "type": "error",
+            "error": {"type": "mock_error", "message": rule.response or "mock error"},
+        }
+        return rule.status, payload, headers
+
+    def complete_openai(self, body: Dict[str, Any]):
+        """Chat Completions request -> (status, payload, headers)."""
+        messages = body.get("messages") or []
+        texts = [_text(m.get("content")) for m in messages]
+        prompt_tokens = sum(_tokens(t) for t in texts)
+        serialized = "".join(f"{m.get('role')}\n{t}\n" for m, t in zip(messages, texts))
+        cached = min(self._cached_chars(serialized) // 4, prompt_tokens)
+        user_texts = [t for m, t in zip(messages, texts) if m.get("role") == "user"]
+        last_user = user_texts[-1] if user_texts else ""
+        rule, completion_tokens = self._answer(last_user, prompt_tokens, cached)
+        if rule.status != 200:
+            return self._error(rule)
+        payload = {
+            "id": f"chatcmpl-mock-{next(self._ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": rule.response},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached},
+            },
+        }
+        return 200, payload, {}
+
+    def complete_anthropic(self, body: Dict[str, Any]):
+        """Messages request -> (status, payload, headers)."""
+        messages = body.get("messages") or []
+        blocks = _blocks(body.get("system"))
+        for message in messages:
+            blocks.extend(_blocks(message.get("content")))
+        prompt_tokens = sum(_tokens(b.get("text", "")) for b in blocks)
+        # Everything up to the last cache_control breakpoint is cacheable
+        breakpoint_at = max(
+            (i for i, b in enumerate(blocks) if b.get("cache_control")), default=-1
+        )
+        prefix = "".join(b.get("text", "") for b in blocks[: breakpoint_at + 1])
+        cache_read = cache_write = 0
+        if prefix:
+            if self._cached(prefix):
+                cache_read = _tokens(prefix)
+            else:
+                cache_write = _tokens(prefix)
+        last_user = _text(messages[-1].get("content")) if messages else ""
+        rule, completion_tokens = self._answer(last_user, prompt_tokens, cache_read)
+        if rule.status != 200:
+            return self._error(rule)
+        payload = {
+            "id": f"msg_mock_{next(self._ids)}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "mock"),
+            "content": [{"type": "text", "text": rule.response}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": max(prompt_tokens - cache_read - cache_write, 0),
+                "output_tokens": completion_tokens,
+                "cache_read_input_tokens": cache_read,
+                "cache_creation_input_tokens": cache_write,
+            },
+        }
+        return 200, payload, {}
+
+
+__all__ = ["MockLLMServer", "MockRule", "MockScript", "load_script"]
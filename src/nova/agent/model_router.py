@@ -0,0 +1,215 @@
+"""
+Per-call model routing for the planner/actor/critic loop.
+
+Most CI failures are small: one assertion, one file. The router sends those
+to a fast tier (a cheaper model of the same provider with low reasoning
+effort) and keeps the default model for hard cases. A call is sent to the
+fast tier only when:
+
+- the failure is simple (few failing tests, small prompt),
+- the fast tier has not already failed ``escalate_after`` times in this run,
+- the fast model's recent success rate for the phase, from the usage
+  ledger, is not below ``min_success_rate``.
+
+Once the fast tier has failed enough in a run, every later call escalates to
+the default model. A call that reviews fast-tier output (the critic of a
+fast-tier patch) always goes to the default model, so the fast tier never
+vouches for itself. Outcomes are recorded from the tests that verify a
+patch, not from the critic's verdict alone.
+
+Usage:
+    router = ModelRouter.from_settings(settings, "openai", "gpt-5", ledger=ledger)
+    route = router.choose("actor", failing_count=1, context_chars=len(prompt))
+    text = llm.complete(system, prompt, model=route.model,
+                        reasoning_effort=route.reasoning_effort)
+    router.record("actor", route, success=tests_improved)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# Fast tier per provider, used when NOVA_FAST_LLM_MODEL is not set
+_FAST_MODELS = {
+    "anthropic": "claude-3-haiku-20240307",
+    "grok": "grok-code-fast-1",
+}
+
+FAST = "fast"
+DEFAULT = "default"
+
+
+def default_fast_model(provider: Optional[str], default_model: str) -> str:
+    """The cheaper sibling of ``default_model`` for ``provider``."""
+    if provider == "openai":
+        return "gpt-5-mini" if default_model.startswith("gpt-5") else "gpt-4o-mini"
+    return _FAST_MODELS.get(provider or "", default_model)
+
+
+@dataclass(frozen=True)
+class Route:
+    """The model chosen for one call and why."""
+
+    model: str
+    reasoning_effort: Optional[str]
+    tier: str
+    reason: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "reasoning_effort": self.reasoning_effort,
+            "tier": self.tier,
+            "reason": self.reason,
+        }
+
+
+class ModelRouter:
+    """Chooses fast vs. default model per call and escalates on failure."""
+
+    def __init__(
+        self,
+        default_model: str,
+        default_effort: Optional[str] = None,
+        fast_model: Optional[str] = None,
+        fast_effort: Optional[str] = "low",
+        max_simple_failures: int = 3,
+        max_simple_context_chars: int = 40_000,
+        escalate_after: int = 1,
+        min_success_rate: float = 0.3,
+        min_samples: int = 10,
+        ledger: Optional[Any] = None,
+        repo: Optional[str] = None,
+        enabled: bool = True,
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            default_model: Model for hard cases and after escalation
+            default_effort: Reasoning effort for the default model
+            fast_model: Cheaper model of the same provider (None disables routing)
+            fast_effort: Reasoning effort for the fast model
+            max_simple_failures: Most failing tests still considered simple
+            max_simple_context_chars: Largest prompt still considered simple
+            escalate_after: Fast-tier failures in a run before always escalating
+            min_success_rate: Skip the fast tier when its recent rate is lower
+            min_samples: Outcomes needed before the success rate is trusted
+            ledger: ``UsageLedger`` for recording/reading phase outcomes
+            repo: Repo label attached to recorded outcomes
+            enabled: False always routes to the default model
+        """
+        self.default_model = default_model
+        self.default_effort = default_effort
+        self.fast_model = fast_model
+        self.fast_effort = fast_effort
+        self.max_simple_failures = max_simple_failures
+        self.max_simple_context_chars = max_simple_context_chars
+        self.escalate_after = escalate_after
+        self.min_success_rate = min_success_rate
+        self.min_samples = min_samples
+        self.ledger = ledger
+        self.repo = repo
+        self.enabled = enabled and bool(fast_model) and fast_model != default_model
+        self.fast_failures = 0
+        self._rates: Dict[str, Optional[float]] = {}
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings,
+        provider: Optional[str],
+        default_model: str,
+        ledger: Optional[Any] = None,
+        repo: Optional[str] = None,
+    ) -> "ModelRouter":
+        return cls(
+            default_model=default_model,
+            default_effort=settings.reasoning_effort,
+            fast_model=settings.fast_llm_model
+            or default_fast_model(provider, default_model),
+            fast_effort=settings.fast_reasoning_effort,
+            max_simple_failures=settings.route_simple_max_failures,
+            max_simple_context_chars=settings.route_simple_max_context_chars,
+            escalate_after=settings.route_escalate_after,
+            ledger=ledger,
+            repo=repo,
+            enabled=settings.model_routing,
+        )
+
+    @property
+    def escalated(self) -> bool:
+        return self.fast_failures >= self.escalate_after
+
+    def _default(self, reason: str) -> Route:
+        return Route(self.default_model, self.default_effort, DEFAULT, reason)
+
+    def _recent_rate(self, phase: str) -> Optional[float]:
+        """Fast-model success rate for ``phase``, looked up once per run."""
+        if phase not in self._rates:
+            rate = None
+            if self.ledger is not None:
+                try:
+                    rate, samples = self.ledger.success_rate(phase, self.fast_model)
+                    if samples < self.min_samples:
+                        rate = None
+                except Exception:
+                    rate = None
+            self._rates[phase] = rate
+        return self._rates[phase]
+
+    def choose(
+        self,
+        phase: str,
+        failing_count: int,
+        context_chars: int,
+        reviews: Optional[Route] = None,
+    ) -> Route:
+        """
+        Pick the model for one ``phase`` call ("planner", "actor", "critic").
+
+        ``reviews`` is the route of the output this call judges, if any.
+        """
+        if not self.enabled:
+            return self._default("routing disabled")
+        if reviews is not None and reviews.tier == FAST:
+            return self._default("reviewing fast-tier output")
+        if self.escalated:
+            return self._default(
+                f"escalated after {self.fast_failures} fast failure(s)"
+            )
+        if failing_count > self.max_simple_failures:
+            return self._default(f"{failing_count} failing tests")
+        if context_chars > self.max_simple_context_chars:
+            return self._default(f"{context_chars} chars of context")
+        rate = self._recent_rate(phase)
+        if rate is not None and rate < self.min_success_rate:
+            return self._default(f"fast tier succeeds {rate:.0%} on {phase}")
+        return Route(self.fast_model, self.fast_effort, FAST, "simple failure")
+
+    def record(
+        self,
+        phase: str,
+        route: Optional[Route],
+        success: bool,
+        counts_toward_escalation: bool = True,
+    ) -> None:
+        """
+        Feed back whether the output produced on ``route`` was accepted.
+
+        Pass ``counts_toward_escalation=False`` for phases that share an
+        attempt with another phase, so one rejected patch counts once.
+        """
+        if route is None:
+            return
+        if route.tier == FAST and not success and counts_toward_escalation:
+            self.fast_failures += 1
+        if self.ledger is not None:
+            try:
+                self.ledger.record_outcome(phase, route.model, success, repo=self.repo)
+            except Exception:
+                pass  # routing feedback must never break the run
+
+
+__all__ = ["ModelRouter", "Route", "default_fast_model"]
@@ -0,0 +1,338 @@
+"""
+Pipelined plan → patch → review → verify loop.
+
+The sequential fix loop waits for each stage before starting the next, so an
+iteration costs planner + actor + critic + trial run + apply + full run. This
+loop runs on the same stages but overlaps the ones that don't depend on each
+other:
+
+- While the critic reviews a patch, the patch is trial-run in a detached
+  worktree of HEAD against the test files that were failing. An approved
+  patch whose trial shows it doesn't apply is sent back to the actor as
+  feedback.
+- The trial's results are the early failures of the next full run. If tests
+  still fail, planning for the next iteration starts from them while the
+  full suite verifies the applied patch. The speculative plan is kept only
+  if the full run fails on the same tests.
+- If the trial is all green, PR text generation runs alongside the final
+  verification run and is thrown away if verification fails.
+
+At most one LLM stage runs at a time, so stages may share one agent and its
+conversation; only test runs overlap with LLM calls. A speculative stage that
+is thrown away is waited for before the next LLM stage starts, and its turns
+are undone through ``speculation_mark``.
+
+Usage:
+    loop = PipelinedFixLoop(state, stages)
+    success = loop.run()
+"""
+
+from __future__ import annotations
+
+import contextvars
+import shutil
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from nova.agent.state import AgentState
+from nova.telemetry.tracing import span
+
+
+@dataclass
+class PipelineStages:
+    """
+    The callables one iteration is built from.
+
+    ``plan(failing_tests, iteration, critic_feedback)`` returns a plan,
+    ``patch(state)`` a diff (or None), ``review(state, patch)`` an
+    ``(approved, reason)`` tuple and ``apply(state, patch)`` the apply node's
+    result dict. ``run_tests(test_files)`` runs the given test files, or the
+    full suite for None, and returns ``(failures, junit_xml)``.
+    ``trial(patch, test_files)`` returns the failures with the patch applied
+    to a scratch copy, or None when it doesn't apply. ``pr_text(state)``
+    drafts the PR description once everything passes.
+    ``speculation_mark()`` is called before a speculative LLM stage starts and
+    returns a callable that undoes what that stage added to a shared
+    conversation; it is called if the stage's result is thrown away.
+    ``verified(passed)`` reports how an approved patch fared: False if it
+    doesn't apply, else whether the full run has fewer failures than before.
+    """
+
+    plan: Callable[[List[Any], int, Optional[str]], Any]
+    patch: Callable[[AgentState], Optional[str]]
+    review: Callable[[AgentState, str], Tuple[bool, str]]
+    apply: Callable[[AgentState, str], dict]
+    run_tests: Callable[[Optional[List[str]]], Tuple[List[Any], Optional[str]]]
+    trial: Optional[Callable[[str, List[str]], Optional[List[Any]]]] = None
+    pr_text: Optional[Callable[[AgentState], Any]] = None
+    speculation_mark: Optional[Callable[[], Callable[[], None]]] = None
+    verified: Optional[Callable[[bool], None]] = None
+
+
+def _test_name(test: Any) -> str:
+    return test.get("name", "") if isinstance(test, dict) else test.name
+
+
+def _test_file(test: Any) -> str:
+    return test.get("file", "") if isinstance(test, dict) else test.file
+
+
+def failing_test_files(failing_tests: Sequence[Any]) -> List[str]:
+    """The distinct test files of ``failing_tests``, in first-seen order."""
+    files: List[str] = []
+    for test in failing_tests:
+        path = _test_file(test)
+        if path and path not in files:
+            files.append(path)
+    return files
+
+
+def worktree_trial(
+    repo_path: Path, timeout: int = 300, verbose: bool = False
+) -> Callable[[str, List[str]], Optional[List[Any]]]:
+    """
+    A trial stage that tests a patch in a throwaway ``git worktree`` of HEAD.
+
+    The main checkout is left alone, so the trial can run while the critic
+    reviews the same patch.
+    """
+    from nova.runner.test_runner import TestRunner
+    from nova.tools.executor import get_executor
+    from nova.tools.fs import apply_and_commit_patch
+
+    def trial(patch: str, test_files: List[str]) -> Optional[List[Any]]:
+        executor = get_executor()
+        scratch = Path(tempfile.mkdtemp(prefix="nova-trial-"))
+        worktree = scratch / "worktree"
+        added = executor.run(
+            ["git", "worktree", "add", "--detach", str(worktree), "HEAD"],
+            repo_path,
+            label="git",
+        )
+        try:
+            if not added.ok:
+                return None
+            applied, _ = apply_and_commit_patch(
+                repo_root=worktree,
+                diff_text=patch,
+                step_number=0,
+                git_manager=None,
+                verbose=verbose,
+            )
+            if not applied:
+                return None
+            runner = TestRunner(
+                worktree,
+                verbose=verbose,
+                pytest_args=" ".join(test_files) or None,
+                timeout=timeout,
+            )
+            failures, _ = runner.run_tests()
+            return failures
+        finally:
+            if added.ok:
+                executor.run(
+                    ["git", "worktree", "remove", "--force", str(worktree)],
+                    repo_path,
+                    label="git",
+                )
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    return trial
+
+
+class PipelinedFixLoop:
+    """Runs the fix loop with independent stages overlapped on a thread pool."""
+
+    def __init__(
+        self,
+        state: AgentState,
+        stages: PipelineStages,
+        telemetry: Optional[Any] = None,
+        on_event: Optional[Callable[[str, dict], None]] = None,
+        checkpoint: Optional[Callable[[str], Any]] = None,
+    ):
+        self.state = state
+        self.stages = stages
+        self.telemetry = telemetry
+        self.on_event = on_event
+        # Called with the step name whenever the state is consistent to resume
+        self.checkpoint = checkpoint
+        self.pr_text: Any = None
+        self._pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="nova-pipe")
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        # Carry the caller's span context so stage spans nest under the loop.
+        ctx = contextvars.copy_context()
+        return self._pool.submit(ctx.run, fn, *args)
+
+    def _emit(self, event: str, **data: Any) -> None:
+        data["iteration"] = self.state.current_iteration + 1
+        if self.telemetry:
+            self.telemetry.log_event(f"pipeline_{event}", data)
+        if self.on_event:
+            self.on_event(event, data)
+
+    def run(self) -> bool:
+        """Iterate until the tests pass or a stop condition sets final_status."""
+        try:
+            with span("pipeline", max_iterations=self.state.max_iterations):
+                result = self._run()
+        except BaseException:
+            # Interrupted: don't wait for background test runs to finish
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        self._pool.shutdown(wait=True)
+        return result
+
+    def _discard(self, follow_up: Tuple[Future, Optional[Callable[[], None]]]) -> None:
+        """Throw away a speculative stage once it can no longer touch shared state."""
+        future, undo = follow_up
+        if not future.cancel():
+            try:
+                future.result()
+            except Exception:
+                pass
+            if undo is not None:
+                undo()
+        self._emit("speculation_discarded")
+
+    def _verified(self, passed: bool) -> None:
+        if self.stages.verified is not None:
+            self.stages.verified(passed)
+
+    def _step_done(self, step: str) -> None:
+        if self.checkpoint is not None:
+            self.checkpoint(step)
+
+    def _run(self) -> bool:
+        state, stages = self.state, self.stages
+        speculative: Optional[Tuple[Future, Optional[Callable[[], None]]]] = None
+        iteration = state.current_iteration
+
+        while iteration < state.max_iterations:
+            state.current_iteration = iteration
+            self._emit("iteration_start", max_iterations=state.max_iterations)
+            if speculative is not None:
+                state.plan = speculative[0].result()
+                speculative = None
+                self._emit("plan_reused")
+            else:
+                state.plan = stages.plan(
+                    state.failing_tests, iteration + 1, state.critic_feedback
+                )
+
+            patch = stages.patch(state)
+            if patch is None:
+                state.final_status = "no_patch"
+                return False
+
+            test_files = failing_test_files(state.failing_tests)
+            trial = (
+                self._submit(stages.trial, patch, test_files)
+                if stages.trial is not None
+                else None
+            )
+            approved, reason = stages.review(state, patch)
+            if approved and trial is not None:
+                early = trial.result()
+                if early is None:
+                    approved = False
+                    reason = "Patch does not apply cleanly to the current branch"
+                    state.critic_feedback = reason
+                    self._verified(False)
+            else:
+                # A rejected patch's trial finishes in the background
+                early = None
+
+            if not approved:
+                self._emit("rejected", reason=reason)
+                if iteration >= state.max_iterations - 1:
+                    state.final_status = "patch_rejected"
+                    return False
+                iteration += 1
+                state.current_iteration = iteration
+                self._step_done("critic")
+                continue
+
+            result = stages.apply(state, patch)
+            if not result.get("success"):
+                self._verified(False)
+                state.final_status = (
+                    "patch_rejected"
+                    if result.get("safety_violation")
+                    else "patch_error"
+                )
+                return False
+
+            if early is None:
+                # No trial ran; a targeted run of the failing files stands in
+                early_future = self._submit(stages.run_tests, test_files)
+            else:
+                early_future = None
+
+            def start_follow_up(
+                failures: List[Any],
+            ) -> Optional[Tuple[Future, Optional[Callable[[], None]]]]:
+                if failures and iteration < state.max_iterations - 1:
+                    self._emit("plan_speculative", failures=len(failures))
+                    # The runner's FailingTests, full tracebacks included
+                    fn, args = stages.plan, (list(failures), iteration + 2, None)
+                elif not failures and stages.pr_text is not None:
+                    self._emit("pr_text_speculative")
+                    fn, args = stages.pr_text, (state,)
+                else:
+                    return None
+                mark = stages.speculation_mark
+                undo = mark() if mark is not None else None
+                return self._submit(fn, *args), undo
+
+            full_future = self._submit(stages.run_tests, None)
+            if early_future is not None:
+                early, _ = early_future.result()
+            follow_up = start_follow_up(early)
+            failures, junit_xml = full_future.result()
+            if junit_xml and self.telemetry:
+                self.telemetry.save_test_report(
+                    iteration + 1, junit_xml, report_type="junit"
+                )
+            self._verified(len(failures) < state.total_failures)
+            state.add_failing_tests(failures)
+
+            if state.total_failures == 0:
+                if follow_up is not None and not early:
+                    self.pr_text = follow_up[0].result()
+                else:
+                    if follow_up is not None:
+                        self._discard(follow_up)
+                    if stages.pr_text is not None:
+                        self.pr_text = stages.pr_text(state)
+                state.final_status = "success"
+                return True
+
+            same = sorted(map(_test_name, early)) == sorted(
+                _test_name(t) for t in state.failing_tests
+            )
+            if follow_up is not None and early and same:
+                speculative = follow_up
+            elif follow_up is not None:
+                self._discard(follow_up)
+            state.critic_feedback = None
+            iteration += 1
+            state.current_iteration = iteration
+            self._step_done("verified")
+
+        state.current_iteration = iteration
+        state.final_status = "max_iters"
+        return False
+
+
+__all__ = [
+    "PipelineStages",
+    "PipelinedFixLoop",
+    "failing_test_files",
+    "worktree_trial",
+]
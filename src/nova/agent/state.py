@@ -2,8 +2,8 @@
 Agent state management for Nova CI-Rescue.
 """
 
-from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any
+from dataclasses import dataclass, field, fields
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from pathlib import Path
 import time
@@ -28,6 +28,11 @@ class AgentState:
     )  # Store original failures for PR
     total_failures: int = 0
     initial_failures: int = 0  # Store original count for PR
+    # Full pytest output of the current failures by (file, name), for failure
+    # clustering; kept out of to_dict, so it never reaches telemetry or checkpoints
+    full_tracebacks: Dict[Tuple[str, str], str] = field(
+        default_factory=dict, repr=False
+    )
 
     # Planning information
     plan: Optional[Dict[str, Any]] = None
@@ -58,6 +63,11 @@ class AgentState:
         self.failing_tests = [
             test.to_dict() if hasattr(test, "to_dict") else test for test in tests
         ]
+        self.full_tracebacks = {
+            (test.file, test.name): test.full_traceback
+            for test in tests
+            if getattr(test, "full_traceback", None)
+        }
         self.total_failures = len(self.failing_tests)
 
         # Store initial failures if this is the first time
@@ -102,13 +112,18 @@ class AgentState:
         return elapsed >= self.timeout_seconds
 
     def to_dict(self) -> Dict[str, Any]:
-        """Convert state to dictionary for serialization."""
+        """Convert state to dictionary for serialization; see ``from_dict``."""
         return {
             "repo_path": str(self.repo_path),
             "branch_name": self.branch_name,
             "original_commit": self.original_commit,
+            "verbose": self.verbose,
             "failing_tests": self.failing_tests,
+            "initial_failing_tests": self.initial_failing_tests,
             "total_failures": self.total_failures,
+            "initial_failures": self.initial_failures,
+            "plan": self.plan,
+            "critic_feedback": self.critic_feedback,
             "current_iteration": self.current_iteration,
             "max_iterations": self.max_iterations,
             "timeout_seconds": self.timeout_seconds,
@@ -117,7 +132,33 @@ class AgentState:
                 if isinstance(self.start_time, float)
                 else self.start_time.isoformat()
             ),
+            "current_step": self.current_step,
+            "whole_file_mode": self.whole_file_mode,
+            "used_actions": sorted(self.used_actions, key=repr),
+            "modifications_count": self.modifications_count,
+            "file_cache": self.file_cache,
             "patches_applied": self.patches_applied,
             "test_results": self.test_results,
             "final_status": self.final_status,
         }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgentState":
+        """Rebuild a state saved with ``to_dict``."""
+        data = dict(data)
+        data["repo_path"] = Path(data["repo_path"])
+        start_time = data.get("start_time")
+        if isinstance(start_time, str):
+            data["start_time"] = datetime.fromisoformat(start_time)
+        # JSON turns the action tuples into lists
+        data["used_actions"] = {
+            _as_tuple(action) for action in data.get("used_actions", [])
+        }
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+def _as_tuple(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(_as_tuple(v) for v in value)
+    return value
@@ -3,6 +3,8 @@
 Nova CI-Rescue CLI interface.
 """
 
+from __future__ import annotations
+
 import os
 import re
 import json
@@ -10,24 +12,25 @@ import time
 import subprocess
 import typer
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional
 from datetime import datetime
 from nova.tools.datetime_utils import now_utc, seconds_between
-from rich.console import Console
-from rich.table import Table
 
-from nova.runner import TestRunner
-from nova.agent import AgentState
-from nova.config import NovaSettings, get_settings
-from nova.tools.git import GitBranchManager
-from nova.telemetry.logger import JSONLLogger
+from nova.config import get_settings
+from nova.logger import LazyConsole
+
+# The agent stack (runner, git tooling, telemetry, rich tables) is imported
+# inside the commands that use it, so `nova version` and `nova config` start
+# fast. Track this with scripts/bench_startup.py.
+if TYPE_CHECKING:
+    from nova.agent import AgentState
 
 app = typer.Typer(
     name="nova",
     help="Nova CI-Rescue: Automated test fixing agent",
     add_completion=False,
 )
-console = Console()
+console = LazyConsole()
 
 
 @app.callback(invoke_without_command=True)
@@ -162,6 +165,90 @@ def print_exit_summary(
     console.print()
 
 
+def run_pipelined_loop(
+    state: AgentState, llm_agent, runner, git_manager, telemetry, verbose: bool
+) -> bool:
+    """Run the legacy plan/act/critic loop with overlapping stages."""
+    from nova.agent.pipeline import PipelinedFixLoop, PipelineStages, worktree_trial
+    from nova.nodes.actor import actor_node
+    from nova.nodes.apply_patch import apply_patch as apply_patch_func
+    from nova.nodes.critic import critic_node
+    from nova.runner.test_runner import TestRunner
+
+    def run_tests(test_files):
+        if test_files is None:
+            return runner.run_tests()
+        return TestRunner(
+            state.repo_path,
+            verbose=verbose,
+            pytest_args=" ".join(test_files),
+            timeout=runner.timeout,
+        ).run_tests()
+
+    def apply(state, patch_diff):
+        result = apply_patch_func(
+            state=state, patch_text=patch_diff, git_manager=git_manager, verbose=verbose
+        )
+        if result.get("success"):
+            telemetry.save_patch(state.current_iteration + 1, patch_diff)
+        return result
+
+    def on_event(event, data):
+        if event == "iteration_start":
+            console.print(
+                f"\n[bold]Iteration {data['iteration']}/{data['max_iterations']}[/bold]"
+            )
+        elif event == "rejected":
+            console.print(
+                f"[yellow]⚠️ Critic rejected patch: {data['reason']}[/yellow]"
+            )
+        elif event == "plan_speculative":
+            console.print(
+                f"[dim]Planning iteration {data['iteration'] + 1} while the full"
+                " suite runs...[/dim]"
+            )
+
+    stages = PipelineStages(
+        plan=lambda tests, iteration, feedback: llm_agent.create_plan(
+            tests, iteration, feedback, tracebacks=state.full_tracebacks
+        ),
+        patch=lambda state: actor_node(
+            state=state,
+            llm_agent=llm_agent,
+            telemetry=telemetry,
+            critic_feedback=state.critic_feedback,
+            verbose=verbose,
+        ),
+        review=lambda state, patch_diff: critic_node(
+            state=state,
+            patch_diff=patch_diff,
+            llm_agent=llm_agent,
+            telemetry=telemetry,
+            verbose=verbose,
+        ),
+        apply=apply,
+        run_tests=run_tests,
+        trial=worktree_trial(state.repo_path, timeout=runner.timeout, verbose=verbose),
+        speculation_mark=getattr(llm_agent, "conversation_mark", None),
+        verified=getattr(llm_agent, "record_verification", None),
+    )
+    loop = PipelinedFixLoop(
+        state,
+        stages,
+        telemetry=telemetry,
+        on_event=on_event,
+        checkpoint=git_manager.checkpointer.save,
+    )
+    success = loop.run()
+    if success:
+        console.print("\n[green bold]✅ SUCCESS - All tests fixed![/green bold]")
+    elif state.final_status == "no_patch":
+        console.print("[red]❌ No patch could be generated by the agent[/red]")
+    elif state.final_status == "patch_error":
+        console.print("[red]❌ Failed to apply patch[/red]")
+    return success
+
+
 @app.command()
 def fix(
     repo_path: Path = typer.Argument(
@@ -210,13 +297,27 @@ def fix(
         help="Use the legacy v1.0 LLM-based agent instead of the default LangChain Deep Agent",
         is_flag=True,
     ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="Continue an interrupted run from its checkpoint in .nova/ instead of starting over",
+    ),
 ):
     """
     Fix failing tests in a repository using an AI agent.
 
     By default, uses the Nova Deep Agent (LangChain-based) for iterative fixes.
     Use the --legacy-agent flag to run the deprecated v1.0 LLM-based agent pipeline.
+    Use --resume to continue a run that was interrupted (Ctrl+C, CI timeout).
     """
+    from rich.table import Table
+
+    from nova.agent import AgentState
+    from nova.agent.checkpoint import Checkpointer, load_checkpoint
+    from nova.runner import TestRunner
+    from nova.telemetry.logger import JSONLLogger
+    from nova.tools.git import GitBranchManager
+
     # Load configuration file if provided
     config_data = None
     if config_file is not None:
@@ -226,507 +327,71 @@ def fix(
             console.print(f"[red]Failed to load config: {e}[/red]")
             raise typer.Exit(1)
 
-    # If config specifies a different repo_path and CLI used default ".", override
-    if config_data and config_data.repo_path:
-        default_repo = Path(".").resolve()
-        if repo_path.resolve() == default_repo:
-            repo_path = Path(config_data.repo_path)
-
-    # Determine effective iteration count and timeout
-    final_max_iters = (
-        max_iters
-        if max_iters is not None
-        else (
-            config_data.max_iters
-            if config_data and config_data.max_iters is not None
-            else 6
-        )
-    )
-    final_timeout = (
-        timeout
-        if timeout is not None
-        else (
-            config_data.timeout
-            if config_data and config_data.timeout is not None
-            else 1200
-        )
-    )
-
-    console.print("[green]Nova CI-Rescue[/green] 🚀")
-    if config_file:
-        console.print(f"[dim]Loaded configuration from {config_file}[/dim]")
-
-    # Initialize Git branch management
-    git_manager = GitBranchManager(repo_path)
-    state = None
-    telemetry = None
-    success = False
-
-    # Check for concurrent runs
-
-    try:
-        branch_name = git_manager.create_fix_branch()
-        console.print(f"[dim]Working on branch: {branch_name}[/dim]")
-
-        # Set up Ctrl+C signal handler for clean abort
-        git_manager.setup_signal_handler()
-
-        # Initialize settings and telemetry
-        settings = NovaSettings()
-        if config_data and config_data.model:
-            settings.default_llm_model = config_data.model
-        telemetry = JSONLLogger()
-        telemetry.log_event(
-            "run_start",
-            {
-                "repo": str(repo_path),
-                "model": settings.default_llm_model,
-                "max_iterations": final_max_iters,
-                "timeout": final_timeout,
-            },
-        )
-
-        # Initialize agent state and run initial tests
-        state = AgentState(
-            repo_path=repo_path,
-            max_iterations=final_max_iters,
-            timeout_seconds=final_timeout,
-        )
-
-        # Step 1: Run tests to identify initial failures
-        runner = TestRunner(repo_path, verbose=verbose)
-        failing_tests, initial_junit_xml = runner.run_tests(max_failures=5)
-
-        # Optional fault localization (mark suspected files based on tracebacks)
-        try:
-            from nova.runner.test_runner import FaultLocalizer
-
-            FaultLocalizer.localize_failures(failing_tests, coverage_data=None)
-        except Exception:
-            pass
-
-        # Save initial test report
-        if initial_junit_xml:
-            telemetry.save_test_report(0, initial_junit_xml, report_type="junit")
-
-        # Record initial failures in state
-        state.add_failing_tests(failing_tests)
-        telemetry.log_event(
-            "test_discovery",
-            {
-                "total_failures": state.total_failures,
-                "failing_tests": state.failing_tests,
-                "initial_report_saved": initial_junit_xml is not None,
-            },
-        )
-
-        # If no failures, nothing to fix
-        if not failing_tests:
-            console.print(
-                "[green]✅ No failing tests found! Repository is already green.[/green]"
-            )
-            state.final_status = "success"
-            telemetry.log_event("completion", {"status": "no_failures"})
-            telemetry.end_run(success=True)
-            # Post no-failure result to GitHub if applicable
-            token = os.getenv("GITHUB_TOKEN")
-            repo = os.getenv("GITHUB_REPOSITORY")
-            pr_num = os.getenv("PR_NUMBER")
-            if not pr_num:
-                pr_num = os.getenv("GITHUB_EVENT_NUMBER")
-                if not pr_num:
-                    github_ref = os.getenv("GITHUB_REF")
-                    if github_ref and "pull/" in github_ref:
-                        match = re.search(r"pull/(\d+)/", github_ref)
-                        if match:
-                            pr_num = match.group(1)
-                if not pr_num:
-                    event_path = os.getenv("GITHUB_EVENT_PATH")
-                    if event_path and os.path.exists(event_path):
-                        try:
-                            with open(event_path, "r") as f:
-                                event_data = json.load(f)
-                            if "pull_request" in event_data:
-                                pr_num = str(event_data["pull_request"]["number"])
-                        except Exception:
-                            pass
-            if token and repo:
-                try:
-                    from nova.github_integration import (
-                        GitHubAPI,
-                        RunMetrics,
-                        ReportGenerator,
-                    )
-
-                    api = GitHubAPI(token)
-                    metrics = RunMetrics(
-                        runtime_seconds=0,
-                        iterations=0,
-                        files_changed=0,
-                        status="success",
-                        tests_fixed=0,
-                        tests_remaining=0,
-                        initial_failures=0,
-                        final_failures=0,
-                    )
-                    head_sha = git_manager._get_current_head() if git_manager else None
-                    if head_sha:
-                        api.create_check_run(
-                            repo=repo,
-                            sha=head_sha,
-                            name="CI-Auto-Rescue",
-                            status="completed",
-                            conclusion="success",
-                            title="CI-Auto-Rescue: No failing tests",
-                            summary="✅ No failing tests found - repository is already green!",
-                        )
-                        if verbose:
-                            console.print("[dim]✅ Posted check run to GitHub[/dim]")
-                    if pr_num:
-                        api.create_pr_comment(
-                            repo=repo,
-                            pr_number=int(pr_num),
-                            body="## ✅ Nova CI-Rescue: No failing tests to fix! 🎉\n\nAll tests are passing.",
-                        )
-                        if verbose:
-                            console.print("[dim]✅ Posted PR comment to GitHub[/dim]")
-                except Exception as e:
-                    if verbose:
-                        console.print(
-                            f"[yellow]⚠️ GitHub reporting failed: {e}[/yellow]"
-                        )
-            return
-
-            # Display failing tests summary table (up to first 10 failures)
-            console.print(
-                f"\n[bold red]Found {len(failing_tests)} failing test(s):[/bold red]"
-            )
-            table = Table(
-                title="Failing Tests", show_header=True, header_style="bold magenta"
-            )
-        table.add_column("Test Name", style="cyan", no_wrap=False)
-        table.add_column("Location", style="yellow")
-        table.add_column("Error", style="red", no_wrap=False)
-        for test in failing_tests[:10]:
-            location = f"{test.file}:{test.line}" if hasattr(test, "file") else "N/A"
-            location = f"{test.file}:{test.line}" if hasattr(test, "file") else "N/A"
-            error_preview = (
-                test.short_traceback.split("\n")[0]
-                if hasattr(test, "short_traceback")
-                else str(test)
-            )
-            if len(error_preview) > 60:
-                error_preview = error_preview[:60] + "..."
-            name = getattr(test, "name", str(test))
-            table.add_row(name, location, error_preview)
-        if len(failing_tests) > 10:
-            table.add_row("...", f"... and {len(failing_tests)-10} more", "")
-        console.print(table)
-        console.print()
-
-        # Prepare safety limits configuration from YAML (if provided)
-        safety_conf = None
-        if config_data:
-            from nova.tools.safety_limits import SafetyConfig
-
-            safety_conf_obj = SafetyConfig()
-            custom_limits = False
-            if config_data.max_changed_lines is not None:
-                safety_conf_obj.max_lines_changed = config_data.max_changed_lines
-                custom_limits = True
-            if config_data.max_changed_files is not None:
-                safety_conf_obj.max_files_modified = config_data.max_changed_files
-                custom_limits = True
-            if config_data.blocked_paths:
-                for pattern in config_data.blocked_paths:
-                    if pattern not in safety_conf_obj.denied_paths:
-                        safety_conf_obj.denied_paths.append(pattern)
-                custom_limits = True
-            if custom_limits:
-                safety_conf = safety_conf_obj
-
-        # Either run the Deep Agent or the legacy agent loop
-        success = False
-        if not legacy_agent:
-            # === Deep Agent Path (default) ===
-            console.print("\n[bold]Initializing Nova Deep Agent...[/bold]")
-            from nova.agent.deep_agent import NovaDeepAgent
-
-            deep_agent = NovaDeepAgent(
-                state=state,
-                telemetry=telemetry,
-                git_manager=git_manager,
-                verbose=verbose,
-                safety_config=safety_conf,
-            )
-            console.print("[cyan]🤖 Running Deep Agent to fix failing tests...[/cyan]")
-            runner = TestRunner(repo_path, verbose=verbose)
-            failures_summary = runner.format_failures_table(failing_tests)
-            error_details = "\n\n".join(
-                test.short_traceback for test in failing_tests[:3]
-            )
-            code_snippets = ""
-            success = deep_agent.run(
-                failures_summary=failures_summary,
-                error_details=error_details,
-                code_snippets=code_snippets,
-            )
-            # Deep Agent handles iterations internally; no explicit loop needed here.
-            if success:
-                console.print(
-                    "\n[green bold]✅ SUCCESS - All tests fixed![/green bold]"
-                )
-                state.final_status = "success"
-            else:
-                console.print(
-                    "\n[red bold]❌ FAILED - Some tests could not be fixed.[/red bold]"
-                )
-                if state.final_status == "max_iters":
-                    console.print(
-                        f"[yellow]Reached maximum iterations ({state.max_iterations}) without full success.[/yellow]"
-                    )
-                elif state.final_status == "error":
-                    console.print(
-                        "[yellow]Agent encountered an error during execution.[/yellow]"
-                    )
-        else:
-            # === Legacy Agent Path (deprecated v1.0 approach) ===
-            console.print(
-                "\n[bold]⚠️ Running legacy LLM-based agent (deprecated)...[/bold]"
-            )
-            from nova.agent.llm_agent import LLMAgent
-            from nova.nodes.planner import planner_node
-            from nova.nodes.actor import actor_node
-            from nova.nodes.critic import critic_node
-            from nova.nodes.apply_patch import apply_patch as apply_patch_func
-
-            # Initialize the legacy LLM agent
-            llm_agent = LLMAgent(repo_path=repo_path, model=settings.default_llm_model)
-
-            iteration = 0
-            while iteration < state.max_iterations:
-                console.print(
-                    f"\n[bold]Iteration {iteration+1}/{state.max_iterations}[/bold]"
-                )
-                # Planner: generate a plan (stored in state.plan)
-                planner_node(
-                    state=state,
-                    llm_agent=llm_agent,
-                    telemetry=telemetry,
-                    verbose=verbose,
-                )
-                # Actor: generate a patch diff based on the plan (and any critic feedback)
-                patch_diff = actor_node(
-                    state=state,
-                    llm_agent=llm_agent,
-                    telemetry=telemetry,
-                    critic_feedback=state.critic_feedback,
-                    verbose=verbose,
-                )
-                if patch_diff is None:
-                    # No patch could be generated
-                    console.print(
-                        "[red]❌ No patch could be generated by the agent[/red]"
-                    )
-                    state.final_status = "no_patch"
-                    break
-
-                # Critic: review the proposed patch using LLM
-                approved, reason = critic_node(
-                    state=state,
-                    patch_diff=patch_diff,
-                    llm_agent=llm_agent,
-                    telemetry=telemetry,
-                    verbose=verbose,
-                )
-                if not approved:
-                    # Critic rejected the patch – provide feedback and iterate again (no patch applied)
-                    console.print(f"[yellow]⚠️ Critic rejected patch: {reason}[/yellow]")
-                    # If this was the last allowed iteration, exit
-                    if iteration >= state.max_iterations - 1:
-                        state.final_status = "patch_rejected"
-                        break
-                    # Otherwise, continue to next iteration with critic feedback (stored in state.critic_feedback)
-                    iteration += 1
-                    continue
-
-                # Apply the approved patch to the repository
-                result = apply_patch_func(
-                    state=state,
-                    patch_text=patch_diff,
-                    git_manager=git_manager,
-                    verbose=verbose,
-                )
-                if not result.get("success"):
-                    console.print(
-                        f"[red]❌ Failed to apply patch (iteration {iteration+1})[/red]"
-                    )
-                    # Determine failure reason (safety or apply error)
-                    if result.get("safety_violation"):
-                        console.print(
-                            f"[yellow]Safety violation: {result.get('safety_message', 'unknown')}[/yellow]"
-                        )
-                        state.final_status = "patch_rejected"
-                    else:
-                        state.final_status = "patch_error"
-                        break
-
-                # Patch successfully applied and committed; save patch diff and run tests again
-                telemetry.save_patch(iteration + 1, patch_diff)
-                runner = TestRunner(repo_path, verbose=verbose)
-                new_failures, junit_xml = runner.run_tests(max_failures=5)
-                if junit_xml:
-                    telemetry.save_test_report(
-                        iteration + 1, junit_xml, report_type="junit"
-                    )
-                state.add_failing_tests(new_failures)
-                if state.total_failures == 0:
-                    console.print(
-                        "\n[green bold]✅ SUCCESS - All tests fixed![/green bold]"
-                    )
-                    success = True
-                    state.final_status = "success"
-                    break
-                else:
-                    console.print(
-                        f"[cyan]🔄 {state.total_failures} tests still failing, continuing to next iteration...[/cyan]"
-                    )
-                    # Prepare for next iteration (failure details will feed the next plan)
-                    iteration += 1
-                    state.current_iteration = iteration
-                    # (Critic feedback cleared on patch approval; state.plan will be updated by next planner_node)
-                    continue
-
-            # If loop ended without setting final_status, it means max iterations reached
-            if state.final_status is None or (
-                state.final_status
-                not in {"success", "patch_error", "patch_rejected", "no_patch"}
-            ):
-                # Reached max iterations without full success
-                state.final_status = "max_iters"
-                console.print(
-                    f"\n[red bold]❌ FAILED - Reached max iterations ({state.max_iterations}) with tests still failing.[/red bold]"
-                )
-            # Log completion status
-            telemetry.log_event(
-                "completion",
-                {
-                    "status": state.final_status,
-                    "iterations": state.current_iteration,
-                    "total_patches": len(state.patches_applied),
-                    "final_failures": state.total_failures,
-                },
-            )
-        # Print comprehensive exit summary
-        if state and state.final_status:
-            elapsed = (datetime.now() - state.start_time).total_seconds()
-            print_exit_summary(state, state.final_status, elapsed_seconds=elapsed)
-
-        telemetry.end_run(success=(state.final_status == "success"))
-
-        # GitHub integration: post results to PR if in CI environment
-        token = os.getenv("GITHUB_TOKEN")
-        repo = os.getenv("GITHUB_REPOSITORY")
-        pr_num = os.getenv("PR_NUMBER") or os.getenv("GITHUB_EVENT_NUMBER") or None
-        if not pr_num:
-            github_ref = os.getenv("GITHUB_REF")
-            if github_ref and "pull/" in github_ref:
-                match = re.search(r"pull/(\d+)/", github_ref)
-                if match:
-                    pr_num = match.group(1)
-            if not pr_num:
-                event_path = os.getenv("GITHUB_EVENT_PATH")
-                if event_path and os.path.exists(event_path):
-                    try:
-                        with open(event_path, "r") as f:
-                            event_data = json.load(f)
-                        if "pull_request" in event_data:
-                            pr_num = str(event_data["pull_request"]["number"])
-                    except Exception:
-                        pass
-        if token and repo:
-            try:
-                from nova.github_integration import (
-                    GitHubAPI,
-                    RunMetrics,
-                    ReportGenerator,
-                )
+    # If config specifies a different repo_path and CLI used default ".", override
+    if config_data and config_data.repo_path:
+        default_repo = Path(".").resolve()
+        if repo_path.resolve() == default_repo:
+            repo_path = Path(config_data.repo_path)
 
-                elapsed = (datetime.now() - state.start_time).total_seconds()
-                # Count unique files changed across all applied patches
-                files_changed = set()
-                if state.patches_applied:
-                    from nova.tools.safety_limits import SafetyLimits
+    # Determine effective iteration count and timeout
+    final_max_iters = (
+        max_iters
+        if max_iters is not None
+        else (
+            config_data.max_iters
+            if config_data and config_data.max_iters is not None
+            else 6
+        )
+    )
+    final_timeout = (
+        timeout
+        if timeout is not None
+        else (
+            config_data.timeout
+            if config_data and config_data.timeout is not None
+            else 1200
+        )
+    )
 
-                    safety = SafetyLimits()
-                    for patch in state.patches_applied:
-                        analysis = safety.analyze_patch(patch)
-                        files_changed.update(
-                            analysis.files_modified | analysis.files_added
-                        )
-                metrics = RunMetrics(
-                    runtime_seconds=int(elapsed),
-                    iterations=state.current_iteration,
-                    files_changed=len(files_changed),
-                    status="success" if success else (state.final_status or "failure"),
-                    tests_fixed=(
-                        len(state.failing_tests) - state.total_failures
-                        if state.failing_tests
-                        else 0
-                    ),
-                    tests_remaining=state.total_failures,
-                    initial_failures=(
-                        len(state.failing_tests) if state.failing_tests else 0
-                    ),
-                    final_failures=state.total_failures,
-                    branch_name=branch_name,
-                )
-                api = GitHubAPI(token)
-                generator = ReportGenerator()
-                head_sha = git_manager._get_current_head() if git_manager else None
-                if head_sha:
-                    api.create_check_run(
-                        repo=repo,
-                        sha=head_sha,
-                        name="CI-Auto-Rescue",
-                        status="completed",
-                        conclusion="success" if success else "failure",
-                        title=f"CI-Auto-Rescue: {metrics.status.upper()}",
-                        summary=generator.generate_check_summary(metrics),
-                    )
-                    if verbose:
-                        console.print("[dim]✅ Posted check run to GitHub[/dim]")
-                if pr_num:
-                    existing_id = api.find_pr_comment(
-                        repo, int(pr_num), "<!-- ci-auto-rescue-report -->"
-                    )
-                    comment_body = generator.generate_pr_comment(metrics)
-                    if existing_id:
-                        api.update_pr_comment(repo, existing_id, comment_body)
-                        if verbose:
-                            console.print("[dim]✅ Updated existing PR comment[/dim]")
-                    else:
-                        api.create_pr_comment(repo, int(pr_num), comment_body)
-                        if verbose:
-                            console.print("[dim]✅ Created new PR comment[/dim]")
-            except Exception as e:
-                console.print(f"[yellow]⚠️ GitHub reporting failed: {e}[/yellow]")
-                if verbose:
-                    import traceback
+    console.print("[green]Nova CI-Rescue[/green] 🚀")
+    if config_file:
+        console.print(f"[dim]Loaded configuration from {config_file}[/dim]")
 
-                    console.print(f"[dim]{traceback.format_exc()}[/dim]")
+    # Initialize Git branch management
+    git_manager = GitBranchManager(repo_path)
+    state = None
+    telemetry = None
+    success = False
+
+    checkpoint = None
+    if resume:
+        checkpoint = load_checkpoint(repo_path)
+        if checkpoint is None:
+            console.print("[red]No checkpoint to resume in .nova/checkpoint.json[/red]")
+            raise typer.Exit(1)
+
+    # Check for concurrent runs
 
-        branch_name = git_manager.create_fix_branch()
+    try:
+        if checkpoint is not None:
+            branch_name = git_manager.resume_fix_branch(checkpoint)
+            console.print(
+                f"[dim]Resuming from checkpoint ({checkpoint.step}, iteration "
+                f"{checkpoint.state.current_iteration + 1})[/dim]"
+            )
+        else:
+            branch_name = git_manager.create_fix_branch()
         console.print(f"[dim]Working on branch: {branch_name}[/dim]")
 
         # Set up Ctrl+C signal handler for clean abort
         git_manager.setup_signal_handler()
 
         # Initialize settings and telemetry
-        settings = NovaSettings()
+        settings = get_settings().model_copy()
         if config_data and config_data.model:
             settings.default_llm_model = config_data.model
-        telemetry = JSONLLogger()
+        telemetry = JSONLLogger(settings, enabled=settings.enable_telemetry)
+        telemetry.start_run(repo_path)
         telemetry.log_event(
             "run_start",
             {
@@ -734,19 +399,28 @@ def fix(
                 "model": settings.default_llm_model,
                 "max_iterations": final_max_iters,
                 "timeout": final_timeout,
+                "resumed": checkpoint is not None,
             },
         )
 
         # Initialize agent state
-        state = AgentState(
-            repo_path=repo_path,
-            max_iterations=final_max_iters,
-            timeout_seconds=final_timeout,
-        )
+        if checkpoint is not None:
+            state = checkpoint.state
+        else:
+            state = AgentState(
+                repo_path=repo_path,
+                max_iterations=final_max_iters,
+                timeout_seconds=final_timeout,
+            )
+        git_manager.checkpointer = Checkpointer(state, git_manager)
 
         # Step 1: Run tests to identify initial failures
         runner = TestRunner(repo_path, verbose=verbose)
-        failing_tests, initial_junit_xml = runner.run_tests(max_failures=5)
+        if checkpoint is not None:
+            # Pick up the saved results instead of re-running discovery
+            failing_tests, initial_junit_xml = checkpoint.failing_tests(), None
+        else:
+            failing_tests, initial_junit_xml = runner.run_tests()
 
         # Optional fault localization (mark suspected files based on tracebacks)
         try:
@@ -770,6 +444,7 @@ def fix(
                 "initial_report_saved": initial_junit_xml is not None,
             },
         )
+        git_manager.checkpointer.save("discovery")
 
         # If no failures, nothing to fix
         if not failing_tests:
@@ -899,6 +574,16 @@ def fix(
 
         # Either run the Deep Agent or the legacy agent loop
         success = False
+        llm_agent = None
+        if not legacy_agent:
+            try:
+                import nova.agent.deep_agent  # noqa: F401
+            except ImportError:
+                console.print(
+                    "[yellow]Deep Agent is not installed; using the LLM agent loop"
+                    "[/yellow]"
+                )
+                legacy_agent = True
         if not legacy_agent:
             # === Deep Agent Path (default) ===
             console.print("\n[bold]Initializing Nova Deep Agent...[/bold]")
@@ -945,107 +630,124 @@ def fix(
             console.print(
                 "\n[bold]⚠️ Running legacy LLM-based agent (deprecated)...[/bold]"
             )
-            from nova.agent.llm_agent import LLMAgent
+            from nova.agent.llm_agent_enhanced import EnhancedLLMAgent
             from nova.nodes.planner import planner_node
             from nova.nodes.actor import actor_node
             from nova.nodes.critic import critic_node
             from nova.nodes.apply_patch import apply_patch as apply_patch_func
 
-            # Initialize the legacy LLM agent
-            llm_agent = LLMAgent(repo_path=repo_path, model=settings.default_llm_model)
+            # Planner, actor and critic with model routing, shared sessions
+            # and failure clustering
+            llm_agent = EnhancedLLMAgent(repo_path=repo_path, verbose=verbose)
 
-            iteration = 0
-            while iteration < state.max_iterations:
-                console.print(
-                    f"\n[bold]Iteration {iteration+1}/{state.max_iterations}[/bold]"
+            if settings.pipelined_loop:
+                success = run_pipelined_loop(
+                    state, llm_agent, runner, git_manager, telemetry, verbose
                 )
-                # Planner: generate a plan (stored in state.plan)
-                planner_node(
-                    state=state,
-                    llm_agent=llm_agent,
-                    telemetry=telemetry,
-                    verbose=verbose,
-                )
-                # Actor: generate a patch diff based on the plan (and any critic feedback)
-                patch_diff = actor_node(
-                    state=state,
-                    llm_agent=llm_agent,
-                    telemetry=telemetry,
-                    critic_feedback=state.critic_feedback,
-                    verbose=verbose,
+            else:
+                # Test results, not the critic, tell the router how a patch did
+                verified = getattr(llm_agent, "record_verification", None) or (
+                    lambda passed: None
                 )
-                if patch_diff is None:
-                    # No patch could be generated
+                iteration = state.current_iteration
+                while iteration < state.max_iterations:
                     console.print(
-                        "[red]❌ No patch could be generated by the agent[/red]"
+                        f"\n[bold]Iteration {iteration+1}/{state.max_iterations}[/bold]"
                     )
-                    state.final_status = "no_patch"
-                    break
-
-                # Critic: review the proposed patch using LLM
-                approved, reason = critic_node(
-                    state=state,
-                    patch_diff=patch_diff,
-                    llm_agent=llm_agent,
-                    telemetry=telemetry,
-                    verbose=verbose,
-                )
-                if not approved:
-                    # Critic rejected the patch – provide feedback and iterate again (no patch applied)
-                    console.print(f"[yellow]⚠️ Critic rejected patch: {reason}[/yellow]")
-                    # If this was the last allowed iteration, exit
-                    if iteration >= state.max_iterations - 1:
-                        state.final_status = "patch_rejected"
-                        break
-                    # Otherwise, continue to next iteration with critic feedback (stored in state.critic_feedback)
-                    iteration += 1
-                    continue
-
-                # Apply the approved patch to the repository
-                result = apply_patch_func(
-                    state=state,
-                    patch_text=patch_diff,
-                    git_manager=git_manager,
-                    verbose=verbose,
-                )
-                if not result.get("success"):
-                    console.print(
-                        f"[red]❌ Failed to apply patch (iteration {iteration+1})[/red]"
+                    # Planner: generate a plan (stored in state.plan)
+                    planner_node(
+                        state=state,
+                        llm_agent=llm_agent,
+                        telemetry=telemetry,
+                        verbose=verbose,
                     )
-                    # Determine failure reason (safety or apply error)
-                    if result.get("safety_violation"):
+                    # Actor: generate a patch diff based on the plan (and any critic feedback)
+                    patch_diff = actor_node(
+                        state=state,
+                        llm_agent=llm_agent,
+                        telemetry=telemetry,
+                        critic_feedback=state.critic_feedback,
+                        verbose=verbose,
+                    )
+                    if patch_diff is None:
+                        # No patch could be generated
                         console.print(
-                            f"[yellow]Safety violation: {result.get('safety_message', 'unknown')}[/yellow]"
+                            "[red]❌ No patch could be generated by the agent[/red]"
                         )
-                        state.final_status = "patch_rejected"
-                    else:
-                        state.final_status = "patch_error"
-                    break
-
-                # Patch successfully applied and committed; save patch diff and run tests again
-                telemetry.save_patch(iteration + 1, patch_diff)
-                new_failures, junit_xml = runner.run_tests(max_failures=5)
-                if junit_xml:
-                    telemetry.save_test_report(
-                        iteration + 1, junit_xml, report_type="junit"
-                    )
-                state.add_failing_tests(new_failures)
-                if state.total_failures == 0:
-                    console.print(
-                        "\n[green bold]✅ SUCCESS - All tests fixed![/green bold]"
+                        state.final_status = "no_patch"
+                        break
+
+                    # Critic: review the proposed patch using LLM
+                    approved, reason = critic_node(
+                        state=state,
+                        patch_diff=patch_diff,
+                        llm_agent=llm_agent,
+                        telemetry=telemetry,
+                        verbose=verbose,
                     )
-                    success = True
-                    state.final_status = "success"
-                    break
-                else:
-                    console.print(
-                        f"[cyan]🔄 {state.total_failures} tests still failing, continuing to next iteration...[/cyan]"
+                    if not approved:
+                        # Critic rejected the patch – provide feedback and iterate again (no patch applied)
+                        console.print(
+                            f"[yellow]⚠️ Critic rejected patch: {reason}[/yellow]"
+                        )
+                        # If this was the last allowed iteration, exit
+                        if iteration >= state.max_iterations - 1:
+                            state.final_status = "patch_rejected"
+                            break
+                        # Otherwise, continue to next iteration with critic feedback (stored in state.critic_feedback)
+                        iteration += 1
+                        state.current_iteration = iteration
+                        git_manager.checkpointer.save("critic")
+                        continue
+
+                    # Apply the approved patch to the repository
+                    result = apply_patch_func(
+                        state=state,
+                        patch_text=patch_diff,
+                        git_manager=git_manager,
+                        verbose=verbose,
                     )
-                    # Prepare for next iteration (failure details will feed the next plan)
-                    iteration += 1
-                    state.current_iteration = iteration
-                    # (Critic feedback cleared on patch approval; state.plan will be updated by next planner_node)
-                    continue
+                    if not result.get("success"):
+                        verified(False)
+                        console.print(
+                            f"[red]❌ Failed to apply patch (iteration {iteration+1})[/red]"
+                        )
+                        # Determine failure reason (safety or apply error)
+                        if result.get("safety_violation"):
+                            console.print(
+                                f"[yellow]Safety violation: {result.get('safety_message', 'unknown')}[/yellow]"
+                            )
+                            state.final_status = "patch_rejected"
+                        else:
+                            state.final_status = "patch_error"
+                        break
+
+                    # Patch successfully applied and committed; save patch diff and run tests again
+                    telemetry.save_patch(iteration + 1, patch_diff)
+                    new_failures, junit_xml = runner.run_tests()
+                    if junit_xml:
+                        telemetry.save_test_report(
+                            iteration + 1, junit_xml, report_type="junit"
+                        )
+                    verified(len(new_failures) < state.total_failures)
+                    state.add_failing_tests(new_failures)
+                    if state.total_failures == 0:
+                        console.print(
+                            "\n[green bold]✅ SUCCESS - All tests fixed![/green bold]"
+                        )
+                        success = True
+                        state.final_status = "success"
+                        break
+                    else:
+                        console.print(
+                            f"[cyan]🔄 {state.total_failures} tests still failing, continuing to next iteration...[/cyan]"
+                        )
+                        # Prepare for next iteration (failure details will feed the next plan)
+                        iteration += 1
+                        state.current_iteration = iteration
+                        git_manager.checkpointer.save("verified")
+                        # (Critic feedback cleared on patch approval; state.plan will be updated by next planner_node)
+                        continue
 
             # If loop ended without setting final_status, it means max iterations reached
             if state.final_status is None or (
@@ -1059,21 +761,23 @@ def fix(
                 )
 
         # Log completion status
-        telemetry.log_event(
-            "completion",
-            {
-                "status": state.final_status,
-                "iterations": state.current_iteration,
-                "total_patches": len(state.patches_applied),
-                "final_failures": state.total_failures,
-            },
-        )
+        completion = {
+            "status": state.final_status,
+            "iterations": state.current_iteration,
+            "total_patches": len(state.patches_applied),
+            "final_failures": state.total_failures,
+        }
+        if llm_agent is not None:
+            # Turns and tokens of the shared planner/actor/critic conversations
+            completion["llm_sessions"] = llm_agent.session_usage()
+        telemetry.log_event("completion", completion)
         # Print comprehensive exit summary
         if state and state.final_status:
             elapsed = (datetime.now() - state.start_time).total_seconds()
             print_exit_summary(state, state.final_status, elapsed_seconds=elapsed)
 
         telemetry.end_run(success=(state.final_status == "success"))
+        git_manager.checkpointer.clear()
 
         # GitHub integration: post results to PR if in CI environment
         token = os.getenv("GITHUB_TOKEN")
@@ -1207,6 +911,36 @@ def eval(
         "-o",
         help="Output directory for results",
     ),
+    jobs: Optional[int] = typer.Option(
+        None,
+        "--jobs",
+        "-j",
+        help="Cases to run at once (default: the suite's concurrency)",
+        min=1,
+    ),
+    baseline: Optional[Path] = typer.Option(
+        None,
+        "--baseline",
+        "-b",
+        help="Previous results.json to compare against",
+        exists=True,
+        dir_okay=False,
+    ),
+    tolerance: float = typer.Option(
+        20.0,
+        "--tolerance",
+        help="Percent growth in wall time or tokens counted as a regression",
+    ),
+    keep: bool = typer.Option(
+        False, "--keep", help="Keep each case's scratch repo for inspection"
+    ),
+    mock_llm: Optional[Path] = typer.Option(
+        None,
+        "--mock-llm",
+        help="Answer LLM calls offline from this mock script (see `nova mock-llm`)",
+        exists=True,
+        dir_okay=False,
+    ),
     verbose: bool = typer.Option(
         False,
         "--verbose",
@@ -1216,13 +950,105 @@ def eval(
 ):
     """
     Evaluate Nova on multiple repositories.
+
+    Runs every case of a YAML suite in parallel, each on an isolated copy, and
+    writes results.json and report.md. Exits 1 on regressions vs --baseline.
     """
+    from datetime import datetime, timezone
+
+    from rich.table import Table
+
+    from nova.evaluation import (
+        compare,
+        load_suite,
+        run_suite,
+        summarize,
+        write_reports,
+    )
+
     console.print("[green]Nova CI-Rescue Evaluation[/green] 🔬")
     console.print(f"Loading evaluation config from: {eval_file}")
+    try:
+        suite = load_suite(eval_file)
+    except Exception as e:
+        console.print(f"[red]Invalid evaluation config: {e}[/red]")
+        raise typer.Exit(1)
+
+    if output_dir is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output_dir = Path("eval-results") / f"{suite.name}-{stamp}"
+    workers = jobs or suite.concurrency
+    console.print(
+        f"Running {len(suite.cases)} case(s), {workers} at a time -> {output_dir}"
+    )
+
+    def on_result(result) -> None:
+        color = "green" if result.success else "red"
+        console.print(
+            f"  [{color}]{result.status:<8}[/{color}] {result.name} "
+            f"({result.wall_seconds}s, iterations: {result.iterations or '-'})"
+        )
+        if verbose and result.error:
+            console.print(f"[dim]    {result.error}[/dim]")
+
+    mock_server = None
+    if mock_llm is not None:
+        from nova.agent.mock_llm import MockLLMServer, load_script
 
-    # Implementation placeholder
-    console.print("[yellow]Evaluation mode not fully implemented yet[/yellow]")
-    raise typer.Exit(0)
+        try:
+            mock_server = MockLLMServer(load_script(mock_llm))
+        except Exception as e:
+            console.print(f"[red]Invalid mock script: {e}[/red]")
+            raise typer.Exit(1)
+        mock_server.serve_in_background()
+        # Inherited by every case; offline calls stay out of the real ledger
+        os.environ["NOVA_LLM_BASE_URL"] = mock_server.base_url
+        os.environ["NOVA_USAGE_DB"] = str(Path(output_dir).resolve() / "usage.db")
+        console.print(f"Serving LLM calls from {mock_llm} at {mock_server.base_url}")
+
+    try:
+        results = run_suite(
+            suite, output_dir, jobs=jobs, keep=keep, on_result=on_result
+        )
+    finally:
+        if mock_server is not None:
+            mock_server.shutdown()
+            mock_server.server_close()
+    report = summarize(suite.name, results)
+    comparison = None
+    if baseline is not None:
+        comparison = compare(
+            report, json.loads(baseline.read_text()), tolerance_pct=tolerance
+        )
+    write_reports(output_dir, report, comparison)
+
+    summary = report["summary"]
+    table = Table(title=f"Eval: {suite.name}")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_row(
+        "Success rate",
+        f"{summary['successes']}/{summary['cases']} ({summary['success_rate']:.0%})",
+    )
+    table.add_row("Median wall time", f"{summary['median_wall_seconds']}s")
+    table.add_row("Iterations to success", str(summary["mean_iterations_to_success"]))
+    table.add_row(
+        "LLM / test time", f"{summary['llm_seconds']}s / {summary['test_seconds']}s"
+    )
+    table.add_row(
+        "Tokens in / out",
+        f"{summary['prompt_tokens']} / {summary['completion_tokens']}",
+    )
+    console.print(table)
+    console.print(f"Reports: {output_dir / 'results.json'}, {output_dir / 'report.md'}")
+
+    if comparison is not None:
+        if comparison["regressions"]:
+            console.print("[red]Regressions vs baseline:[/red]")
+            for regression in comparison["regressions"]:
+                console.print(f"  [red]- {regression}[/red]")
+            raise typer.Exit(1)
+        console.print("[green]No regressions vs baseline[/green]")
 
 
 @app.command()
@@ -1421,6 +1247,225 @@ def config():
         raise typer.Exit(1)
 
 
+@app.command()
+def trace(
+    paths: Optional[List[Path]] = typer.Argument(
+        None,
+        help="trace.jsonl files, run directories or telemetry roots (default: NOVA_TELEMETRY_DIR)",
+    ),
+    json_output: bool = typer.Option(False, "--json", help="Print the report as JSON"),
+    top: int = typer.Option(10, "--top", help="Number of slowest tests to show"),
+    prices: Optional[Path] = typer.Option(
+        None,
+        "--prices",
+        help='JSON file of {"model": [usd_per_1m_input, usd_per_1m_output]}',
+    ),
+):
+    """
+    Summarize one or many runs: phase latency percentiles, LLM tokens and cost,
+    test vs LLM time, iterations to success and the slowest tests.
+    """
+    from rich.table import Table
+
+    from nova.telemetry.analyze import (
+        TraceReport,
+        iter_trace_files,
+        load_prices,
+        summarize_run,
+    )
+
+    if not paths:
+        paths = [Path(get_settings().telemetry_dir)]
+    report = TraceReport(prices=load_prices(prices) if prices else None, top_tests=top)
+    for trace_file in iter_trace_files(paths):
+        report.add(summarize_run(trace_file, top_tests=top))
+
+    data = report.to_dict()
+    if json_output:
+        print(json.dumps(data, indent=2))
+        return
+    if not data["runs"]:
+        console.print("[yellow]No trace.jsonl files found.[/yellow]")
+        raise typer.Exit(1)
+
+    iters = data["iterations_to_success"]
+    console.print(
+        f"[green]Runs:[/green] {data['runs']}  [green]Succeeded:[/green] {data['successes']}"
+        + (
+            f"  [green]Iterations to success:[/green] mean {iters['mean']}, max {iters['max']}"
+            if iters["mean"] is not None
+            else ""
+        )
+    )
+    console.print(
+        f"[cyan]LLM time:[/cyan] {data['llm_seconds']}s  [cyan]Test time:[/cyan] {data['test_seconds']}s  "
+        f"[cyan]Tokens:[/cyan] {data['prompt_tokens']} in ({data['cached_tokens']} cached) / {data['completion_tokens']} out  "
+        f"[cyan]Cost:[/cyan] ${data['cost_usd']:.4f}"
+    )
+    if data["unpriced_models"]:
+        console.print(
+            f"[dim]No price for: {', '.join(data['unpriced_models'])} (use --prices)[/dim]"
+        )
+
+    phases = Table(title="Phase latency (ms)")
+    for column in ("Phase", "Count", "Total", "p50", "p90", "p99", "Max"):
+        phases.add_column(column, justify="left" if column == "Phase" else "right")
+    for name, st in data["phases"].items():
+        phases.add_row(
+            name,
+            str(st["count"]),
+            f"{st['total_ms']:.0f}",
+            f"{st['p50_ms']:.0f}",
+            f"{st['p90_ms']:.0f}",
+            f"{st['p99_ms']:.0f}",
+            f"{st['max_ms']:.0f}",
+        )
+    console.print(phases)
+
+    if data["slowest_tests"]:
+        slow = Table(title="Slowest tests")
+        slow.add_column("Test")
+        slow.add_column("Seconds", justify="right")
+        slow.add_column("Run")
+        for item in data["slowest_tests"]:
+            slow.add_row(item["test"], f"{item['seconds']:.3f}", item["run_id"])
+        console.print(slow)
+
+
+@app.command("lock-server")
+def lock_server(
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to bind"),
+    port: int = typer.Option(7878, "--port", help="TCP port to listen on"),
+):
+    """
+    Run the shared repository lock server for multi-host runners.
+
+    Point runners at it with NOVA_LOCK_SERVER=host:port. The server has no
+    authentication: it binds to loopback unless --host says otherwise, so
+    only bind it to a private network the runners share.
+    """
+    from nova.tools.lock import LockServer
+
+    server = LockServer((host, port))
+    console.print(
+        f"[green]Nova lock server[/green] listening on {host}:{server.server_address[1]}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@app.command()
+def serve(
+    workers: Optional[int] = typer.Option(
+        None, "--workers", "-w", help="Rescues to run at once (NOVA_SERVE_WORKERS)"
+    ),
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to bind"),
+    port: int = typer.Option(8790, "--port", help="TCP port for job intake"),
+    queue_db: Optional[Path] = typer.Option(
+        None, "--queue", help="Job queue database (NOVA_SERVE_DB)"
+    ),
+):
+    """
+    Run the rescue daemon: pull jobs from a local queue and fix them in parallel.
+
+    Submit jobs with POST /jobs, or drop JSON files into the queue's inbox/.
+    """
+    from nova.serve import IntakeServer, JobQueue, RescueDaemon
+    from nova.tools.repo_cache import RepoCache
+
+    settings = get_settings()
+    queue = JobQueue(queue_db or Path(settings.serve_queue_db))
+    daemon = RescueDaemon(
+        queue,
+        RepoCache.from_settings(settings),
+        workers=workers or settings.serve_workers,
+        push_token=settings.serve_push_token,
+    )
+    try:
+        server = IntakeServer(queue, (host, port), token=settings.serve_token)
+    except ValueError as e:
+        console.print(f"[red]{e}; set NOVA_SERVE_TOKEN[/red]")
+        raise typer.Exit(1)
+    server.serve_in_background()
+    console.print(
+        f"[green]Nova rescue daemon[/green] with {daemon.workers} worker(s), "
+        f"intake on {host}:{server.server_address[1]}"
+    )
+    console.print(f"[dim]Queue: {queue.path}  Inbox: {queue.inbox}[/dim]")
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        console.print("[yellow]Stopping; waiting for running jobs...[/yellow]")
+    finally:
+        server.shutdown()
+        server.server_close()
+        daemon.stop()
+        stats = queue.stats()
+        console.print(
+            f"Queue: {stats['queued']} queued, {stats['done']} done, "
+            f"{stats['failed']} failed, {stats['cancelled']} cancelled"
+        )
+
+
+@app.command("mock-llm")
+def mock_llm(
+    script: Optional[Path] = typer.Option(
+        None,
+        "--script",
+        "-s",
+        help="YAML/JSON reply script or JSONL recording (NOVA_LLM_RECORD)",
+        exists=True,
+        dir_okay=False,
+    ),
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to bind"),
+    port: int = typer.Option(8787, "--port", help="TCP port to listen on"),
+    latency_ms: Optional[float] = typer.Option(
+        None, "--latency-ms", help="Latency per request (overrides the script)"
+    ),
+    ms_per_token: Optional[float] = typer.Option(
+        None,
+        "--ms-per-token",
+        help="Latency per completion token (overrides the script)",
+    ),
+):
+    """
+    Run an offline OpenAI/Anthropic-compatible stand-in for benchmarking.
+
+    Point Nova at it with NOVA_LLM_BASE_URL; no API key or network is needed.
+    """
+    from nova.agent.mock_llm import MockLLMServer, MockScript, load_script
+
+    try:
+        mock_script = load_script(script) if script else MockScript()
+    except Exception as e:
+        console.print(f"[red]Invalid mock script: {e}[/red]")
+        raise typer.Exit(1)
+    if latency_ms is not None:
+        mock_script.latency_ms = latency_ms
+    if ms_per_token is not None:
+        mock_script.ms_per_token = ms_per_token
+
+    server = MockLLMServer(mock_script, (host, port))
+    console.print(
+        f"[green]Nova mock LLM[/green] listening on {host}:{server.server_address[1]}"
+    )
+    console.print(f"  export NOVA_LLM_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stats = server.stats()
+        server.server_close()
+        console.print(
+            f"Served {stats['requests']} request(s), {stats['errors']} error(s)"
+        )
+
+
 @app.command()
 def version():
     """
@@ -56,13 +56,55 @@ class NovaSettings(BaseModel):
     min_repo_run_interval_sec: int = 600
     max_daily_llm_calls: int = 200
     warn_daily_llm_calls_pct: float = 0.8
+    max_daily_llm_cost_usd: float = 0.0  # 0 = no spend cap
+    usage_db_path: str = "~/.nova/usage.db"  # see nova.telemetry.usage
+    # Host-wide LLM rate limits per provider key (see nova.tools.rate_limit)
+    llm_requests_per_min: int = 0  # 0 = only react to 429 / Retry-After
+    llm_tokens_per_min: int = 0
+    llm_max_retries: int = 4
+    rate_limit_db_path: str = "~/.nova/ratelimit.db"
     telemetry_dir: str = "telemetry"
     enable_telemetry: bool = True  # Enable telemetry by default to save patches
+    trace_otlp_export: bool = False  # Also write otlp.json next to trace.jsonl
     # Keep default consistent with from_env fallback:
     default_llm_model: str = "gpt-5"
     pr_llm_model: str = "gpt-4o"  # Faster model for PR generation
     reasoning_effort: str = "high"  # Reasoning effort for GPT models (low/medium/high)
+    # Per-call model routing (see nova.agent.model_router)
+    model_routing: bool = True
+    fast_llm_model: str = ""  # "" = cheaper sibling of the default model
+    fast_reasoning_effort: str = "low"
+    route_simple_max_failures: int = 3
+    route_simple_max_context_chars: int = 40_000
+    route_escalate_after: int = 1
+    # Mark stable prompt prefixes for provider prompt caching
+    prompt_cache: bool = True
+    # One multi-turn conversation per fix context (see nova.agent.llm_client.LLMSession)
+    llm_sessions: bool = True
+    llm_session_max_turns: int = 9
+    # Overlap test runs with LLM stages in the fix loop (see nova.agent.pipeline)
+    pipelined_loop: bool = True
+    # One representative failure per root-cause cluster in prompts (see nova.agent.clustering)
+    cluster_failures: bool = True
+    # Offline benchmarking (see nova.agent.mock_llm)
+    llm_base_url: str = ""  # "" = the provider's own API
+    llm_record_path: str = ""  # append every completion to this JSONL file
     whole_file_mode: bool = True  # Use whole file replacement instead of patches
+    # Fleet runs: bare-mirror + worktree cache (see nova.tools.repo_cache)
+    repo_cache_dir: str = "~/.nova/repo-cache"
+    repo_cache_max_bytes: int = 20 * 1024**3
+    repo_cache_max_age_sec: int = 7 * 24 * 3600
+    # `nova serve` rescue daemon (see nova.serve)
+    serve_queue_db: str = "~/.nova/serve/queue.db"
+    serve_workers: int = 2
+    serve_token: str = ""  # "" = intake accepts unauthenticated posts (loopback only)
+    serve_push_token: str = ""  # git token for fetch/push when a job brings none
+    # Sandboxed commands (see nova.tools.sandbox)
+    sandbox_memory_bytes: int = 2 * 1024**3
+    sandbox_cpu_cores: float = 0.0  # 0 = no cgroup CPU throttle
+    sandbox_max_output_bytes: int = 1024 * 1024
+    sandbox_cgroup_root: str = "/sys/fs/cgroup/nova"
+    max_parallel_commands: int = 0  # sandboxed commands at once; 0 = CPU count
 
     @classmethod
     def from_env(cls) -> "NovaSettings":
@@ -79,6 +121,13 @@ class NovaSettings(BaseModel):
             except Exception:
                 return default
 
+        def _get_float(name: str, default: float) -> float:
+            val = os.environ.get(name)
+            try:
+                return float(val) if val is not None else default
+            except Exception:
+                return default
+
         # Optional override for domain allow-list via NOVA_ALLOWED_DOMAINS.
         # Accepts CSV ("a.com,b.com") or JSON-like with brackets.
         domains_env = os.environ.get("NOVA_ALLOWED_DOMAINS")
@@ -108,14 +157,62 @@ class NovaSettings(BaseModel):
             warn_daily_llm_calls_pct=float(
                 os.environ.get("NOVA_WARN_DAILY_LLM_CALLS_PCT", 0.8)
             ),
+            max_daily_llm_cost_usd=float(
+                os.environ.get("NOVA_MAX_DAILY_LLM_COST_USD", 0.0)
+            ),
+            usage_db_path=os.environ.get("NOVA_USAGE_DB", "~/.nova/usage.db"),
+            llm_requests_per_min=_get_int("NOVA_LLM_REQUESTS_PER_MIN", 0),
+            llm_tokens_per_min=_get_int("NOVA_LLM_TOKENS_PER_MIN", 0),
+            llm_max_retries=_get_int("NOVA_LLM_MAX_RETRIES", 4),
+            rate_limit_db_path=os.environ.get(
+                "NOVA_RATE_LIMIT_DB", "~/.nova/ratelimit.db"
+            ),
             telemetry_dir=os.environ.get("NOVA_TELEMETRY_DIR", "telemetry"),
             enable_telemetry=os.environ.get("NOVA_ENABLE_TELEMETRY", "false").lower()
             == "true",
+            trace_otlp_export=os.environ.get("NOVA_TRACE_OTLP", "false").lower()
+            == "true",
             default_llm_model=os.environ.get("NOVA_DEFAULT_LLM_MODEL", "gpt-5"),
             pr_llm_model=os.environ.get("NOVA_PR_LLM_MODEL", "gpt-4o"),
             reasoning_effort=os.environ.get("NOVA_REASONING_EFFORT", "high"),
+            model_routing=os.environ.get("NOVA_MODEL_ROUTING", "true").lower()
+            == "true",
+            fast_llm_model=os.environ.get("NOVA_FAST_LLM_MODEL", ""),
+            fast_reasoning_effort=os.environ.get("NOVA_FAST_REASONING_EFFORT", "low"),
+            route_simple_max_failures=_get_int("NOVA_ROUTE_SIMPLE_MAX_FAILURES", 3),
+            route_simple_max_context_chars=_get_int(
+                "NOVA_ROUTE_SIMPLE_MAX_CONTEXT_CHARS", 40_000
+            ),
+            route_escalate_after=_get_int("NOVA_ROUTE_ESCALATE_AFTER", 1),
+            prompt_cache=os.environ.get("NOVA_PROMPT_CACHE", "true").lower() == "true",
+            llm_sessions=os.environ.get("NOVA_LLM_SESSIONS", "true").lower() == "true",
+            llm_session_max_turns=_get_int("NOVA_LLM_SESSION_MAX_TURNS", 9),
+            pipelined_loop=os.environ.get("NOVA_PIPELINED_LOOP", "true").lower()
+            == "true",
+            cluster_failures=os.environ.get("NOVA_CLUSTER_FAILURES", "true").lower()
+            == "true",
+            llm_base_url=os.environ.get("NOVA_LLM_BASE_URL", ""),
+            llm_record_path=os.environ.get("NOVA_LLM_RECORD", ""),
             whole_file_mode=os.environ.get("NOVA_WHOLE_FILE_MODE", "true").lower()
             == "true",
+            repo_cache_dir=os.environ.get("NOVA_REPO_CACHE_DIR", "~/.nova/repo-cache"),
+            repo_cache_max_bytes=_get_int("NOVA_REPO_CACHE_MAX_BYTES", 20 * 1024**3),
+            repo_cache_max_age_sec=_get_int(
+                "NOVA_REPO_CACHE_MAX_AGE_SEC", 7 * 24 * 3600
+            ),
+            serve_queue_db=os.environ.get("NOVA_SERVE_DB", "~/.nova/serve/queue.db"),
+            serve_workers=_get_int("NOVA_SERVE_WORKERS", 2),
+            serve_token=os.environ.get("NOVA_SERVE_TOKEN", ""),
+            serve_push_token=os.environ.get("NOVA_SERVE_PUSH_TOKEN", ""),
+            sandbox_memory_bytes=_get_int("NOVA_SANDBOX_MEMORY_BYTES", 2 * 1024**3),
+            sandbox_cpu_cores=_get_float("NOVA_SANDBOX_CPU_CORES", 0.0),
+            sandbox_max_output_bytes=_get_int(
+                "NOVA_SANDBOX_MAX_OUTPUT_BYTES", 1024 * 1024
+            ),
+            sandbox_cgroup_root=os.environ.get(
+                "NOVA_SANDBOX_CGROUP_ROOT", "/sys/fs/cgroup/nova"
+            ),
+            max_parallel_commands=_get_int("NOVA_MAX_PARALLEL_COMMANDS", 0),
         )
 
 
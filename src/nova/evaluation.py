@@ -0,0 +1,387 @@
+"""
+Parallel benchmark harness behind ``nova eval``.
+
+A suite is a YAML file listing repos with failing tests (the demos in
+``examples/demos`` make a ready-made corpus):
+
+    name: demos
+    concurrency: 4
+    defaults:
+      max_iters: 5
+      timeout: 600
+    cases:
+      - path: demo_math_ops          # relative to the YAML file
+      - name: algorithms
+        path: algorithmic_challenges
+        max_iters: 8
+        args: ["--verbose"]          # extra `nova fix` flags
+
+Each case is copied into its own scratch git repo and fixed by a separate
+``nova fix`` process, up to ``concurrency`` at a time. The case's telemetry
+trace gives iterations, LLM tokens and test time (``nova.telemetry.analyze``).
+Results are written as JSON and Markdown, and can be compared with a
+previous results file to catch regressions before an upgrade.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from nova.config import load_yaml_config
+from nova.telemetry.analyze import iter_trace_files, summarize_run
+
+# Seconds a case may run past its `nova fix --timeout` before it is killed
+_KILL_GRACE_SEC = 60
+# Files and dirs left behind by earlier runs that must not leak into a case
+_COPY_IGNORE = shutil.ignore_patterns(
+    ".git", "__pycache__", ".pytest_cache", "telemetry", ".nova", "*.pyc"
+)
+
+
+@dataclass
+class EvalCase:
+    name: str
+    path: Path
+    max_iters: int = 5
+    timeout: int = 600
+    args: List[str] = field(default_factory=list)
+
+
+@dataclass
+class EvalSuite:
+    name: str
+    cases: List[EvalCase]
+    concurrency: int = 2
+
+
+@dataclass
+class CaseResult:
+    name: str
+    status: str  # "success", "failed", "timeout" or "error"
+    success: bool
+    exit_code: Optional[int]
+    wall_seconds: float
+    iterations: Optional[int] = None
+    llm_seconds: float = 0.0
+    test_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    error: Optional[str] = None
+    workdir: Optional[str] = None  # scratch copy, when kept
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def load_suite(path: Path) -> EvalSuite:
+    """
+    Read a suite file.
+
+    Raises:
+        ValueError: If the file has no cases, a case path does not exist, or
+            two cases share a name
+    """
+    path = Path(path)
+    data = load_yaml_config(path)
+    defaults = data.get("defaults") or {}
+    cases = []
+    for raw in data.get("cases") or []:
+        if isinstance(raw, str):
+            raw = {"path": raw}
+        case_path = (path.parent / raw["path"]).resolve()
+        if not case_path.is_dir():
+            raise ValueError(f"Case path not found: {case_path}")
+        cases.append(
+            EvalCase(
+                name=raw.get("name") or case_path.name,
+                path=case_path,
+                max_iters=int(raw.get("max_iters", defaults.get("max_iters", 5))),
+                timeout=int(raw.get("timeout", defaults.get("timeout", 600))),
+                args=list(raw.get("args", defaults.get("args", []))),
+            )
+        )
+    if not cases:
+        raise ValueError(f"No cases in {path}")
+    names = [case.name for case in cases]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate case names: {', '.join(duplicates)}")
+    return EvalSuite(
+        name=data.get("name") or path.stem,
+        cases=cases,
+        concurrency=max(1, int(data.get("concurrency", 2))),
+    )
+
+
+def _prepare_copy(case: EvalCase, work_dir: Path) -> Path:
+    """Copy the case into a fresh git repo so runs never touch the corpus."""
+    repo = work_dir / "repo"
+    shutil.copytree(case.path, repo, ignore=_COPY_IGNORE)
+    git = ["git", "-c", "user.name=nova-eval", "-c", "user.email=eval@nova.local"]
+    for cmd in (["init", "-q"], ["add", "-A"], ["commit", "-q", "-m", "eval base"]):
+        subprocess.run(git + cmd, cwd=repo, check=True, capture_output=True)
+    return repo
+
+
+def run_case(case: EvalCase, out_dir: Path, keep: bool = False) -> CaseResult:
+    """Run ``nova fix`` on an isolated copy of ``case``; logs go to ``out_dir``."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    work_dir = Path(tempfile.mkdtemp(prefix=f"nova-eval-{case.name}-"))
+    telemetry_dir = out_dir / "telemetry"
+    started = time.monotonic()
+    try:
+        repo = _prepare_copy(case, work_dir)
+        env = dict(os.environ)
+        env["NOVA_ENABLE_TELEMETRY"] = "true"
+        env["NOVA_TELEMETRY_DIR"] = str(telemetry_dir)
+        cmd = [
+            sys.executable,
+            "-m",
+            "nova.cli",
+            "fix",
+            str(repo),
+            "--max-iters",
+            str(case.max_iters),
+            "--timeout",
+            str(case.timeout),
+            *case.args,
+        ]
+        with open(out_dir / "nova.log", "w", encoding="utf-8") as log:
+            try:
+                proc = subprocess.run(
+                    cmd,
+                    cwd=repo,
+                    env=env,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    timeout=case.timeout + _KILL_GRACE_SEC,
+                )
+                exit_code: Optional[int] = proc.returncode
+            except subprocess.TimeoutExpired:
+                exit_code = None
+    except Exception as e:
+        return CaseResult(
+            name=case.name,
+            status="error",
+            success=False,
+            exit_code=None,
+            wall_seconds=round(time.monotonic() - started, 2),
+            error=f"{type(e).__name__}: {e}",
+        )
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = CaseResult(
+        name=case.name,
+        status="timeout" if exit_code is None else "failed",
+        success=False,
+        exit_code=exit_code,
+        wall_seconds=round(time.monotonic() - started, 2),
+        workdir=str(work_dir) if keep else None,
+    )
+    trace = (
+        next(iter_trace_files([telemetry_dir]), None)
+        if telemetry_dir.is_dir()
+        else None
+    )
+    if trace is not None:
+        summary = summarize_run(trace)
+        result.success = bool(summary.success)
+        result.iterations = summary.iterations
+        result.llm_seconds = round(summary.llm_ms / 1000, 2)
+        result.test_seconds = round(summary.test_ms / 1000, 2)
+        result.prompt_tokens = summary.prompt_tokens
+        result.completion_tokens = summary.completion_tokens
+        result.cached_tokens = summary.cached_tokens
+    elif exit_code == 0:
+        result.success = True
+    if result.success and exit_code is not None:
+        result.status = "success"
+    return result
+
+
+def run_suite(
+    suite: EvalSuite,
+    out_dir: Path,
+    jobs: Optional[int] = None,
+    keep: bool = False,
+    on_result: Optional[Callable[[CaseResult], None]] = None,
+    runner: Callable[..., CaseResult] = run_case,
+) -> List[CaseResult]:
+    """
+    Run every case, ``jobs`` (default: the suite's concurrency) at a time.
+
+    Each case is its own ``nova fix`` process; the pool's threads only wait on
+    them. Results are returned in suite order.
+    """
+    workers = max(1, jobs or suite.concurrency)
+    results: Dict[str, CaseResult] = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(runner, case, Path(out_dir) / "cases" / case.name, keep): case
+            for case in suite.cases
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[result.name] = result
+            if on_result is not None:
+                on_result(result)
+    return [results[case.name] for case in suite.cases]
+
+
+def summarize(suite_name: str, results: List[CaseResult]) -> Dict[str, Any]:
+    """The suite report: per-case results plus aggregate rates and medians."""
+    walls = [r.wall_seconds for r in results]
+    iters = [r.iterations for r in results if r.success and r.iterations is not None]
+    successes = sum(1 for r in results if r.success)
+    return {
+        "suite": suite_name,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "summary": {
+            "cases": len(results),
+            "successes": successes,
+            "success_rate": round(successes / len(results), 3) if results else 0.0,
+            "median_wall_seconds": round(statistics.median(walls), 2) if walls else 0.0,
+            "total_wall_seconds": round(sum(walls), 2),
+            "mean_iterations_to_success": (
+                round(sum(iters) / len(iters), 2) if iters else None
+            ),
+            "llm_seconds": round(sum(r.llm_seconds for r in results), 2),
+            "test_seconds": round(sum(r.test_seconds for r in results), 2),
+            "prompt_tokens": sum(r.prompt_tokens for r in results),
+            "completion_tokens": sum(r.completion_tokens for r in results),
+            "cached_tokens": sum(r.cached_tokens for r in results),
+        },
+        "cases": [r.to_dict() for r in results],
+    }
+
+
+def _pct_change(new: float, old: float) -> Optional[float]:
+    return round((new - old) / old * 100, 1) if old else None
+
+
+def compare(
+    report: Dict[str, Any], baseline: Dict[str, Any], tolerance_pct: float = 20.0
+) -> Dict[str, Any]:
+    """
+    Compare a report with a baseline report.
+
+    A regression is a case that succeeded in the baseline and now fails, or a
+    suite-level success rate drop, or median wall time / total tokens growing
+    by more than ``tolerance_pct`` percent.
+    """
+    regressions: List[str] = []
+    now, before = report["summary"], baseline.get("summary", {})
+    if now["success_rate"] < before.get("success_rate", 0.0):
+        regressions.append(
+            f"success rate {before['success_rate']:.0%} -> {now['success_rate']:.0%}"
+        )
+    deltas: Dict[str, Optional[float]] = {}
+    for key in ("median_wall_seconds", "prompt_tokens", "completion_tokens"):
+        deltas[key] = _pct_change(now.get(key, 0), before.get(key, 0))
+        if deltas[key] is not None and deltas[key] > tolerance_pct:
+            regressions.append(f"{key} +{deltas[key]}%")
+
+    old_cases = {c["name"]: c for c in baseline.get("cases", [])}
+    cases = []
+    for case in report["cases"]:
+        old = old_cases.get(case["name"])
+        if old is None:
+            continue
+        if old["success"] and not case["success"]:
+            regressions.append(f"{case['name']} no longer fixed")
+        cases.append(
+            {
+                "name": case["name"],
+                "was_success": old["success"],
+                "success": case["success"],
+                "wall_change_pct": _pct_change(
+                    case["wall_seconds"], old["wall_seconds"]
+                ),
+                "token_change_pct": _pct_change(
+                    case["prompt_tokens"] + case["completion_tokens"],
+                    old["prompt_tokens"] + old["completion_tokens"],
+                ),
+            }
+        )
+    return {"regressions": regressions, "summary_change_pct": deltas, "cases": cases}
+
+
+def _fmt_pct(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:+.1f}%"
+
+
+def render_markdown(
+    report: Dict[str, Any], comparison: Optional[Dict[str, Any]] = None
+) -> str:
+    s = report["summary"]
+    lines = [
+        f"# Nova eval: {report['suite']}",
+        "",
+        f"- Created: {report['created']}",
+        f"- Success rate: {s['successes']}/{s['cases']} ({s['success_rate']:.0%})",
+        f"- Median wall time: {s['median_wall_seconds']}s "
+        f"(total {s['total_wall_seconds']}s)",
+        f"- Mean iterations to success: {s['mean_iterations_to_success']}",
+        f"- LLM time: {s['llm_seconds']}s, test time: {s['test_seconds']}s",
+        f"- Tokens: {s['prompt_tokens']} in ({s['cached_tokens']} cached) / "
+        f"{s['completion_tokens']} out",
+        "",
+        "| Case | Status | Iterations | Wall (s) | LLM (s) | Tests (s) | Tokens in | Tokens out |",
+        "|------|--------|-----------:|---------:|--------:|----------:|----------:|-----------:|",
+    ]
+    for c in report["cases"]:
+        lines.append(
+            f"| {c['name']} | {c['status']} | {c['iterations'] or '-'} "
+            f"| {c['wall_seconds']} | {c['llm_seconds']} | {c['test_seconds']} "
+            f"| {c['prompt_tokens']} | {c['completion_tokens']} |"
+        )
+    if comparison is not None:
+        lines += ["", "## Compared with baseline", ""]
+        for key, change in comparison["summary_change_pct"].items():
+            lines.append(f"- {key}: {_fmt_pct(change)}")
+        if comparison["regressions"]:
+            lines += ["", "**Regressions:**", ""]
+            lines += [f"- {r}" for r in comparison["regressions"]]
+        else:
+            lines += ["", "No regressions."]
+    return "\n".join(lines) + "\n"
+
+
+def write_reports(
+    out_dir: Path, report: Dict[str, Any], comparison: Optional[Dict[str, Any]] = None
+) -> None:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    payload = dict(report)
+    if comparison is not None:
+        payload["comparison"] = comparison
+    (out_dir / "results.json").write_text(json.dumps(payload, indent=2))
+    (out_dir / "report.md").write_text(render_markdown(report, comparison))
+
+
+__all__ = [
+    "CaseResult",
+    "EvalCase",
+    "EvalSuite",
+    "compare",
+    "load_suite",
+    "render_markdown",
+    "run_case",
+    "run_suite",
+    "summarize",
+    "write_reports",
+]
@@ -4,13 +4,34 @@ Structured logging for Nova CI-Rescue
 Provides hierarchical, context-aware logging with multiple verbosity levels.
 """
 
-from typing import Optional, Dict, Any, List
+from typing import TYPE_CHECKING, Optional, Dict, Any, List
 from enum import IntEnum
 from contextlib import contextmanager
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.tree import Tree
+
+if TYPE_CHECKING:
+    from rich.console import Console
+    from rich.tree import Tree
+
+
+class LazyConsole:
+    """
+    Stand-in for ``rich.console.Console`` that imports rich on first use.
+
+    Module-level consoles would otherwise make every ``nova`` invocation pay
+    for importing rich, even commands that print nothing.
+    """
+
+    def __init__(self, **kwargs: Any):
+        self._kwargs = kwargs
+        self._console: Optional["Console"] = None
+
+    def __getattr__(self, name: str) -> Any:
+        console = self.__dict__.get("_console")
+        if console is None:
+            from rich.console import Console
+
+            console = self._console = Console(**self.__dict__.get("_kwargs", {}))
+        return getattr(console, name)
 
 
 class LogLevel(IntEnum):
@@ -26,9 +47,9 @@ class NovaLogger:
     """Structured logger for Nova CI-Rescue"""
 
     def __init__(
-        self, console: Optional[Console] = None, level: LogLevel = LogLevel.NORMAL
+        self, console: Optional["Console"] = None, level: LogLevel = LogLevel.NORMAL
     ):
-        self.console = console or Console()
+        self.console = console or LazyConsole()
         self.level: LogLevel
         # Ensure level is a LogLevel instance
         if isinstance(level, str):
@@ -151,6 +172,8 @@ class NovaLogger:
                         raw_data[:1000]
                         + f"... (truncated, {len(raw_data)} chars total)"
                     )
+                from rich.panel import Panel
+
                 self.console.print(Panel(raw_data, title="Raw Data", style="dim"))
 
     def table(
@@ -162,6 +185,8 @@ class NovaLogger:
     ):
         """Display a formatted table"""
         if self.level >= LogLevel.VERBOSE or show_in_normal:
+            from rich.table import Table
+
             table = Table(title=title, show_header=True, header_style="bold")
             for header in headers:
                 table.add_column(header)
@@ -172,11 +197,13 @@ class NovaLogger:
     def tree(self, title: str, items: Dict[str, Any], show_in_normal: bool = False):
         """Display a tree structure"""
         if self.level >= LogLevel.VERBOSE or show_in_normal:
+            from rich.tree import Tree
+
             tree = Tree(title)
             self._build_tree(tree, items)
             self.console.print(tree)
 
-    def _build_tree(self, tree: Tree, items: Dict[str, Any]):
+    def _build_tree(self, tree: "Tree", items: Dict[str, Any]):
         """Recursively build a tree"""
         for key, value in items.items():
             if isinstance(value, dict):
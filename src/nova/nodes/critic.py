@@ -61,7 +61,7 @@ class CriticNode:
 
         # Use LLM to review patch
         patch_approved, review_reason = llm_agent.review_patch(
-            patch_diff, state.failing_tests
+            patch_diff, state.failing_tests, tracebacks=state.full_tracebacks
         )
 
         if self.verbose:
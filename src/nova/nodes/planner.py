@@ -0,0 +1,106 @@
+"""
+Planner node for Nova CI-Rescue agent workflow.
+"""
+
+from typing import Any, Dict, Optional
+from rich.console import Console
+
+from nova.agent.state import AgentState
+from nova.telemetry.logger import JSONLLogger
+
+console = Console()
+
+
+class PlannerNode:
+    """Node responsible for planning how to fix the failing tests."""
+
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
+
+    def execute(
+        self,
+        state: AgentState,
+        llm_agent: Any,
+        telemetry: Optional[JSONLLogger] = None,
+        critic_feedback: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Create a plan for the current failing tests and store it in the state.
+
+        Args:
+            state: Current agent state
+            llm_agent: LLM agent instance for planning
+            telemetry: Optional telemetry logger
+            critic_feedback: Optional feedback from previous critic rejection
+
+        Returns:
+            Plan dictionary with approach and steps
+        """
+        iteration = state.current_iteration + 1
+
+        # Log planner start
+        if telemetry:
+            telemetry.log_event(
+                "planner_start",
+                {
+                    "iteration": iteration,
+                    "failing_tests": state.total_failures,
+                    "has_critic_feedback": critic_feedback is not None,
+                },
+            )
+
+        if self.verbose:
+            console.print("[cyan]🧭 Planning a fix for the failing tests...[/cyan]")
+
+        plan = llm_agent.create_plan(
+            state.failing_tests,
+            iteration,
+            critic_feedback,
+            tracebacks=state.full_tracebacks,
+        )
+        state.plan = plan
+
+        if self.verbose and isinstance(plan, dict):
+            console.print(f"[dim]Approach: {plan.get('approach', '')}[/dim]")
+            for i, step in enumerate(plan.get("steps") or [], 1):
+                console.print(f"[dim]  {i}. {step}[/dim]")
+
+        # Log planner completion
+        if telemetry:
+            telemetry.log_event(
+                "planner_complete",
+                {
+                    "iteration": iteration,
+                    "steps": (
+                        len(plan.get("steps") or []) if isinstance(plan, dict) else 0
+                    ),
+                },
+            )
+
+        return plan
+
+
+def planner_node(
+    state: AgentState,
+    llm_agent: Any,
+    telemetry: Optional[JSONLLogger] = None,
+    critic_feedback: Optional[str] = None,
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """
+    Convenience function to execute the planner node.
+
+    Args:
+        state: Current agent state
+        llm_agent: LLM agent instance
+        telemetry: Optional telemetry logger
+        critic_feedback: Optional critic feedback (defaults to the state's)
+        verbose: Enable verbose output
+
+    Returns:
+        Plan dictionary
+    """
+    node = PlannerNode(verbose=verbose)
+    if critic_feedback is None:
+        critic_feedback = state.critic_feedback
+    return node.execute(state, llm_agent, telemetry, critic_feedback)
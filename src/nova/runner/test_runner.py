@@ -16,32 +16,28 @@ from __future__ import annotations
 
 import json
 import re
-import subprocess
 import tempfile
 import shlex
 import sys
 from dataclasses import dataclass
 import os
 import shutil
-import time
 from pathlib import Path
 from typing import List, Optional, Dict, Any, Tuple
 import xml.etree.ElementTree as ET
-from nova.logger import get_logger
+from nova.logger import LazyConsole, get_logger
+from nova.telemetry.tracing import traced
+from nova.tools.executor import get_executor
 
-try:
-    from rich.console import Console
+_console = LazyConsole()
+# Strip simple [tag]...[/tag] markup when rich is unavailable
+_TAG_RE = re.compile(r"\[(\/?[a-zA-Z][^\]]*)\]")
 
-    _console = Console()
 
-    def _print(msg: str) -> None:
+def _print(msg: str) -> None:
+    try:
         _console.print(msg)
-
-except Exception:
-    # Strip simple [tag]...[/tag] markup when rich is unavailable
-    _TAG_RE = re.compile(r"\[(\/?[a-zA-Z][^\]]*)\]")
-
-    def _print(msg: str) -> None:
+    except ImportError:
         print(_TAG_RE.sub("", msg))
 
 
@@ -68,14 +64,30 @@ class TestRunner:
     """Runs pytest and captures failing tests."""
 
     def __init__(
-        self, repo_path: Path, verbose: bool = False, pytest_args: Optional[str] = None
+        self,
+        repo_path: Path,
+        verbose: bool = False,
+        pytest_args: Optional[str] = None,
+        timeout: int = 300,
     ):
         self.repo_path = repo_path
         self.verbose = verbose
         self.pytest_args = pytest_args
+        self.timeout = timeout
+
+    def _run_pytest(self, cmd: List[str]):
+        """Run pytest through the shared sandboxed executor."""
+        return get_executor().run(
+            cmd,
+            self.repo_path,
+            timeout=self.timeout,
+            sandboxed=True,
+            label="pytest",
+        )
 
     # ---- Public API -----------------------------------------------------
 
+    @traced("test_run")
     def run_tests(self) -> Tuple[List[FailingTest], Optional[str]]:
         """
         Run pytest and capture all failing tests.
@@ -109,23 +121,22 @@ class TestRunner:
             logger.verbose(f"Command: {' '.join(cmd)}", component="Test Runner")
 
             # Run pytest (it may exit non-zero when tests fail/collect fails)
-            _start = time.time()
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                cwd=str(self.repo_path),
-                timeout=300,
-            )
-            _elapsed = time.time() - _start
+            result = self._run_pytest(cmd)
+            if result.timed_out:
+                logger.error(f"pytest timed out after {self.timeout}s.")
+                return [], None
+            _elapsed = result.duration
             combined_output = (result.stderr or "") + "\n" + (result.stdout or "")
             logger.debug(
                 "Pytest run completed",
                 data={
                     "returncode": result.returncode,
                     "elapsed_seconds": round(_elapsed, 1),
+                    "queued_seconds": round(result.queued_seconds, 1),
                     "stdout_len": len(result.stdout or ""),
                     "stderr_len": len(result.stderr or ""),
+                    "output_truncated": result.truncated,
+                    "peak_rss_bytes": result.resources.get("peak_rss_bytes"),
                 },
                 component="Test Runner",
             )
@@ -159,15 +170,11 @@ class TestRunner:
                     f"Re-running without json-report: {' '.join(cmd_no_json)}",
                     component="Test Runner",
                 )
-                _start = time.time()
-                result = subprocess.run(
-                    cmd_no_json,
-                    capture_output=True,
-                    text=True,
-                    cwd=str(self.repo_path),
-                    timeout=300,
-                )
-                _elapsed = time.time() - _start
+                result = self._run_pytest(cmd_no_json)
+                if result.timed_out:
+                    logger.error(f"pytest timed out after {self.timeout}s.")
+                    return [], None
+                _elapsed = result.duration
                 combined_output = (result.stderr or "") + "\n" + (result.stdout or "")
                 logger.debug(
                     "Pytest rerun (without json-report) completed",
@@ -265,17 +272,6 @@ class TestRunner:
                 f"pytest not found in the current interpreter. Activate your venv and install pytest. ({type(e).__name__})"
             )
             return [], None
-        except subprocess.TimeoutExpired as e:
-            logger = get_logger()
-            try:
-                _to = getattr(e, "timeout", None)
-                if _to is not None:
-                    logger.error(f"pytest timed out after {_to}s.")
-                else:
-                    logger.error("pytest timed out.")
-            except Exception:
-                logger.error("pytest timed out.")
-            return [], None
         except Exception as e:
             logger = get_logger()
             logger.error(f"Error running tests: {type(e).__name__}: {e}")
@@ -473,7 +469,7 @@ class TestRunner:
             error_el = tc.find("error")
             if failure_el is None and error_el is None:
                 continue
-            problem_el = failure_el or error_el
+            problem_el = failure_el if failure_el is not None else error_el
 
             name = tc.get("name") or "<unknown>"
             classname = tc.get("classname") or ""
@@ -0,0 +1,921 @@
+"""
+Long-running rescue worker behind ``nova serve``.
+
+Instead of a cold Actions runner per CI failure, one daemon pulls rescue jobs
+from a durable local queue and runs several ``nova fix`` processes at once:
+
+- The queue is a SQLite database in WAL mode. Jobs have a priority and are
+  retried with exponential backoff when a run errors or times out. Jobs left
+  ``running`` by a daemon that died, or whose ``nova fix`` was interrupted
+  by the daemon shutting down, are queued again.
+- Jobs come in over HTTP (``POST /jobs``, what the GitHub App posts to) or as
+  ``*.json`` files dropped into the ``inbox`` directory next to the database
+  (write to a temporary name and rename, so half-written files are skipped).
+  HTTP jobs must name a remote repo and may only pass ``ALLOWED_ARGS``; the
+  intake refuses to listen beyond loopback without a token.
+- Jobs for the same repository never run at the same time: the queue hands
+  out one job per repo, and each run also holds that repo's ``NovaLock``.
+- Remote repos are checked out from the shared ``RepoCache`` mirror as a
+  worktree, so only the first job for a repo pays for the clone.
+- Jobs for a pull request (``repository`` + ``pr_number``) are coalesced: a
+  second submit for the same head ``sha`` returns the pending job, and a new
+  ``sha`` cancels the superseded one, stopping its ``nova fix`` if it has
+  started. ``POST /jobs/supersede`` with ``repository``, ``pr_number`` and
+  ``sha`` cancels a pull request's jobs for older heads without queueing a
+  new one, and ``POST /jobs/<id>/cancel`` cancels a job explicitly.
+
+A job is a JSON object:
+
+    {"repo": "https://github.com/owner/name.git", "sha": "<head sha>",
+     "repository": "owner/name", "pr_number": 12, "priority": 10,
+     "max_iters": 5, "timeout": 600, "args": ["--verbose"], "push": true,
+     "branch": "feature"}
+
+``repo`` may also be a local checkout (inbox only), which is fixed in place.
+With ``push`` the fix is pushed back to ``repo`` after a successful run, onto
+``branch`` (default: the fix branch). Credentials never go into the queue: a
+token sent in the ``X-Nova-Push-Token`` header is held in memory for that
+job, falling back to ``NOVA_SERVE_PUSH_TOKEN``, and is used for the job's
+fetch and push over https.
+
+Usage:
+    queue = JobQueue(Path("~/.nova/serve/queue.db"))
+    queue.submit({"repo": "https://github.com/owner/name.git", "sha": sha})
+    daemon = RescueDaemon(queue, RepoCache.from_settings(settings), workers=4)
+    daemon.run_forever()
+"""
+
+from __future__ import annotations
+
+import hmac
+import ipaddress
+import json
+import os
+import re
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit, urlunsplit
+
+# Seconds a job may run past its `nova fix --timeout` before it is killed
+_KILL_GRACE_SEC = 60
+
+# Statuses of jobs that still hold their repo
+_ACTIVE = ("running", "cancelling")
+
+# `nova fix` flags a job submitted over HTTP may pass
+ALLOWED_ARGS = ("--verbose", "-v", "--legacy-agent", "--resume")
+
+# Exit codes of a `nova fix` stopped by SIGINT/SIGTERM (it checkpoints first)
+_INTERRUPTED = (
+    128 + signal.SIGINT,
+    128 + signal.SIGTERM,
+    -signal.SIGINT,
+    -signal.SIGTERM,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    repo TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    not_before REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker TEXT,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(status, priority, id);
+"""
+
+
+class JobCancelled(Exception):
+    """Raised by a runner that stopped because its job was cancelled."""
+
+
+class JobInterrupted(Exception):
+    """Raised by a runner whose ``nova fix`` was interrupted; the job runs again."""
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _is_remote(repo: str) -> bool:
+    # URLs, or scp-like `git@host:owner/name.git`
+    return urlsplit(repo).scheme in ("https", "http", "ssh", "git") or bool(
+        re.match(r"^[\w.-]+@[\w.-]+:", repo)
+    )
+
+
+def _with_token(url: str, token: Optional[str]) -> str:
+    """``url`` carrying ``token`` as https credentials; other URLs are unchanged."""
+    parts = urlsplit(url)
+    if not token or parts.scheme != "https":
+        return url
+    host = parts.netloc.rsplit("@", 1)[-1]
+    return urlunsplit(
+        parts._replace(netloc=f"x-access-token:{quote(token, safe='')}@{host}")
+    )
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@dataclass
+class RescueJob:
+    """One queued rescue: which repo and commit to fix, and how."""
+
+    repo: str
+    sha: Optional[str] = None
+    repository: Optional[str] = None  # owner/name, for GitHub reporting
+    pr_number: Optional[int] = None
+    priority: int = 0
+    max_iters: int = 5
+    timeout: int = 600
+    args: List[str] = field(default_factory=list)
+    push: bool = False
+    branch: Optional[str] = None  # branch of `repo` to push to; default the fix branch
+    max_attempts: int = 3
+    id: Optional[int] = None
+    status: str = "queued"
+    attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], trusted: bool = True) -> "RescueJob":
+        """
+        Validate a submitted job. Jobs that are not ``trusted`` (HTTP) must
+        name a remote repo and may only pass ``ALLOWED_ARGS``.
+
+        Raises:
+            ValueError: If ``repo`` is missing, a remote repo has no ``sha``,
+                or an untrusted job asks for more than it may
+        """
+        repo = str(payload.get("repo") or "").strip()
+        if not repo:
+            raise ValueError("Job needs a 'repo'")
+        if not trusted and not _is_remote(repo):
+            raise ValueError("Only remote repos can be submitted over HTTP")
+        if not Path(repo).expanduser().is_dir() and not payload.get("sha"):
+            raise ValueError("Remote repo jobs need the 'sha' to fix")
+        known = {f for f in cls.__dataclass_fields__} - {
+            "id",
+            "status",
+            "attempts",
+            "result",
+            "error",
+        }
+        job = cls(**{k: v for k, v in payload.items() if k in known})
+        job.repo = repo
+        job.args = [str(a) for a in job.args]
+        if not trusted:
+            refused = [a for a in job.args if a not in ALLOWED_ARGS]
+            if refused:
+                raise ValueError(f"Arguments not allowed: {' '.join(refused)}")
+        for name in ("priority", "max_iters", "timeout", "max_attempts"):
+            setattr(job, name, int(getattr(job, name)))
+        if job.pr_number is not None:
+            job.pr_number = int(job.pr_number)
+        return job
+
+    def payload(self) -> Dict[str, Any]:
+        data = asdict(self)
+        for key in ("id", "status", "attempts", "result", "error"):
+            data.pop(key)
+        return data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobQueue:
+    """Durable priority queue of rescue jobs, shared by all daemons on a host."""
+
+    def __init__(self, path: Path, retry_base_seconds: float = 30.0):
+        self.path = Path(path).expanduser()
+        self.retry_base_seconds = retry_base_seconds
+        # Git credentials of submitted jobs, by id; kept in memory only
+        self.push_tokens: Dict[int, str] = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.executescript(_SCHEMA)
+
+    @property
+    def inbox(self) -> Path:
+        return self.path.parent / "inbox"
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                str(self.path), timeout=10.0, isolation_level=None
+            )  # autocommit; transactions are explicit
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+    def submit(
+        self,
+        payload: Dict[str, Any],
+        trusted: bool = True,
+        push_token: Optional[str] = None,
+    ) -> int:
+        """
+        Validate and enqueue a job; returns its id.
+
+        A pull request job whose ``sha`` is already queued or running returns
+        that job's id instead. Pending jobs for an older ``sha`` of the same
+        pull request are cancelled. ``push_token`` is kept in
+        ``push_tokens`` for this process's daemon, never in the database.
+        """
+        job = RescueJob.from_payload(payload, trusted=trusted)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if job.repository and job.pr_number is not None:
+                for row in conn.execute(
+                    "SELECT id, status, json_extract(payload, '$.sha') AS sha "
+                    "FROM jobs WHERE status IN ('queued', 'running') "
+                    "AND json_extract(payload, '$.repository') = ? "
+                    "AND json_extract(payload, '$.pr_number') = ?",
+                    (job.repository, int(job.pr_number)),
+                ).fetchall():
+                    if row["sha"] == job.sha:
+                        if push_token:
+                            self.push_tokens[int(row["id"])] = push_token
+                        conn.execute("COMMIT")
+                        return int(row["id"])
+                    self._cancel(
+                        conn, row["id"], row["status"], f"superseded by {job.sha}"
+                    )
+            cur = conn.execute(
+                "INSERT INTO jobs (repo, payload, priority, max_attempts, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    job.repo,
+                    json.dumps(job.payload()),
+                    int(job.priority),
+                    max(1, int(job.max_attempts)),
+                    time.time(),
+                ),
+            )
+            if push_token:
+                # Before COMMIT, so no daemon can claim the job without it
+                self.push_tokens[int(cur.lastrowid)] = push_token
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return int(cur.lastrowid)
+
+    def _cancel(
+        self, conn: sqlite3.Connection, job_id: int, status: str, reason: str
+    ) -> str:
+        # A running job is only flagged; its daemon stops the run and finishes the cancel
+        new_status = "cancelling" if status == "running" else "cancelled"
+        if new_status == "cancelled":
+            self.push_tokens.pop(job_id, None)
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (
+                new_status,
+                reason,
+                time.time() if new_status == "cancelled" else None,
+                job_id,
+            ),
+        )
+        return new_status
+
+    def cancel(self, job_id: int, reason: str = "cancelled") -> Optional[str]:
+        """
+        Cancel a queued or running job.
+
+        Returns:
+            The job's status afterwards, or None if there is no such job
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT status FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            status = row["status"] if row is not None else None
+            if status in ("queued", "running"):
+                status = self._cancel(conn, job_id, status, reason)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return status
+
+    def supersede(self, repository: str, pr_number: int, sha: str) -> List[int]:
+        """
+        Cancel a pull request's queued and running jobs for any head but ``sha``.
+
+        Returns:
+            The ids of the jobs cancelled
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, status FROM jobs WHERE status IN ('queued', 'running') "
+                "AND json_extract(payload, '$.repository') = ? "
+                "AND json_extract(payload, '$.pr_number') = ? "
+                "AND json_extract(payload, '$.sha') IS NOT ?",
+                (repository, int(pr_number), sha),
+            ).fetchall()
+            for row in rows:
+                self._cancel(conn, row["id"], row["status"], f"superseded by {sha}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [int(row["id"]) for row in rows]
+
+    def cancelled(self, job_id: int) -> None:
+        """Record that a cancelled job's run has stopped."""
+        self._conn().execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ?",
+            (time.time(), job_id),
+        )
+
+    def claim(self, worker: Optional[str] = None) -> Optional[RescueJob]:
+        """
+        Mark the next ready job running and return it, or None.
+
+        Highest priority first, then oldest. A repo with a running job is
+        skipped, so one repo's jobs run one after another.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND not_before <= ? "
+                "AND repo NOT IN (SELECT repo FROM jobs "
+                "WHERE status IN ('running', 'cancelling')) "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                    "started_at = ?, worker = ? WHERE id = ?",
+                    (now, worker or _worker_id(), row["id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job = self._job(row)
+        job.status = "running"
+        job.attempts += 1
+        return job
+
+    def finish(self, job_id: int, result: Dict[str, Any]) -> None:
+        """Record a completed run, whether or not it fixed the tests."""
+        self._conn().execute(
+            "UPDATE jobs SET status = CASE status WHEN 'cancelling' "
+            "THEN 'cancelled' ELSE 'done' END, finished_at = ?, result = ?, "
+            "error = CASE status WHEN 'cancelling' THEN error END WHERE id = ?",
+            (time.time(), json.dumps(result), job_id),
+        )
+
+    def requeue(self, job_id: int) -> None:
+        """Queue an interrupted run again without spending one of its attempts."""
+        self._conn().execute(
+            "UPDATE jobs SET status = CASE status WHEN 'cancelling' "
+            "THEN 'cancelled' ELSE 'queued' END, attempts = MAX(0, attempts - 1), "
+            "worker = NULL, finished_at = CASE status WHEN 'cancelling' "
+            "THEN ? END WHERE id = ?",
+            (time.time(), job_id),
+        )
+
+    def fail(self, job_id: int, error: str) -> bool:
+        """
+        Record a run that errored. The job is queued again after a backoff
+        until it runs out of attempts.
+
+        Returns:
+            True if the job will be retried
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT status, attempts, max_attempts FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            retry = (
+                row is not None
+                and row["status"] == "running"
+                and row["attempts"] < row["max_attempts"]
+            )
+            if row is not None and row["status"] == "cancelling":
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                    "WHERE id = ?",
+                    (time.time(), job_id),
+                )
+            elif retry:
+                delay = self.retry_base_seconds * 2 ** (row["attempts"] - 1)
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', not_before = ?, error = ?, "
+                    "worker = NULL WHERE id = ?",
+                    (time.time() + delay, error, job_id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? "
+                    "WHERE id = ?",
+                    (time.time(), error, job_id),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return retry
+
+    def recover(self) -> int:
+        """Queue again the running jobs whose daemon on this host has died."""
+        host = socket.gethostname()
+        stale = []
+        for row in self._conn().execute(
+            "SELECT id, status, worker FROM jobs "
+            "WHERE status IN ('running', 'cancelling')"
+        ):
+            worker_host, _, pid = (row["worker"] or "").rpartition(":")
+            if worker_host == host and pid.isdigit() and not _pid_alive(int(pid)):
+                stale.append((row["id"], row["status"]))
+        for job_id, status in stale:
+            if status == "cancelling":
+                self.cancelled(job_id)
+                continue
+            self._conn().execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL WHERE id = ?",
+                (job_id,),
+            )
+        return len(stale)
+
+    def ingest_inbox(self) -> List[int]:
+        """Enqueue every ``*.json`` file in the inbox; bad files get ``.rejected``."""
+        ids = []
+        if not self.inbox.is_dir():
+            return ids
+        for path in sorted(self.inbox.glob("*.json")):
+            try:
+                ids.append(self.submit(json.loads(path.read_text())))
+            except (ValueError, TypeError) as e:
+                path.with_suffix(".rejected").write_text(f"{e}\n")
+            except OSError:
+                continue
+            path.unlink(missing_ok=True)
+        return ids
+
+    # ---------------------------
+    # Reads
+    # ---------------------------
+    def _job(self, row: sqlite3.Row) -> RescueJob:
+        job = RescueJob(**json.loads(row["payload"]))
+        job.id = row["id"]
+        job.status = row["status"]
+        job.attempts = row["attempts"]
+        job.result = json.loads(row["result"]) if row["result"] else None
+        job.error = row["error"]
+        return job
+
+    def get(self, job_id: int) -> Optional[RescueJob]:
+        row = (
+            self._conn()
+            .execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            .fetchone()
+        )
+        return self._job(row) if row is not None else None
+
+    def cancelling(self) -> List[int]:
+        """Ids of running jobs that have been cancelled but not yet stopped."""
+        return [
+            row["id"]
+            for row in self._conn().execute(
+                "SELECT id FROM jobs WHERE status = 'cancelling'"
+            )
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        counts = {s: 0 for s in ("queued", "running", "done", "failed", "cancelled")}
+        for row in self._conn().execute(
+            "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+        ):
+            status = "running" if row["status"] == "cancelling" else row["status"]
+            counts[status] += row["n"]
+        return counts
+
+
+def run_job(
+    job: RescueJob,
+    workdir: Path,
+    log_dir: Path,
+    cancel: Optional[threading.Event] = None,
+    push_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run ``nova fix`` for ``job`` in ``workdir``; output goes to ``log_dir``.
+    With ``job.push`` a successful fix is pushed to ``push_url`` (``job.repo``
+    with credentials), or ``job.repo``.
+
+    Returns the run's outcome. Raises on errors worth a retry (timeouts,
+    a failed push), ``JobCancelled`` if ``cancel`` is set mid-run and
+    ``JobInterrupted`` if ``nova fix`` was interrupted by a signal.
+    """
+    log_dir.mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ)
+    env["NOVA_ENABLE_TELEMETRY"] = "true"
+    env["NOVA_TELEMETRY_DIR"] = str(log_dir / "telemetry")
+    if job.repository:
+        env["GITHUB_REPOSITORY"] = job.repository
+    if job.pr_number:
+        env["PR_NUMBER"] = str(job.pr_number)
+    cmd = [
+        sys.executable,
+        "-m",
+        "nova.cli",
+        "fix",
+        str(workdir),
+        "--max-iters",
+        str(job.max_iters),
+        "--timeout",
+        str(job.timeout),
+        *job.args,
+    ]
+    started = time.monotonic()
+    deadline = started + job.timeout + _KILL_GRACE_SEC
+    with open(log_dir / "nova.log", "w", encoding="utf-8") as log:
+        # Popen rather than the shared executor, which can't cancel a running fix
+        proc = subprocess.Popen(
+            cmd, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        while proc.poll() is None:
+            if cancel is not None and cancel.is_set():
+                # SIGTERM lets `nova fix` checkpoint and restore the original branch
+                proc.terminate()
+                try:
+                    proc.wait(timeout=_KILL_GRACE_SEC)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+                raise JobCancelled(f"job {job.id} was cancelled")
+            if time.monotonic() >= deadline:
+                proc.kill()
+                proc.wait()
+                raise TimeoutError(f"nova fix ran past {job.timeout}s")
+            if cancel is not None:
+                cancel.wait(0.5)
+            else:
+                time.sleep(0.5)
+    if proc.returncode in _INTERRUPTED:
+        raise JobInterrupted(f"nova fix was interrupted (exit {proc.returncode})")
+    if proc.returncode < 0:
+        raise RuntimeError(f"nova fix was killed by signal {-proc.returncode}")
+    result: Dict[str, Any] = {
+        "success": proc.returncode == 0,
+        "exit_code": proc.returncode,
+        "wall_seconds": round(time.monotonic() - started, 2),
+        "log": str(log_dir / "nova.log"),
+    }
+    if result["success"] and job.push:
+        result["branch"] = _push_fix(job, workdir, push_url)
+    return result
+
+
+def _push_fix(job: RescueJob, workdir: Path, push_url: Optional[str]) -> str:
+    """Push the fixed HEAD of ``workdir`` for ``job``; returns the branch pushed to."""
+    from nova.tools.executor import get_executor
+
+    executor = get_executor()
+    target = job.branch
+    if not target:
+        head = executor.run(
+            ["git", "rev-parse", "--abbrev-ref", "HEAD"], workdir, label="git"
+        )
+        target = head.stdout.strip()
+        if not head.ok or not target or target == "HEAD":
+            raise RuntimeError(
+                f"Could not tell which branch nova fix left checked out: "
+                f"{head.output or target}"
+            )
+    env = {"GIT_TERMINAL_PROMPT": "0"}
+    remote = job.repo
+    if push_url:
+        # Passed as config rather than argv, so the credentials stay out of
+        # process listings and command spans
+        env.update(
+            GIT_CONFIG_COUNT="1",
+            GIT_CONFIG_KEY_0="remote.nova-push.url",
+            GIT_CONFIG_VALUE_0=push_url,
+        )
+        remote = "nova-push"
+    pushed = executor.run(
+        ["git", "push", remote, f"HEAD:refs/heads/{target}"],
+        workdir,
+        env=env,
+        label="git",
+    )
+    if not pushed.ok:
+        error = pushed.stderr.strip()
+        if push_url:
+            error = error.replace(push_url, job.repo)
+        raise RuntimeError(f"Push failed: {error}")
+    return target
+
+
+class RescueDaemon:
+    """Worker pool draining a ``JobQueue``."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        cache: Optional[Any] = None,
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        evict_interval: float = 3600.0,
+        runner: Callable[..., Dict[str, Any]] = run_job,
+        push_token: str = "",
+    ):
+        self.queue = queue
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.evict_interval = evict_interval
+        self.runner = runner
+        self.log_root = queue.path.parent / "jobs"
+        self.lock_root = queue.path.parent / "locks"
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[int, threading.Event] = {}
+        self._running_lock = threading.Lock()
+        self.push_token = push_token
+
+    def _lock_dir(self, job: RescueJob) -> Path:
+        local = Path(job.repo).expanduser()
+        if local.is_dir():
+            return local.resolve()
+        if self.cache is not None:
+            return self.lock_root / self.cache.mirror_path(job.repo).stem
+        return self.lock_root / job.repo.replace("/", "_").replace(":", "_")
+
+    def process(self, job: RescueJob) -> None:
+        """Run one claimed job under its repo lock and record the outcome."""
+        from nova.tools.lock import nova_lock
+
+        log_dir = self.log_root / str(job.id)
+        cancel = threading.Event()
+        with self._running_lock:
+            self._running[job.id] = cancel
+        try:
+            with nova_lock(self._lock_dir(job), wait=True, wait_timeout=job.timeout):
+                if cancel.is_set():
+                    raise JobCancelled(f"job {job.id} was cancelled")
+                local = Path(job.repo).expanduser()
+                url = _with_token(
+                    job.repo, self.queue.push_tokens.get(job.id) or self.push_token
+                )
+                extra = {"push_url": url} if job.push and url != job.repo else {}
+                if local.is_dir():
+                    result = self.runner(job, local.resolve(), log_dir, cancel)
+                elif self.cache is not None:
+                    with self.cache.checkout(url, job.sha, f"job{job.id}") as wt:
+                        result = self.runner(job, wt, log_dir, cancel, **extra)
+                else:
+                    raise RuntimeError("Remote repo jobs need a repository cache")
+        except JobCancelled:
+            self.queue.cancelled(job.id)
+            self.queue.push_tokens.pop(job.id, None)
+            return
+        except JobInterrupted:
+            self.queue.requeue(job.id)
+            return
+        except Exception as e:
+            if not self.queue.fail(job.id, f"{type(e).__name__}: {e}"):
+                self.queue.push_tokens.pop(job.id, None)
+            return
+        finally:
+            with self._running_lock:
+                self._running.pop(job.id, None)
+        self.queue.finish(job.id, result)
+        self.queue.push_tokens.pop(job.id, None)
+
+    def signal_cancels(self) -> None:
+        """Tell the runs of jobs cancelled through the queue to stop."""
+        for job_id in self.queue.cancelling():
+            with self._running_lock:
+                cancel = self._running.get(job_id)
+            if cancel is not None:
+                cancel.set()
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self.process(job)
+
+    def start(self) -> None:
+        self.queue.recover()
+        self.queue.inbox.mkdir(parents=True, exist_ok=True)
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"nova-serve-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def run_forever(self) -> None:
+        """Start the workers, poll the inbox and trim the cache until ``stop``."""
+        self.start()
+        last_evict = time.monotonic()
+        while not self._stop.is_set():
+            self.queue.ingest_inbox()
+            self.signal_cancels()
+            if self.cache is not None and (
+                time.monotonic() - last_evict >= self.evict_interval
+            ):
+                self.cache.evict()
+                last_evict = time.monotonic()
+            self._stop.wait(self.poll_interval)
+
+    def stop(self, wait: bool = True) -> None:
+        """Stop claiming jobs; with ``wait``, let running ones finish."""
+        self._stop.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+class _IntakeHandler(BaseHTTPRequestHandler):
+    server: "IntakeServer"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        token = self.server.token
+        if token and not hmac.compare_digest(
+            self.headers.get("Authorization", "").encode("utf-8"),
+            f"Bearer {token}".encode("utf-8"),
+        ):
+            self._send(401, {"error": "unauthorized"})
+            return False
+        return True
+
+    def do_GET(self) -> None:  # noqa: N802
+        path = self.path.rstrip("/")
+        if path == "/health":
+            self._send(200, {"status": "ok"})
+        elif not self._authorized():
+            return
+        elif path == "/stats":
+            self._send(200, self.server.queue.stats())
+        elif path.startswith("/jobs/") and path[6:].isdigit():
+            job = self.server.queue.get(int(path[6:]))
+            if job is None:
+                self._send(404, {"error": "no such job"})
+            else:
+                self._send(200, job.to_dict())
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        if not self._authorized():
+            return
+        path = self.path.rstrip("/")
+        if path.startswith("/jobs/") and path.endswith("/cancel"):
+            job_id = path[6 : -len("/cancel")]
+            status = self.server.queue.cancel(int(job_id)) if job_id.isdigit() else None
+            if status is None:
+                self._send(404, {"error": "no such job"})
+            else:
+                self._send(200, {"id": int(job_id), "status": status})
+            return
+        if path not in ("/jobs", "/jobs/supersede"):
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if path == "/jobs/supersede":
+                cancelled = self.server.queue.supersede(
+                    str(payload["repository"]),
+                    int(payload["pr_number"]),
+                    str(payload["sha"]),
+                )
+                self._send(200, {"cancelled": cancelled})
+                return
+            job_id = self.server.queue.submit(
+                payload,
+                trusted=False,
+                push_token=self.headers.get("X-Nova-Push-Token"),
+            )
+        except KeyError as e:
+            self._send(400, {"error": f"missing field {e}"})
+            return
+        except (ValueError, TypeError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        self._send(202, {"id": job_id})
+
+
+class IntakeServer(ThreadingHTTPServer):
+    """
+    HTTP intake for the queue: ``POST /jobs``, ``POST /jobs/supersede``,
+    ``POST /jobs/<id>/cancel``, ``GET /jobs/<id>``, ``GET /stats``.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        token: str = "",
+    ):
+        """
+        Raises:
+            ValueError: If asked to listen beyond loopback without a ``token``
+        """
+        if not token and not _is_loopback(address[0]):
+            raise ValueError(
+                f"Refusing to serve the job intake on {address[0]} without a token"
+            )
+        super().__init__(address, _IntakeHandler)
+        self.queue = queue
+        self.token = token
+
+    def serve_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+__all__ = [
+    "ALLOWED_ARGS",
+    "IntakeServer",
+    "JobCancelled",
+    "JobInterrupted",
+    "JobQueue",
+    "RescueDaemon",
+    "RescueJob",
+    "run_job",
+]
@@ -0,0 +1,256 @@
+"""
+Summarize Nova runs from their telemetry directories (backs ``nova trace``).
+
+Traces are streamed line by line, and only the events the report needs are
+JSON-decoded: the event name is sliced from the start of each line, so bulky
+records such as ``test_discovery`` are skipped without being parsed. One
+``TraceReport`` aggregates any number of runs incrementally:
+
+    report = TraceReport()
+    for trace in iter_trace_files([Path("telemetry")]):
+        report.add(summarize_run(trace))
+    print(report.to_dict())
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .pricing import DEFAULT_PRICES, estimate_cost
+
+_WANTED_EVENTS = {"span", "start", "end", "completion", "run_start"}
+
+
+def _event_name(line: str) -> Optional[str]:
+    """Pull the event name out of a trace line without parsing the JSON."""
+    i = line.find('"event": "', 0, 200)
+    if i < 0:
+        return None
+    start = i + 10
+    end = line.find('"', start)
+    return line[start:end] if end > 0 else None
+
+
+def iter_trace_files(paths: Iterable[Path]) -> Iterator[Path]:
+    """Yield trace.jsonl files from files, run dirs or telemetry roots."""
+    for path in paths:
+        path = Path(path)
+        if path.is_file():
+            yield path
+        elif (path / "trace.jsonl").is_file():
+            yield path / "trace.jsonl"
+        elif path.is_dir():
+            yield from sorted(path.glob("*/trace.jsonl"))
+
+
+def iter_events(trace_path: Path, wanted=_WANTED_EVENTS) -> Iterator[Dict[str, Any]]:
+    """Stream the decoded records of ``trace_path`` whose event is in ``wanted``."""
+    with open(trace_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if _event_name(line) not in wanted:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _slow_tests(report_path: Path) -> Iterator[Tuple[float, str]]:
+    """(seconds, test id) for each testcase of a JUnit report, parsed incrementally."""
+    try:
+        for _, elem in ET.iterparse(str(report_path), events=("end",)):
+            if elem.tag == "testcase":
+                try:
+                    seconds = float(elem.get("time") or 0)
+                except ValueError:
+                    seconds = 0.0
+                name = f"{elem.get('classname', '')}::{elem.get('name', '')}"
+                yield seconds, name.lstrip(":")
+            elem.clear()
+    except (ET.ParseError, OSError):
+        return
+
+
+@dataclass
+class RunSummary:
+    """What one run's trace says about where its time and tokens went."""
+
+    run_id: str
+    success: Optional[bool] = None
+    status: Optional[str] = None
+    iterations: Optional[int] = None
+    phase_ms: Dict[str, List[float]] = field(default_factory=dict)
+    llm_ms: float = 0.0
+    test_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    # model -> [prompt, completion, cached]
+    tokens_by_model: Dict[str, List[int]] = field(default_factory=dict)
+    slow_tests: List[Tuple[float, str]] = field(default_factory=list)
+
+
+def summarize_run(trace_path: Path, top_tests: int = 10) -> RunSummary:
+    trace_path = Path(trace_path)
+    summary = RunSummary(run_id=trace_path.parent.name)
+    for record in iter_events(trace_path):
+        event = record.get("event")
+        if event == "span":
+            data = record.get("data") or {}
+            name = data.get("name", "?")
+            ms = float(data.get("duration_ms") or 0.0)
+            summary.phase_ms.setdefault(name, []).append(ms)
+            attrs = data.get("attrs") or {}
+            if name == "llm_call":
+                summary.llm_ms += ms
+                prompt = int(attrs.get("prompt_tokens") or 0)
+                completion = int(attrs.get("completion_tokens") or 0)
+                cached = int(attrs.get("cached_tokens") or 0)
+                summary.prompt_tokens += prompt
+                summary.completion_tokens += completion
+                summary.cached_tokens += cached
+                per_model = summary.tokens_by_model.setdefault(
+                    attrs.get("model") or "unknown", [0, 0, 0]
+                )
+                per_model[0] += prompt
+                per_model[1] += completion
+                per_model[2] += cached
+            elif name == "test_run":
+                summary.test_ms += ms
+        elif event == "completion":
+            data = record.get("data") or {}
+            summary.status = data.get("status", summary.status)
+            if data.get("iterations") is not None:
+                summary.iterations = int(data["iterations"])
+        elif event == "end":
+            summary.success = bool(record.get("success"))
+
+    reports = trace_path.parent / "reports"
+    if reports.is_dir():
+        tests = (t for xml in reports.glob("*.xml") for t in _slow_tests(xml))
+        summary.slow_tests = heapq.nlargest(top_tests, tests)
+    return summary
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class TraceReport:
+    """Incremental aggregate over many ``RunSummary`` objects."""
+
+    def __init__(
+        self,
+        prices: Optional[Dict[str, Tuple[float, float]]] = None,
+        top_tests: int = 10,
+    ):
+        self.prices = dict(DEFAULT_PRICES, **(prices or {}))
+        self.top_tests = top_tests
+        self.runs = 0
+        self.successes = 0
+        self.statuses: Dict[str, int] = {}
+        self.iterations_to_success: List[int] = []
+        self.phase_ms: Dict[str, List[float]] = {}
+        self.llm_ms = 0.0
+        self.test_ms = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cost_usd = 0.0
+        self.unpriced_models: set = set()
+        self._slow: List[Tuple[float, str, str]] = []
+
+    def add(self, run: RunSummary) -> None:
+        self.runs += 1
+        if run.success:
+            self.successes += 1
+            if run.iterations is not None:
+                self.iterations_to_success.append(run.iterations)
+        if run.status:
+            self.statuses[run.status] = self.statuses.get(run.status, 0) + 1
+        for name, values in run.phase_ms.items():
+            self.phase_ms.setdefault(name, []).extend(values)
+        self.llm_ms += run.llm_ms
+        self.test_ms += run.test_ms
+        self.prompt_tokens += run.prompt_tokens
+        self.completion_tokens += run.completion_tokens
+        self.cached_tokens += run.cached_tokens
+        for model, (prompt, completion, cached) in run.tokens_by_model.items():
+            cost = estimate_cost(
+                model, prompt, completion, self.prices, cached_tokens=cached
+            )
+            if cost is None:
+                self.unpriced_models.add(model)
+                continue
+            self.cost_usd += cost
+        for seconds, name in run.slow_tests:
+            item = (seconds, name, run.run_id)
+            if len(self._slow) < self.top_tests:
+                heapq.heappush(self._slow, item)
+            else:
+                heapq.heappushpop(self._slow, item)
+
+    def phase_stats(self) -> Dict[str, Dict[str, float]]:
+        stats = {}
+        for name, values in self.phase_ms.items():
+            ordered = sorted(values)
+            stats[name] = {
+                "count": len(ordered),
+                "total_ms": round(sum(ordered), 1),
+                "p50_ms": round(_percentile(ordered, 0.50), 1),
+                "p90_ms": round(_percentile(ordered, 0.90), 1),
+                "p99_ms": round(_percentile(ordered, 0.99), 1),
+                "max_ms": round(ordered[-1], 1),
+            }
+        return dict(sorted(stats.items(), key=lambda kv: -kv[1]["total_ms"]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        iters = sorted(self.iterations_to_success)
+        return {
+            "runs": self.runs,
+            "successes": self.successes,
+            "statuses": self.statuses,
+            "iterations_to_success": {
+                "mean": round(sum(iters) / len(iters), 2) if iters else None,
+                "p50": _percentile(iters, 0.5) if iters else None,
+                "max": iters[-1] if iters else None,
+            },
+            "phases": self.phase_stats(),
+            "llm_seconds": round(self.llm_ms / 1000, 2),
+            "test_seconds": round(self.test_ms / 1000, 2),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cost_usd": round(self.cost_usd, 4),
+            "unpriced_models": sorted(self.unpriced_models),
+            "slowest_tests": [
+                {"test": name, "seconds": round(seconds, 3), "run_id": run_id}
+                for seconds, name, run_id in sorted(self._slow, reverse=True)
+            ],
+        }
+
+
+def load_prices(path: Path) -> Dict[str, Tuple[float, float]]:
+    """Read ``{"model": [input_per_1m, output_per_1m], ...}`` from a JSON file."""
+    raw = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {model: (float(p[0]), float(p[1])) for model, p in raw.items()}
+
+
+__all__ = [
+    "RunSummary",
+    "TraceReport",
+    "iter_trace_files",
+    "iter_events",
+    "summarize_run",
+    "load_prices",
+]
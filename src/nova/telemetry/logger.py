@@ -1,14 +1,22 @@
 from __future__ import annotations
 
+import atexit
+import base64
 import json
 import os
+import queue
+import re
 import threading
+import time
 import uuid
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, quote_plus
 
 from ..config import NovaSettings
+from .tracing import export_otlp, get_trace_sink, set_trace_sink
 
 
 def _utc_now_iso() -> str:
@@ -24,25 +32,235 @@ def _safe_within(base: Path, target: Path) -> bool:
         return str(target.absolute()).startswith(str(base.absolute()))
 
 
+def _derived_forms(secret: str) -> List[str]:
+    """
+    Encodings a secret commonly leaks in: URL-encoded, and base64 at each of
+    the three byte alignments (so it is also caught inside a longer base64
+    blob such as a Basic auth header).
+    """
+    forms = {quote(secret, safe=""), quote_plus(secret)}
+    raw = secret.encode("utf-8")
+    for offset in range(3):
+        total_bits = (offset + len(raw)) * 8
+        encoded = base64.b64encode(b"\0" * offset + raw).decode("ascii")
+        # Drop characters that mix in the alignment padding or what follows.
+        core = encoded[(offset * 8 + 5) // 6 : total_bits // 6]
+        forms.add(core)
+        forms.add(core.replace("+", "-").replace("/", "_"))
+    forms.discard(secret)
+    return [f for f in forms if len(f) >= 8]
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """
+    Regex source matching any of ``words``, shaped as a prefix trie so the
+    engine rejects a position after one character instead of trying every
+    alternative in turn.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def _build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + _build(node[ch]) for ch in sorted(node) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word ends here but longer ones continue: greedy optional suffix.
+        return f"(?:{body})?" if "" in node else body
+
+    return _build(trie)
+
+
+class SecretRedactor:
+    """
+    Replaces every known secret, and its encoded forms, in one regex pass per
+    string. Build once and reuse; the pattern is compiled in the constructor.
+    """
+
+    def __init__(self, secrets: Iterable[Optional[str]]) -> None:
+        needles = set()
+        for secret in secrets:
+            if not secret:
+                continue
+            needles.add(secret)
+            if len(secret) >= 8:
+                needles.update(_derived_forms(secret))
+        self._pattern = re.compile(_trie_regex(needles)) if needles else None
+
+    def __bool__(self) -> bool:
+        return self._pattern is not None
+
+    def redact(self, payload: Any) -> Any:
+        pattern = self._pattern
+        if pattern is None:
+            return payload
+
+        def _redact(value: Any) -> Any:
+            if isinstance(value, str):
+                return pattern.sub("[REDACTED]", value)
+            if isinstance(value, dict):
+                return {k: _redact(v) for k, v in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [_redact(v) for v in value]
+            return value
+
+        return _redact(payload)
+
+
+@lru_cache(maxsize=32)
+def _cached_redactor(secrets: Tuple[str, ...]) -> SecretRedactor:
+    return SecretRedactor(secrets)
+
+
 def redact_secrets(payload: Any, secrets: Iterable[Optional[str]]) -> Any:
-    secrets_list = [s for s in secrets if s]
+    secrets_list = tuple(s for s in secrets if s)
     if not secrets_list:
         return payload
+    return _cached_redactor(secrets_list).redact(payload)
+
 
-    def _redact(value: Any) -> Any:
-        if isinstance(value, dict):
-            return {k: _redact(v) for k, v in value.items()}
-        if isinstance(value, list):
-            return [_redact(v) for v in value]
-        if isinstance(value, str):
-            redacted = value
-            for s in secrets_list:
-                if s and s in redacted:
-                    redacted = redacted.replace(s, "[REDACTED]")
-            return redacted
-        return value
+_CLOSE = object()
 
-    return _redact(payload)
+
+class _TraceWriter(threading.Thread):
+    """
+    Background appender for one trace file.
+
+    The caller only serializes a record, which snapshots it so later changes
+    to a payload don't leak into the trace, and enqueues it without waiting:
+    when the queue is full the record is dropped rather than stall the agent.
+    Secret redaction, writing and flushing happen in batches on this thread
+    through a single open handle; the file is fsynced at most every
+    ``fsync_interval`` seconds and on close. Records that can't be serialized,
+    queued or written are counted in ``dropped``. ``close`` is also registered
+    with ``atexit`` so buffered records survive a normal exit.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        redactor: Optional[SecretRedactor] = None,
+        max_queue: int = 10000,
+        fsync_interval: float = 1.0,
+        close_timeout: float = 1.0,
+    ) -> None:
+        super().__init__(name=f"nova-trace-{path.parent.name}", daemon=True)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.redactor = redactor
+        self.fsync_interval = fsync_interval
+        self.close_timeout = close_timeout
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._file = path.open("a", encoding="utf-8")
+        self._closed = False
+        self._last_fsync = time.monotonic()
+        atexit.register(self.close)
+        self.start()
+
+    def _drop(self, count: int = 1) -> None:
+        with self._dropped_lock:
+            self.dropped += count
+
+    def put(self, record: Dict[str, Any]) -> None:
+        if self._closed:
+            return
+        try:
+            line = json.dumps(record, ensure_ascii=False, default=str)
+        except Exception:
+            self._drop()
+            return
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            # Disk can't keep up; shed telemetry rather than stall the agent.
+            self._drop()
+
+    def _redact(self, line: str) -> str:
+        if not self.redactor:
+            return line
+        return json.dumps(
+            self.redactor.redact(json.loads(line)), ensure_ascii=False, default=str
+        )
+
+    def run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                self._sync()
+                continue
+            batch = [item]
+            while len(batch) < 512:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = _CLOSE in batch
+            lines = []
+            for line in batch:
+                if line is _CLOSE:
+                    continue
+                try:
+                    lines.append(self._redact(line))
+                except Exception:
+                    self._drop()
+            try:
+                if lines:
+                    self._file.write("\n".join(lines) + "\n")
+                    self._file.flush()
+            except Exception:
+                # Keep the thread alive so callers never block on a dead writer
+                self._drop(len(lines))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if closing:
+                self._sync()
+                return
+            if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self) -> None:
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except (OSError, ValueError):
+            pass
+        self._last_fsync = time.monotonic()
+
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        if not self._closed:
+            self._queue.join()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        with self._dropped_lock:
+            dropped = self.dropped
+        self._closed = True
+        record = {"ts": _utc_now_iso(), "event": "trace_dropped", "count": dropped}
+        # Closing may wait for queue room; the agent is done logging by now
+        for item in ([json.dumps(record)] if dropped else []) + [_CLOSE]:
+            try:
+                self._queue.put(item, timeout=self.close_timeout)
+            except queue.Full:
+                pass  # the join below still bounds how long closing can take
+        self.join(timeout=10)
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        try:
+            atexit.unregister(self.close)
+        except Exception:
+            pass
 
 
 class JSONLLogger:
@@ -52,12 +270,17 @@ class JSONLLogger:
         self._run_id: Optional[str] = None
         self._run_dir: Optional[Path] = None
         self._trace_file: Optional[Path] = None
+        self._writer: Optional[_TraceWriter] = None
         self._lock = threading.Lock()
+        self.trace_id: Optional[str] = None
         self._secrets = [
             settings.openai_api_key,
             settings.anthropic_api_key,
             settings.openswe_api_key,
+            os.environ.get("GITHUB_TOKEN"),
+            os.environ.get("GH_TOKEN"),
         ]
+        self._redactor = SecretRedactor(self._secrets)
 
     @property
     def run_id(self) -> Optional[str]:
@@ -76,12 +299,15 @@ class JSONLLogger:
         run_dir = base_dir / run_id
         trace_file = run_dir / "trace.jsonl"
 
+        self.close()
         self._run_id = run_id
         self._run_dir = run_dir
         self._trace_file = trace_file
+        self.trace_id = uuid.uuid4().hex
 
         if self.enabled:
             run_dir.mkdir(parents=True, exist_ok=True)
+            set_trace_sink(self)
             self._append_record(
                 {
                     "ts": _utc_now_iso(),
@@ -97,12 +323,24 @@ class JSONLLogger:
     def log_event(self, event_type: str, payload: Dict[str, Any]) -> None:
         if not self.enabled or not self._trace_file:
             return
-        safe_payload = redact_secrets(payload, self._secrets)
+        # Secrets are redacted on the writer thread
         self._append_record(
             {
                 "ts": _utc_now_iso(),
                 "event": event_type,
-                "data": safe_payload,
+                "data": payload,
+            }
+        )
+
+    def log_span(self, record: Dict[str, Any]) -> None:
+        """Append a finished span (see nova.telemetry.tracing)."""
+        if not self.enabled or not self._trace_file:
+            return
+        self._append_record(
+            {
+                "ts": _utc_now_iso(),
+                "event": "span",
+                "data": record,
             }
         )
 
@@ -149,18 +387,39 @@ class JSONLLogger:
                 "ts": _utc_now_iso(),
                 "event": "end",
                 "success": bool(success),
-                "summary": redact_secrets(summary or {}, self._secrets),
+                "summary": summary or {},
             }
         )
+        self.close()
+        if get_trace_sink() is self:
+            set_trace_sink(None)
+        if getattr(self.settings, "trace_otlp_export", False):
+            try:
+                export_otlp(self._trace_file)
+            except OSError:
+                pass
+
+    def flush(self) -> None:
+        """Wait until all logged records are on disk (e.g. before reading the trace)."""
+        writer = self._writer
+        if writer is not None:
+            writer.flush()
+
+    def close(self) -> None:
+        """Drain, fsync and close the trace file; later records reopen it."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
 
     def _append_record(self, record: Dict[str, Any]) -> None:
         if not self._trace_file:
             return
-        line = json.dumps(record, ensure_ascii=False)
         with self._lock:
-            self._trace_file.parent.mkdir(parents=True, exist_ok=True)
-            with self._trace_file.open("a", encoding="utf-8") as f:
-                f.write(line + "\n")
+            if self._writer is None:
+                self._writer = _TraceWriter(self._trace_file, self._redactor)
+            writer = self._writer
+        writer.put(record)
 
 
-__all__ = ["JSONLLogger", "redact_secrets"]
+__all__ = ["JSONLLogger", "SecretRedactor", "redact_secrets"]
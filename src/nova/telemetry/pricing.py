@@ -0,0 +1,59 @@
+"""
+Per-model LLM list prices used for cost accounting and reports.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+# USD per 1M tokens (input, output); list prices, override per deployment.
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-5": (1.25, 10.0),
+    "gpt-5-mini": (0.25, 2.0),
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-4o": (2.50, 10.0),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4": (30.0, 60.0),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "claude-3-5-sonnet-20241022": (3.0, 15.0),
+    "claude-3-opus-20240229": (15.0, 75.0),
+    "claude-3-sonnet-20240229": (3.0, 15.0),
+    "claude-3-haiku-20240307": (0.25, 1.25),
+}
+
+# Fraction of the input price billed for prompt-cache reads, by model prefix.
+# Anthropic also bills cache writes at a premium.
+CACHE_READ_RATES: Dict[str, float] = {"claude": 0.1, "gpt-5": 0.1, "gpt-4o": 0.5}
+CACHE_WRITE_RATE = 1.25
+
+
+def estimate_cost(
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    prices: Optional[Dict[str, Tuple[float, float]]] = None,
+    cached_tokens: int = 0,
+    cache_write_tokens: int = 0,
+) -> Optional[float]:
+    """
+    USD cost of one call, or None when the model has no known price.
+
+    ``prompt_tokens`` includes ``cached_tokens`` (read from the provider's
+    prompt cache) and ``cache_write_tokens`` (written to it).
+    """
+    price = (prices or DEFAULT_PRICES).get(model)
+    if price is None:
+        return None
+    read_rate = next(
+        (rate for prefix, rate in CACHE_READ_RATES.items() if model.startswith(prefix)),
+        0.5,
+    )
+    uncached = max(0, prompt_tokens - cached_tokens - cache_write_tokens)
+    prompt_cost = price[0] * (
+        uncached + cached_tokens * read_rate + cache_write_tokens * CACHE_WRITE_RATE
+    )
+    return (prompt_cost + completion_tokens * price[1]) / 1e6
+
+
+__all__ = ["CACHE_READ_RATES", "CACHE_WRITE_RATE", "DEFAULT_PRICES", "estimate_cost"]
@@ -0,0 +1,238 @@
+"""
+Lightweight span tracing for the fix loop.
+
+A span times one phase (planner, actor, critic, patch apply, test run, git,
+LLM call) with a monotonic clock, and records its parent so nested phases
+form a tree. Finished spans are written to the active run's ``trace.jsonl``
+as ``"event": "span"`` records. ``export_otlp`` converts a trace file to
+OTLP/JSON (``ExportTraceServiceRequest``) offline for any OpenTelemetry
+backend.
+
+Usage:
+    from nova.telemetry.tracing import span, traced
+
+    with span("test_run", iteration=2) as s:
+        failures, _ = runner.run_tests()
+        s.set("failures", len(failures))
+
+    @traced("planner")
+    def create_plan(...): ...
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "nova_current_span", default=None
+)
+_sink: Optional[Any] = None  # JSONLLogger of the active run
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def set_trace_sink(sink: Optional[Any]) -> None:
+    """Route finished spans to ``sink.log_span(record)`` (None disables)."""
+    global _sink
+    _sink = sink
+
+
+def get_trace_sink() -> Optional[Any]:
+    return _sink
+
+
+class Span:
+    """One timed operation; use through ``span()`` or ``@traced``."""
+
+    __slots__ = (
+        "name",
+        "span_id",
+        "parent_id",
+        "trace_id",
+        "attrs",
+        "status",
+        "error",
+        "_start_unix_ns",
+        "_start_ns",
+        "_token",
+    )
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        parent = _current_span.get()
+        sink = _sink
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = (
+            parent.trace_id
+            if parent
+            else getattr(sink, "trace_id", None) or os.urandom(16).hex()
+        )
+        self.attrs = attrs
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._start_unix_ns = 0
+        self._start_ns = 0
+        self._token: Optional[contextvars.Token] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attrs[key] = value
+
+    def __enter__(self) -> "Span":
+        self._start_unix_ns = time.time_ns()
+        self._start_ns = time.perf_counter_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration_ns = time.perf_counter_ns() - self._start_ns
+        if self._token is not None:
+            _current_span.reset(self._token)
+        if exc_type is not None:
+            self.status = "error"
+            self.error = f"{exc_type.__name__}: {exc}"
+        sink = _sink
+        if sink is not None:
+            record = {
+                "name": self.name,
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "start_unix_ns": self._start_unix_ns,
+                "duration_ms": round(duration_ns / 1e6, 3),
+                "status": self.status,
+                "attrs": self.attrs,
+            }
+            if self.error:
+                record["error"] = self.error
+            try:
+                sink.log_span(record)
+            except Exception:
+                pass  # tracing must never break the run
+        return False
+
+
+def span(name: str, **attrs: Any) -> Span:
+    """Context manager timing ``name``; extra kwargs become span attributes."""
+    return Span(name, attrs)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def traced(name: Optional[str] = None, **attrs: Any) -> Callable[[F], F]:
+    """Decorator form of ``span``; defaults to the function's qualified name."""
+
+    def decorator(fn: F) -> F:
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with Span(span_name, dict(attrs)):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# OTLP/JSON export
+# ---------------------------------------------------------------------------
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, str):
+        return {"stringValue": value}
+    return {"stringValue": json.dumps(value, default=str)}
+
+
+def _iter_span_records(trace_path: Path) -> Iterator[Dict[str, Any]]:
+    with open(trace_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if '"span"' not in line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("event") == "span" and isinstance(record.get("data"), dict):
+                yield record["data"]
+
+
+def to_otlp(
+    spans: List[Dict[str, Any]], service_name: str = "nova-ci-rescue"
+) -> Dict[str, Any]:
+    """Build an OTLP/JSON ExportTraceServiceRequest from span records."""
+    otlp_spans = []
+    for s in spans:
+        start = int(s.get("start_unix_ns") or 0)
+        end = start + int(float(s.get("duration_ms") or 0) * 1e6)
+        item = {
+            "traceId": s.get("trace_id", ""),
+            "spanId": s.get("span_id", ""),
+            "name": s.get("name", ""),
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(start),
+            "endTimeUnixNano": str(end),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)}
+                for k, v in (s.get("attrs") or {}).items()
+            ],
+            "status": (
+                {"code": 2, "message": s.get("error", "")}
+                if s.get("status") == "error"
+                else {"code": 1}
+            ),
+        }
+        if s.get("parent_id"):
+            item["parentSpanId"] = s["parent_id"]
+        otlp_spans.append(item)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": service_name}}
+                    ]
+                },
+                "scopeSpans": [
+                    {"scope": {"name": "nova.telemetry.tracing"}, "spans": otlp_spans}
+                ],
+            }
+        ]
+    }
+
+
+def export_otlp(trace_path: Path, out_path: Optional[Path] = None) -> Path:
+    """Write the spans of ``trace_path`` as OTLP/JSON (default: ``otlp.json`` beside it)."""
+    trace_path = Path(trace_path)
+    out_path = Path(out_path) if out_path else trace_path.with_name("otlp.json")
+    payload = to_otlp(list(_iter_span_records(trace_path)))
+    out_path.write_text(json.dumps(payload), encoding="utf-8")
+    return out_path
+
+
+__all__ = [
+    "Span",
+    "span",
+    "traced",
+    "current_span",
+    "set_trace_sink",
+    "get_trace_sink",
+    "to_otlp",
+    "export_otlp",
+]
@@ -0,0 +1,390 @@
+"""
+Host-wide LLM usage ledger backed by SQLite in WAL mode.
+
+Every call is recorded with its tokens (including prompt-cache hits), latency
+and cost per model and repo.
+Fix-loop outcomes per phase and model are kept alongside, so model routing
+can use real success rates.
+A per-day rollup row is updated in the same ``BEGIN IMMEDIATE`` transaction,
+so concurrent Nova processes never lose updates. Budget checks before each
+call read a handful of rollup rows instead of scanning history. ``compact``
+drops per-call rows past the retention window and keeps the daily totals; it
+runs once a UTC day, when a ledger is opened or every ``COMPACT_CHECK_CALLS``
+recorded calls in a long-running process.
+
+Usage:
+    ledger = UsageLedger.from_settings(get_settings())
+    ledger.record("openai", "gpt-4o", 1200, 300, latency_ms=850.0, repo="owner/repo")
+    ledger.today()  # {"calls": ..., "prompt_tokens": ..., "cost_usd": ...}
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .pricing import estimate_cost
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    provider TEXT,
+    model TEXT NOT NULL,
+    repo TEXT NOT NULL DEFAULT '',
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    latency_ms REAL,
+    cost_usd REAL,
+    status TEXT NOT NULL DEFAULT 'ok'
+);
+CREATE INDEX IF NOT EXISTS calls_day ON calls(day);
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT NOT NULL,
+    model TEXT NOT NULL,
+    repo TEXT NOT NULL DEFAULT '',
+    calls INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, model, repo)
+);
+CREATE TABLE IF NOT EXISTS outcomes (
+    ts REAL NOT NULL,
+    phase TEXT NOT NULL,
+    model TEXT NOT NULL,
+    repo TEXT NOT NULL DEFAULT '',
+    success INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outcomes_phase_model ON outcomes(phase, model, ts);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+# Columns added after the first release, created on older databases at open
+_ADDED_COLUMNS = {
+    "calls": {"cached_tokens": "INTEGER NOT NULL DEFAULT 0"},
+    "daily": {"cached_tokens": "INTEGER NOT NULL DEFAULT 0"},
+}
+# Recorded calls between checks whether today's compaction has run
+COMPACT_CHECK_CALLS = 1000
+
+
+def _utc_day(ts: Optional[float] = None) -> str:
+    moment = datetime.fromtimestamp(ts if ts is not None else time.time(), timezone.utc)
+    return moment.strftime("%Y-%m-%d")
+
+
+class UsageLedger:
+    """Atomic, cross-process record of LLM calls on this host."""
+
+    def __init__(self, path: Path, retain_days: int = 30):
+        """
+        Open (creating if needed) the ledger database.
+
+        Args:
+            path: SQLite database file
+            retain_days: Per-call rows older than this are removed by ``compact``
+        """
+        self.path = Path(path).expanduser()
+        self.retain_days = retain_days
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._records = 0
+        conn = self._conn()
+        with conn:
+            conn.executescript(_SCHEMA)
+        self._add_missing_columns()
+        self._import_legacy_json()
+        self.compact_if_due()
+
+    @classmethod
+    def from_settings(cls, settings) -> "UsageLedger":
+        return cls(Path(settings.usage_db_path))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                str(self.path), timeout=10.0, isolation_level=None
+            )  # autocommit; transactions are explicit
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _add_missing_columns(self) -> None:
+        conn = self._conn()
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for name, decl in columns.items():
+                if name in existing:
+                    continue
+                try:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+                except sqlite3.OperationalError:
+                    pass  # another process added it first
+
+    def _import_legacy_json(self) -> None:
+        """Carry daily call counts over from the old ~/.nova/usage.json once."""
+        legacy = self.path.with_name("usage.json")
+        if not legacy.exists():
+            return
+        try:
+            data = json.loads(legacy.read_text() or "{}")
+        except (OSError, json.JSONDecodeError):
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for day, counts in data.items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO daily (day, model, repo, calls) "
+                    "VALUES (?, 'unknown', '', ?)",
+                    (day, int((counts or {}).get("calls", 0))),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            return
+        try:
+            legacy.rename(legacy.with_suffix(".json.migrated"))
+        except OSError:
+            pass
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+    def record(
+        self,
+        provider: Optional[str],
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency_ms: Optional[float] = None,
+        repo: Optional[str] = None,
+        status: str = "ok",
+        ts: Optional[float] = None,
+        cached_tokens: int = 0,
+        cache_write_tokens: int = 0,
+    ) -> Optional[float]:
+        """
+        Record one call atomically and return its estimated USD cost.
+
+        Calls with no usage (e.g. failures) still count toward the daily call total.
+        ``cached_tokens`` are the prompt tokens served from the provider's
+        prompt cache; they are part of ``prompt_tokens`` but billed lower.
+        """
+        ts = ts if ts is not None else time.time()
+        day = _utc_day(ts)
+        repo = repo or ""
+        cost = estimate_cost(
+            model,
+            prompt_tokens,
+            completion_tokens,
+            cached_tokens=cached_tokens,
+            cache_write_tokens=cache_write_tokens,
+        )
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO calls (ts, day, provider, model, repo, prompt_tokens, "
+                "completion_tokens, cached_tokens, latency_ms, cost_usd, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    ts,
+                    day,
+                    provider,
+                    model,
+                    repo,
+                    prompt_tokens,
+                    completion_tokens,
+                    cached_tokens,
+                    latency_ms,
+                    cost,
+                    status,
+                ),
+            )
+            conn.execute(
+                "INSERT INTO daily (day, model, repo, calls, prompt_tokens, "
+                "completion_tokens, cached_tokens, cost_usd) "
+                "VALUES (?, ?, ?, 1, ?, ?, ?, ?) "
+                "ON CONFLICT(day, model, repo) DO UPDATE SET "
+                "calls = calls + 1, "
+                "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "completion_tokens = completion_tokens + excluded.completion_tokens, "
+                "cached_tokens = cached_tokens + excluded.cached_tokens, "
+                "cost_usd = cost_usd + excluded.cost_usd",
+                (
+                    day,
+                    model,
+                    repo,
+                    prompt_tokens,
+                    completion_tokens,
+                    cached_tokens,
+                    cost or 0.0,
+                ),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._records += 1
+        if self._records % COMPACT_CHECK_CALLS == 0:
+            self.compact_if_due()
+        return cost
+
+    def record_outcome(
+        self, phase: str, model: str, success: bool, repo: Optional[str] = None
+    ) -> None:
+        """Record whether a phase's output (e.g. an actor patch) was accepted."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO outcomes (ts, phase, model, repo, success) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (time.time(), phase, model, repo or "", 1 if success else 0),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Delete per-call and outcome rows past the retention window; daily totals stay."""
+        cutoff_ts = (now if now is not None else time.time()) - timedelta(
+            days=self.retain_days
+        ).total_seconds()
+        cutoff = _utc_day(cutoff_ts)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = conn.execute(
+                "DELETE FROM calls WHERE day < ?", (cutoff,)
+            ).rowcount
+            conn.execute("DELETE FROM outcomes WHERE ts < ?", (cutoff_ts,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    def compact_if_due(self, now: Optional[float] = None) -> Optional[int]:
+        """
+        Run ``compact`` if no process has compacted this ledger today (UTC).
+
+        Returns:
+            The number of per-call rows deleted, or None if it wasn't due
+        """
+        today = _utc_day(now)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM meta WHERE key = 'compacted_day'"
+            ).fetchone()
+            if row is not None and row[0] >= today:
+                conn.execute("COMMIT")
+                return None
+            # Claimed before compacting, so concurrent openers don't all compact
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('compacted_day', ?)",
+                (today,),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.compact(now)
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def today(self, repo: Optional[str] = None) -> Dict[str, Any]:
+        """Totals for the current UTC day (optionally for one repo)."""
+        return self.day_totals(_utc_day(), repo)
+
+    def day_totals(self, day: str, repo: Optional[str] = None) -> Dict[str, Any]:
+        query = (
+            "SELECT COALESCE(SUM(calls), 0), COALESCE(SUM(prompt_tokens), 0), "
+            "COALESCE(SUM(completion_tokens), 0), COALESCE(SUM(cached_tokens), 0), "
+            "COALESCE(SUM(cost_usd), 0) FROM daily WHERE day = ?"
+        )
+        params: List[Any] = [day]
+        if repo is not None:
+            query += " AND repo = ?"
+            params.append(repo)
+        calls, prompt, completion, cached, cost = (
+            self._conn().execute(query, params).fetchone()
+        )
+        return {
+            "day": day,
+            "calls": calls,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "cached_tokens": cached,
+            "cost_usd": round(cost, 6),
+        }
+
+    def by_model(self, since_day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-model totals from the daily rollup, newest spend first."""
+        rows = (
+            self._conn()
+            .execute(
+                "SELECT model, SUM(calls), SUM(prompt_tokens), SUM(completion_tokens), "
+                "SUM(cached_tokens), SUM(cost_usd) FROM daily WHERE day >= ? "
+                "GROUP BY model "
+                "ORDER BY SUM(cost_usd) DESC",
+                (since_day or "0000-00-00",),
+            )
+            .fetchall()
+        )
+        return [
+            {
+                "model": model,
+                "calls": calls,
+                "prompt_tokens": prompt,
+                "completion_tokens": completion,
+                "cached_tokens": cached,
+                "cost_usd": round(cost, 6),
+            }
+            for model, calls, prompt, completion, cached, cost in rows
+        ]
+
+    def success_rate(
+        self, phase: str, model: str, days: int = 14
+    ) -> Tuple[Optional[float], int]:
+        """(success rate, sample count) for ``phase`` on ``model`` over recent days."""
+        since = time.time() - days * 86400
+        n, wins = (
+            self._conn()
+            .execute(
+                "SELECT COUNT(*), COALESCE(SUM(success), 0) FROM outcomes "
+                "WHERE phase = ? AND model = ? AND ts >= ?",
+                (phase, model, since),
+            )
+            .fetchone()
+        )
+        return (wins / n if n else None), n
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+__all__ = ["UsageLedger"]
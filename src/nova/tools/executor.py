@@ -0,0 +1,299 @@
+"""
+Shared subprocess execution service.
+
+Every process Nova spawns (pytest runs, git commands, patch application)
+goes through one ``CommandExecutor`` so timeouts, concurrency limits, output
+caps and timing metrics are handled the same way everywhere:
+
+- ``run(..., sandboxed=True)`` is for heavy commands such as test suites. They
+  go through ``nova.tools.sandbox`` (process-group kill, resource limits,
+  capped output) and take a slot from a global semaphore, so parallel
+  candidates don't oversubscribe the host's cores.
+- Plain ``run(...)`` is for short tool invocations (git). They skip the
+  semaphore and return full output, because callers parse it.
+- ``submit`` runs commands on a thread pool, and ``map_processes`` fans
+  CPU-bound Python work out to a process pool.
+
+Usage:
+    from nova.tools.executor import get_executor
+    result = get_executor().run(["pytest", "-q"], repo, timeout=300, sandboxed=True)
+    if result.timed_out: ...
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+from nova.telemetry.tracing import span
+from nova.tools.sandbox import SandboxLimits, run_command
+
+
+@dataclass
+class ExecResult:
+    """Outcome of one command; mirrors ``subprocess.CompletedProcess``."""
+
+    args: List[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float
+    queued_seconds: float = 0.0
+    timed_out: bool = False
+    truncated: bool = False
+    resources: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+    @property
+    def output(self) -> str:
+        """stdout, or stderr when stdout is empty, stripped (git helper style)."""
+        return (self.stdout or self.stderr or "").strip()
+
+
+class CommandExecutor:
+    """Runs subprocesses with shared limits and records per-call metrics."""
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        limits: Optional[SandboxLimits] = None,
+        history_size: int = 500,
+    ):
+        """
+        Initialize the executor.
+
+        Args:
+            max_concurrency: Sandboxed commands allowed to run at once
+                (default: number of CPU cores)
+            limits: Default sandbox limits for sandboxed commands
+            history_size: Number of recent calls kept for ``metrics()``
+        """
+        self.max_concurrency = max(1, max_concurrency or os.cpu_count() or 1)
+        self.limits = limits or SandboxLimits()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_settings(cls, settings) -> "CommandExecutor":
+        return cls(
+            max_concurrency=settings.max_parallel_commands or None,
+            limits=SandboxLimits.from_settings(settings),
+        )
+
+    # ---------------------------
+    # Running commands
+    # ---------------------------
+    def run(
+        self,
+        cmd: List[str],
+        cwd: Path,
+        timeout: Optional[float] = None,
+        input_text: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        sandboxed: bool = False,
+        limits: Optional[SandboxLimits] = None,
+        label: Optional[str] = None,
+    ) -> ExecResult:
+        """
+        Run ``cmd`` in ``cwd`` and return an ``ExecResult``.
+
+        Raises:
+            FileNotFoundError: If the executable does not exist
+        """
+        label = label or Path(cmd[0]).name
+        with span(label, command=" ".join(cmd[:3]), sandboxed=sandboxed) as s:
+            if sandboxed:
+                queued = time.monotonic()
+                with self._slots:
+                    waited = time.monotonic() - queued
+                    result = self._run_sandboxed(cmd, cwd, timeout, env, limits)
+                result.queued_seconds = waited
+            else:
+                result = self._run_plain(cmd, cwd, timeout, input_text, env)
+            s.set("returncode", result.returncode)
+            s.set("timed_out", result.timed_out)
+            if sandboxed:
+                s.set("queued_seconds", round(result.queued_seconds, 4))
+                s.set("peak_rss_bytes", result.resources.get("peak_rss_bytes"))
+        self._record(label, result)
+        return result
+
+    def _run_plain(
+        self,
+        cmd: List[str],
+        cwd: Path,
+        timeout: Optional[float],
+        input_text: Optional[str],
+        env: Optional[Dict[str, str]],
+    ) -> ExecResult:
+        start = time.monotonic()
+        try:
+            completed = subprocess.run(
+                cmd,
+                cwd=str(cwd),
+                capture_output=True,
+                text=True,
+                input=input_text,
+                env=dict(os.environ, **env) if env else None,
+                timeout=timeout,
+                check=False,
+            )
+        except subprocess.TimeoutExpired as e:
+            return ExecResult(
+                args=list(cmd),
+                returncode=-1,
+                stdout=_as_text(e.stdout),
+                stderr=_as_text(e.stderr)
+                or f"{' '.join(cmd[:2])} timed out after {timeout}s",
+                duration=time.monotonic() - start,
+                timed_out=True,
+            )
+        return ExecResult(
+            args=list(cmd),
+            returncode=completed.returncode,
+            stdout=completed.stdout or "",
+            stderr=completed.stderr or "",
+            duration=time.monotonic() - start,
+        )
+
+    def _run_sandboxed(
+        self,
+        cmd: List[str],
+        cwd: Path,
+        timeout: Optional[float],
+        env: Optional[Dict[str, str]],
+        limits: Optional[SandboxLimits],
+    ) -> ExecResult:
+        raw = run_command(
+            cmd, Path(cwd), timeout or 0, env=env, limits=limits or self.limits
+        )
+        if raw.get("spawn_failed"):
+            raise FileNotFoundError(raw.get("stderr") or cmd[0])
+        return ExecResult(
+            args=list(cmd),
+            returncode=int(raw["returncode"]),
+            stdout=str(raw["stdout"]),
+            stderr=str(raw["stderr"]),
+            duration=float(raw["duration"]),
+            timed_out=bool(raw["timed_out"]),
+            truncated=bool(raw.get("truncated")),
+            resources=dict(raw.get("resources") or {}),
+        )
+
+    def submit(self, cmd: List[str], cwd: Path, **kwargs: Any) -> "Future[ExecResult]":
+        """Run a command in the background; sandboxed calls still share slots."""
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency * 2,
+                    thread_name_prefix="nova-exec",
+                )
+        # Carry the caller's span context so background commands nest under it.
+        ctx = contextvars.copy_context()
+        return self._threads.submit(ctx.run, self.run, cmd, cwd, **kwargs)
+
+    def map_processes(
+        self, fn: Callable[[Any], Any], items: Iterable[Any]
+    ) -> List[Any]:
+        """Apply a picklable ``fn`` to ``items`` on a process pool, in order."""
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.max_concurrency)
+        return list(self._processes.map(fn, items))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            threads, self._threads = self._threads, None
+            processes, self._processes = self._processes, None
+        if threads is not None:
+            threads.shutdown(wait=True)
+        if processes is not None:
+            processes.shutdown(wait=True)
+
+    # ---------------------------
+    # Metrics
+    # ---------------------------
+    def _record(self, label: str, result: ExecResult) -> None:
+        entry = {
+            "label": label,
+            "returncode": result.returncode,
+            "duration": round(result.duration, 4),
+            "queued": round(result.queued_seconds, 4),
+            "timed_out": result.timed_out,
+        }
+        with self._lock:
+            self._history.append(entry)
+            totals = self._totals.setdefault(
+                label,
+                {"calls": 0, "failures": 0, "timeouts": 0, "seconds": 0.0, "max": 0.0},
+            )
+            totals["calls"] += 1
+            totals["failures"] += 0 if result.ok else 1
+            totals["timeouts"] += 1 if result.timed_out else 0
+            totals["seconds"] += result.duration
+            totals["max"] = max(totals["max"], result.duration)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-label totals plus the most recent calls."""
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "by_label": {k: dict(v) for k, v in self._totals.items()},
+                "recent": list(self._history),
+            }
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return str(value)
+
+
+_EXECUTOR: Optional[CommandExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_executor() -> CommandExecutor:
+    """Return the process-wide executor, configured from settings on first use."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            try:
+                from nova.config import get_settings
+
+                _EXECUTOR = CommandExecutor.from_settings(get_settings())
+            except Exception:
+                _EXECUTOR = CommandExecutor()
+        return _EXECUTOR
+
+
+def set_executor(executor: Optional[CommandExecutor]) -> None:
+    """Replace the process-wide executor (None resets to settings on next use)."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        _EXECUTOR = executor
+
+
+__all__ = [
+    "CommandExecutor",
+    "ExecResult",
+    "get_executor",
+    "set_executor",
+]
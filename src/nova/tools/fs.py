@@ -3,14 +3,16 @@ from __future__ import annotations
 import io
 import os
 import tempfile
-import subprocess
 from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Iterable, Iterator, List, Optional, Tuple
-from rich.console import Console
+from nova.logger import LazyConsole
 
-console = Console()
+from nova.telemetry.tracing import traced
+from nova.tools.executor import get_executor
+
+console = LazyConsole()
 
 
 # -------- Basic FS helpers --------
@@ -295,6 +297,7 @@ def _build_content_from_hunks(prev: Optional[bytes], pf: object) -> bytes:
     return "".join(out).encode("utf-8")
 
 
+@traced("patch_apply")
 def apply_and_commit_patch(
     repo_root: Path,
     diff_text: str,
@@ -493,12 +496,11 @@ def apply_patch_with_git(
                 "apply", "--check", "--whitespace=nowarn", str(patch_file)
             )
         else:
-            # Fallback to direct subprocess call
-            result = subprocess.run(
+            # No branch manager: run git through the shared executor directly
+            result = get_executor().run(
                 ["git", "apply", "--check", "--whitespace=nowarn", str(patch_file)],
-                cwd=repo_root,
-                capture_output=True,
-                text=True,
+                repo_root,
+                label="git",
             )
             success = result.returncode == 0
             output = result.stderr or result.stdout
@@ -562,11 +564,10 @@ def apply_patch_with_git(
                 "apply", "--whitespace=nowarn", str(patch_file)
             )
         else:
-            result = subprocess.run(
+            result = get_executor().run(
                 ["git", "apply", "--whitespace=nowarn", str(patch_file)],
-                cwd=repo_root,
-                capture_output=True,
-                text=True,
+                repo_root,
+                label="git",
             )
             success = result.returncode == 0
             output = result.stderr or result.stdout
@@ -600,23 +601,16 @@ def apply_patch_with_git(
             output = "\n".join([unstaged, staged, untracked]).strip()
         else:
             # Get all changes (unstaged, staged, and untracked)
-            result1 = subprocess.run(
-                ["git", "diff", "--name-only"],
-                cwd=repo_root,
-                capture_output=True,
-                text=True,
+            result1 = get_executor().run(
+                ["git", "diff", "--name-only"], repo_root, label="git"
             )
-            result2 = subprocess.run(
-                ["git", "diff", "--name-only", "--cached"],
-                cwd=repo_root,
-                capture_output=True,
-                text=True,
+            result2 = get_executor().run(
+                ["git", "diff", "--name-only", "--cached"], repo_root, label="git"
             )
-            result3 = subprocess.run(
+            result3 = get_executor().run(
                 ["git", "ls-files", "--others", "--exclude-standard"],
-                cwd=repo_root,
-                capture_output=True,
-                text=True,
+                repo_root,
+                label="git",
             )
             success = (
                 result1.returncode == 0
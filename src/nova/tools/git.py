@@ -15,7 +15,7 @@ import re
 import json
 import shutil
 import signal
-import subprocess
+import stat
 import sys
 import urllib.error
 import urllib.parse
@@ -25,9 +25,11 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional, Tuple, List
 
-from rich.console import Console
+from nova.logger import LazyConsole
 
-console = Console()
+from nova.tools.executor import get_executor
+
+console = LazyConsole()
 
 
 class GitBranchManager:
@@ -40,39 +42,40 @@ class GitBranchManager:
         self.original_branch: Optional[str] = None  # Store original branch name
         self.branch_name: Optional[str] = None
         self._original_sigint_handler = None
+        self._original_sigterm_handler = None
         self._handling_interrupt = False
         self._cleaned_up = False
+        # Set by `nova fix` to a nova.agent.checkpoint.Checkpointer; an
+        # interrupted run then saves its progress and keeps the fix branch.
+        self.checkpointer = None
 
     # ---------------------------
     # Low-level command helpers
     # ---------------------------
-    def _run_git_command(self, *args: str) -> Tuple[bool, str]:
-        """Run a git command and return (success, output)."""
+    def _run_git_command(
+        self, *args: str, input_text: Optional[str] = None
+    ) -> Tuple[bool, str]:
+        """Run a git command and return (success, output).
+
+        ``input_text`` is fed to the command's stdin (used by plumbing commands
+        such as ``hash-object --stdin-paths`` and ``update-index --index-info``).
+        """
         try:
-            result = subprocess.run(
+            result = get_executor().run(
                 ["git"] + list(args),
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True,
-                check=False,
+                self.repo_path,
+                input_text=input_text,
+                label="git",
             )
-            out = (result.stdout or result.stderr or "").strip()
-            return result.returncode == 0, out
+            return result.returncode == 0, result.output
         except Exception as e:
             return False, f"git {' '.join(args)} failed: {e}"
 
     def _run_cli(self, args: List[str]) -> Tuple[bool, str]:
         """Run an arbitrary CLI command and return (success, output)."""
         try:
-            result = subprocess.run(
-                args,
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            out = (result.stdout or result.stderr or "").strip()
-            return result.returncode == 0, out
+            result = get_executor().run(args, self.repo_path)
+            return result.returncode == 0, result.output
         except FileNotFoundError as e:
             return False, f"{args[0]} not found: {e}"
         except Exception as e:
@@ -236,6 +239,26 @@ class GitBranchManager:
 
         return self.branch_name
 
+    def resume_fix_branch(self, checkpoint) -> str:
+        """Check out a checkpoint's fix branch at the SHA it was saved with."""
+        self.original_head = checkpoint.original_head
+        self.original_branch = checkpoint.original_branch
+        self.branch_name = checkpoint.branch_name
+        if not self.branch_name or not checkpoint.branch_sha:
+            raise RuntimeError("Checkpoint has no fix branch to resume")
+
+        success, output = self._run_git_command(
+            "checkout", "-B", self.branch_name, checkpoint.branch_sha
+        )
+        if not success:
+            raise RuntimeError(f"Failed to restore branch {self.branch_name}: {output}")
+
+        if self.verbose:
+            console.print(
+                f"[dim]Resumed branch: {self.branch_name} at {checkpoint.branch_sha[:12]}[/dim]"
+            )
+        return self.branch_name
+
     def push_branch(self, remote: str = "origin") -> Tuple[bool, str]:
         """Push the current fix branch to the given remote."""
         if not self.branch_name:
@@ -261,39 +284,170 @@ class GitBranchManager:
             else:
                 message = "🤖 Apply automated fixes to resolve test failures"
 
-        if changed_files is not None:
-            BATCH_SIZE = 100
-            for i in range(0, len(changed_files), BATCH_SIZE):
-                batch = changed_files[i : i + BATCH_SIZE]
-                file_args = ["add", "--"] + [str(f) for f in batch]
-                success, output = self._run_git_command(*file_args)
-                if not success:
-                    if self.verbose:
-                        console.print(f"[red]Failed to stage changes: {output}[/red]")
-                    return False
-        else:
+        if changed_files is None:
+            # Unknown change set: fall back to a full working-tree scan.
             success, output = self._run_git_command("add", "-A")
             if not success:
                 if self.verbose:
                     console.print(f"[red]Failed to stage changes: {output}[/red]")
                 return False
+        elif not self._stage_paths(changed_files):
+            return False
 
-        success, _ = self._run_git_command("diff", "--cached", "--quiet")
-        if success:
-            if self.verbose:
-                console.print("[dim]No changes to commit[/dim]")
-            return True
-
-        success, output = self._run_git_command("commit", "-m", message)
+        # Write the tree from the index and compare against HEAD's tree instead of
+        # running `diff --cached` and `commit`, which both walk the whole index.
+        success, tree = self._run_git_command("write-tree")
         if not success:
             if self.verbose:
-                console.print(f"[red]Failed to commit: {output}[/red]")
+                console.print(f"[red]Failed to write tree: {tree}[/red]")
+            return False
+
+        parent = self._get_current_head()
+        if parent:
+            success, parent_tree = self._run_git_command(
+                "rev-parse", f"{parent}^{{tree}}"
+            )
+            if success and parent_tree == tree:
+                if self.verbose:
+                    console.print("[dim]No changes to commit[/dim]")
+                return True
+
+        commit_sha = self._commit_tree(
+            tree, [parent] if parent else [], message, expected_head=parent or ""
+        )
+        if not commit_sha:
             return False
 
         if self.verbose:
             console.print(f"[green]✓ Committed: {message}[/green]")
         return True
 
+    # ---------------------------
+    # Plumbing commit writer
+    # ---------------------------
+    def _relative_git_path(self, path: Path) -> Optional[str]:
+        """Return ``path`` relative to the repo root in git's POSIX form."""
+        p = Path(path)
+        if p.is_absolute():
+            try:
+                p = p.relative_to(self.repo_path)
+            except ValueError:
+                try:
+                    p = p.resolve().relative_to(Path(self.repo_path).resolve())
+                except ValueError:
+                    return None
+        return p.as_posix()
+
+    def _stage_paths(self, changed_files: List[Path]) -> bool:
+        """Stage exactly ``changed_files`` without scanning the working tree.
+
+        Blobs are written in one ``hash-object -w --stdin-paths`` call and the
+        index entries are replaced in one ``update-index --index-info`` call, so
+        the cost is proportional to the number of changed paths rather than the
+        size of the repository. Deleted paths are removed from the index.
+        """
+        entries: List[str] = []
+        regular: List[Tuple[str, str]] = []  # (mode, path) hashed via --stdin-paths
+        seen = set()
+
+        for f in changed_files:
+            rel = self._relative_git_path(f)
+            if rel is None:
+                if self.verbose:
+                    console.print(
+                        f"[red]Refusing to stage path outside repo: {f}[/red]"
+                    )
+                return False
+            if rel in seen:
+                continue
+            seen.add(rel)
+            full = Path(self.repo_path) / rel
+            try:
+                st = os.lstat(full)
+            except FileNotFoundError:
+                # mode 0 with the null SHA removes the path from the index
+                entries.append(f"0 {'0' * 40}\t{rel}")
+                continue
+            if stat.S_ISLNK(st.st_mode):
+                ok, sha = self._run_git_command(
+                    "hash-object", "-w", "--stdin", input_text=os.readlink(full)
+                )
+                if not ok:
+                    if self.verbose:
+                        console.print(f"[red]Failed to hash {rel}: {sha}[/red]")
+                    return False
+                entries.append(f"120000 {sha}\t{rel}")
+            elif stat.S_ISDIR(st.st_mode):
+                # Directories (e.g. nested repos) are left to porcelain staging.
+                ok, output = self._run_git_command("add", "--", rel)
+                if not ok:
+                    if self.verbose:
+                        console.print(f"[red]Failed to stage changes: {output}[/red]")
+                    return False
+            else:
+                mode = "100755" if st.st_mode & stat.S_IXUSR else "100644"
+                regular.append((mode, rel))
+
+        if regular:
+            ok, output = self._run_git_command(
+                "hash-object",
+                "-w",
+                "--stdin-paths",
+                input_text="\n".join(rel for _, rel in regular) + "\n",
+            )
+            shas = output.splitlines() if ok else []
+            if len(shas) != len(regular):
+                if self.verbose:
+                    console.print(f"[red]Failed to hash changed files: {output}[/red]")
+                return False
+            entries.extend(
+                f"{mode} {sha}\t{rel}" for (mode, rel), sha in zip(regular, shas)
+            )
+
+        if not entries:
+            return True
+
+        ok, output = self._run_git_command(
+            "update-index", "--index-info", input_text="\n".join(entries) + "\n"
+        )
+        if not ok and self.verbose:
+            console.print(f"[red]Failed to stage changes: {output}[/red]")
+        return ok
+
+    def _commit_tree(
+        self, tree: str, parents: List[str], message: str, expected_head: str
+    ) -> Optional[str]:
+        """Create a commit object for ``tree`` and advance HEAD to it.
+
+        Returns the new commit SHA, or None on failure. HEAD is only moved if
+        it still points at ``expected_head`` (the commit the caller read before
+        building ``tree``; empty for an unborn branch), so a concurrent update
+        fails the commit instead of being silently overwritten.
+        """
+        args = ["commit-tree", tree]
+        for parent in parents:
+            args += ["-p", parent]
+        args += ["-m", message]
+        ok, commit_sha = self._run_git_command(*args)
+        if not ok or not commit_sha:
+            if self.verbose:
+                console.print(f"[red]Failed to commit: {commit_sha}[/red]")
+            return None
+
+        ok, output = self._run_git_command(
+            "update-ref",
+            "-m",
+            f"nova: {message.splitlines()[0]}",
+            "HEAD",
+            commit_sha,
+            expected_head,
+        )
+        if not ok:
+            if self.verbose:
+                console.print(f"[red]Failed to update HEAD: {output}[/red]")
+            return None
+        return commit_sha
+
     def _detect_nested_git_repos(self) -> List[Path]:
         nested_repos: List[Path] = []
         for git_dir in self.repo_path.glob("**/.git"):
@@ -342,19 +496,19 @@ class GitBranchManager:
             else:
                 commit_message = "🤖 Apply automated fixes to resolve test failures"
 
-        # Perform the squash using soft reset and recommit
-        success, _ = self._run_git_command("reset", "--soft", self.original_head)
-        if not success:
+        # The branch tip already holds the final tree, so the squashed commit is
+        # just that tree re-parented onto the original HEAD. No reset, no
+        # working-tree scan, and the index is left untouched.
+        tip = self._get_current_head()
+        if not tip:
             return False
-
-        # Stage all changes
-        success, _ = self._run_git_command("add", "-A")
+        success, tree = self._run_git_command("rev-parse", f"{tip}^{{tree}}")
         if not success:
             return False
 
-        # Create the squashed commit
-        success, _ = self._run_git_command("commit", "-m", commit_message)
-        if not success:
+        if not self._commit_tree(
+            tree, [self.original_head], commit_message, expected_head=tip
+        ):
             return False
 
         if self.verbose:
@@ -531,8 +685,12 @@ class GitBranchManager:
     # ---------------------------
     # Cleanup & signals
     # ---------------------------
-    def cleanup(self, success: bool = False):
-        """Clean up the repository state."""
+    def cleanup(self, success: bool = False, keep_branch: bool = False):
+        """Clean up the repository state.
+
+        With ``keep_branch`` a failed run still restores the original checkout
+        but leaves the fix branch in place for ``nova fix --resume``.
+        """
         if not self.original_head:
             return
 
@@ -572,7 +730,11 @@ class GitBranchManager:
             ok, output = self._run_git_command("reset", "--hard", self.original_head)
             if ok:
                 console.print("[dim]Repository reset to original state[/dim]")
-                if self.branch_name:
+                if self.branch_name and keep_branch:
+                    console.print(
+                        f"[dim]Kept branch {self.branch_name}; continue with `nova fix --resume`[/dim]"
+                    )
+                elif self.branch_name:
                     ok, _ = self._run_git_command("branch", "-D", self.branch_name)
                     if ok and self.verbose:
                         console.print(f"[dim]Deleted branch: {self.branch_name}[/dim]")
@@ -580,25 +742,41 @@ class GitBranchManager:
                 console.print(f"[red]Failed to reset repository: {output}[/red]")
 
     def _signal_handler(self, signum, frame):
-        """Handle interrupt signal (Ctrl+C)."""
+        """Handle interrupt signals (Ctrl+C, or SIGTERM from a CI timeout)."""
         if self._handling_interrupt:
             return
         self._handling_interrupt = True
         console.print("\n[yellow]Interrupted! Cleaning up...[/yellow]")
         self.restore_signal_handler()
-        self.cleanup(success=False)
-        sys.exit(130)
+        saved = False
+        if self.checkpointer is not None:
+            try:
+                self.checkpointer.save("interrupted")
+                saved = True
+            except Exception as e:
+                console.print(
+                    f"[yellow]Warning: Failed to save checkpoint: {e}[/yellow]"
+                )
+        self.cleanup(success=False, keep_branch=saved)
+        sys.exit(128 + signum)
 
     def setup_signal_handler(self):
         if self._original_sigint_handler is None:
             self._original_sigint_handler = signal.signal(
                 signal.SIGINT, self._signal_handler
             )
+        if self._original_sigterm_handler is None:
+            self._original_sigterm_handler = signal.signal(
+                signal.SIGTERM, self._signal_handler
+            )
 
     def restore_signal_handler(self):
         if self._original_sigint_handler:
             signal.signal(signal.SIGINT, self._original_sigint_handler)
             self._original_sigint_handler = None
+        if self._original_sigterm_handler is not None:
+            signal.signal(signal.SIGTERM, self._original_sigterm_handler)
+            self._original_sigterm_handler = None
 
 
 @contextmanager
@@ -7,6 +7,7 @@ from urllib.parse import urlparse
 import httpx
 
 from ..config import NovaSettings
+from .rate_limit import RateLimiter, backoff_delay, parse_retry_after
 
 
 def _host_from_url(url: str) -> str:
@@ -26,8 +27,11 @@ class AllowedHTTPClient:
         settings: NovaSettings,
         timeout: Optional[float] = 30.0,
         headers: Optional[Dict[str, str]] = None,
+        limiter: Optional[RateLimiter] = None,
     ) -> None:
         self.settings = settings
+        # Optional host-wide limiter; 429 Retry-After pauses it for all processes
+        self._limiter = limiter
         self._timeout = timeout
         self._session = httpx.Client(timeout=timeout)
         # Build effective allow-list; include OpenSWE base host if configured
@@ -65,6 +69,8 @@ class AllowedHTTPClient:
 
         last_exc: Optional[Exception] = None
         for attempt in range(retries + 1):
+            if self._limiter is not None:
+                self._limiter.acquire()
             try:
                 resp = self._session.request(
                     method,
@@ -76,16 +82,20 @@ class AllowedHTTPClient:
                     timeout=timeout or self._timeout,
                 )
                 if resp.status_code in (429, 500, 502, 503, 504) and attempt < retries:
-                    delay = backoff_base * (2**attempt)
-                    time.sleep(delay)
+                    delay = backoff_delay(
+                        attempt, backoff_base, parse_retry_after(resp.headers)
+                    )
+                    if resp.status_code == 429 and self._limiter is not None:
+                        self._limiter.pause(delay)
+                    else:
+                        time.sleep(delay)
                     continue
                 return resp
             except (httpx.TransportError, httpx.TimeoutException) as e:
                 last_exc = e
                 if attempt >= retries:
                     raise
-                delay = backoff_base * (2**attempt)
-                time.sleep(delay)
+                time.sleep(backoff_delay(attempt, backoff_base))
         # Should not reach here; raise last exception if present
         if last_exc:
             raise last_exc
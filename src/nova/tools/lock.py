@@ -1,31 +1,120 @@
 """
 File locking utilities for preventing concurrent Nova runs.
+
+Locks are kernel-level (``fcntl.flock``) on POSIX: acquisition is atomic,
+waiters wake as soon as the holder releases, and a crashed holder's lock is
+dropped by the kernel, so there is no staleness check. With ``fifo=True``
+waiters are served in arrival order through a chain of ticket files. For
+runners spread over several hosts, set ``NOVA_LOCK_SERVER=host:port`` and run
+``LockServer`` (a minimal stand-in for a real lock service) somewhere all of
+them can reach.
 """
 
 import os
 import time
 import json
+import errno
+import signal
+import socket
+import threading
+import socketserver
+from collections import deque
 from pathlib import Path
-from typing import Optional
+from typing import Deque, Dict, Optional, Tuple
 from contextlib import contextmanager
 from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit
+
+from nova.tools.executor import get_executor
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
+
+class _LockWaitTimeout(Exception):
+    """Raised internally when a blocking wait exceeds its deadline."""
+
+
+def _holder_info() -> dict:
+    return {
+        "pid": os.getpid(),
+        "timestamp": datetime.now().isoformat(),
+        "hostname": os.environ.get("HOSTNAME") or socket.gethostname() or "unknown",
+    }
+
+
+def _flock_wait(fd: int, deadline: Optional[float]) -> bool:
+    """
+    Take an exclusive flock on ``fd``, blocking until ``deadline``.
+
+    In the main thread the wait is a true blocking ``flock`` interrupted by a
+    one-shot timer, so release wakes us immediately. Other threads can't use
+    signals and fall back to short non-blocking retries.
+    """
+    if deadline is None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return True
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    if threading.current_thread() is threading.main_thread() and hasattr(
+        signal, "setitimer"
+    ):
+
+        def _on_alarm(signum, frame):
+            raise _LockWaitTimeout()
+
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, remaining)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            return True
+        except _LockWaitTimeout:
+            return False
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    delay = 0.005
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            delay = min(delay * 2, 0.05)
 
 
 class NovaLock:
-    """Simple file-based lock for preventing concurrent Nova runs."""
+    """Kernel-backed file lock for preventing concurrent Nova runs."""
 
-    def __init__(self, repo_path: Path, timeout: int = 3600):
+    def __init__(self, repo_path: Path, timeout: int = 3600, fifo: bool = False):
         """
         Initialize lock manager.
 
         Args:
             repo_path: Repository path to lock
-            timeout: Lock timeout in seconds (default: 1 hour)
+            timeout: Lock timeout in seconds (default: 1 hour). Only used by the
+                non-POSIX fallback; flock locks die with their holder.
+            fifo: Serve waiters in arrival order via a ticket queue
         """
         self.repo_path = repo_path
         self.timeout = timeout
+        self.fifo = fifo
         self.lock_file = repo_path / ".nova" / "nova.lock"
+        self.queue_dir = repo_path / ".nova" / "nova.queue"
         self.lock_file.parent.mkdir(exist_ok=True, parents=True)
+        self._fd: Optional[int] = None
 
     def _read_lock_info(self) -> Optional[dict]:
         """Read lock file information."""
@@ -36,19 +125,14 @@ class NovaLock:
             with open(self.lock_file, "r") as f:
                 return json.load(f)
         except (json.JSONDecodeError, IOError):
-            # Corrupted lock file
+            # Empty (released) or corrupted lock file
             return None
 
     def _write_lock_info(self) -> None:
-        """Write lock file with current process info."""
-        lock_info = {
-            "pid": os.getpid(),
-            "timestamp": datetime.now().isoformat(),
-            "hostname": os.environ.get("HOSTNAME", "unknown"),
-        }
-
-        with open(self.lock_file, "w") as f:
-            json.dump(lock_info, f)
+        """Write current process info into the held lock file."""
+        data = json.dumps(_holder_info()).encode("utf-8")
+        os.ftruncate(self._fd, 0)
+        os.pwrite(self._fd, data, 0)
 
     def _is_lock_stale(self, lock_info: dict) -> bool:
         """Check if a lock is stale based on timeout."""
@@ -71,6 +155,62 @@ class NovaLock:
         except OSError:
             return False
 
+    # ---------------------------
+    # FIFO ticket queue
+    # ---------------------------
+    def _take_ticket(self) -> Tuple[int, Path]:
+        """
+        Publish a ticket file that is already flock'ed by us.
+
+        The file is locked before it is renamed into the queue directory, so
+        any ticket a waiter can see is guaranteed to be held by a live process.
+        """
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        counter = self.queue_dir / "counter"
+        cfd = os.open(counter, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(cfd, fcntl.LOCK_EX)
+            raw = os.pread(cfd, 32, 0).strip()
+            ticket = int(raw) + 1 if raw.isdigit() else 1
+            os.ftruncate(cfd, 0)
+            os.pwrite(cfd, str(ticket).encode("ascii"), 0)
+
+            tmp = self.queue_dir / f".{ticket:012d}.{os.getpid()}.tmp"
+            tfd = os.open(tmp, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(tfd, fcntl.LOCK_EX)
+            path = self.queue_dir / f"{ticket:012d}.ticket"
+            os.rename(tmp, path)
+        finally:
+            os.close(cfd)
+        return tfd, path
+
+    def _wait_for_turn(self, ticket_path: Path, deadline: Optional[float]) -> bool:
+        """Block on each predecessor ticket until none remain ahead of us."""
+        while True:
+            ahead = sorted(
+                p for p in self.queue_dir.glob("*.ticket") if p.name < ticket_path.name
+            )
+            if not ahead:
+                return True
+            predecessor = ahead[-1]
+            try:
+                pfd = os.open(predecessor, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                if not _flock_wait(pfd, deadline):
+                    return False
+                # The predecessor released (or died); its ticket is done either way.
+                try:
+                    predecessor.unlink()
+                except FileNotFoundError:
+                    pass
+            finally:
+                os.close(pfd)
+
+    # ---------------------------
+    # Acquire / release
+    # ---------------------------
     def acquire(self, wait: bool = False, wait_timeout: int = 300) -> bool:
         """
         Acquire the lock.
@@ -82,51 +222,277 @@ class NovaLock:
         Returns:
             True if lock acquired, False otherwise
         """
-        start_time = time.time()
+        if fcntl is None:
+            return self._acquire_exclusive_create(wait, wait_timeout)
+        if self._fd is not None:
+            return True
 
-        while True:
+        deadline = time.monotonic() + wait_timeout if wait else None
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        ticket_fd: Optional[int] = None
+        ticket_path: Optional[Path] = None
+        acquired = False
+        try:
+            if not wait:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    acquired = True
+                except BlockingIOError:
+                    return False
+            else:
+                if self.fifo:
+                    ticket_fd, ticket_path = self._take_ticket()
+                    if not self._wait_for_turn(ticket_path, deadline):
+                        return False
+                acquired = _flock_wait(fd, deadline)
+                if not acquired:
+                    return False
+            self._fd = fd
+            self._write_lock_info()
+            return True
+        finally:
+            if ticket_fd is not None:
+                try:
+                    ticket_path.unlink()
+                except FileNotFoundError:
+                    pass
+                os.close(ticket_fd)
+            if not acquired:
+                os.close(fd)
+
+    def release(self) -> None:
+        """Release the lock if we own it."""
+        if fcntl is None:
             lock_info = self._read_lock_info()
+            if lock_info and lock_info.get("pid") == os.getpid():
+                self.lock_file.unlink(missing_ok=True)
+            return
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            # Clear holder info but keep the file: unlinking a flock'ed path lets
+            # a late opener lock a different inode than current waiters.
+            os.ftruncate(fd, 0)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
 
-            if lock_info is None:
-                # No lock exists, acquire it
-                self._write_lock_info()
-                return True
+    def _acquire_exclusive_create(self, wait: bool, wait_timeout: int) -> bool:
+        """Fallback for platforms without fcntl: atomic O_EXCL lock file."""
+        start_time = time.time()
+        delay = 0.05
+        while True:
+            try:
+                fd = os.open(
+                    self.lock_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644
+                )
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+                lock_info = self._read_lock_info()
+                pid = (lock_info or {}).get("pid", 0)
+                if lock_info and (
+                    self._is_lock_stale(lock_info)
+                    or (pid and not self._is_process_alive(pid))
+                ):
+                    self.lock_file.unlink(missing_ok=True)
+                    continue
+                if not wait or time.time() - start_time > wait_timeout:
+                    return False
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+                continue
+            with os.fdopen(fd, "w") as f:
+                json.dump(_holder_info(), f)
+            return True
 
-            # Check if existing lock is stale
-            if self._is_lock_stale(lock_info):
-                # Lock is stale, remove and acquire
-                self.lock_file.unlink(missing_ok=True)
-                self._write_lock_info()
-                return True
 
-            # Check if process is still alive (only works on same machine)
-            pid = lock_info.get("pid", 0)
-            if pid and not self._is_process_alive(pid):
-                # Process is dead, remove and acquire
-                self.lock_file.unlink(missing_ok=True)
-                self._write_lock_info()
-                return True
+# ---------------------------------------------------------------------------
+# Lock server stand-in for multi-host runners
+# ---------------------------------------------------------------------------
 
-            # Lock is held by another process
-            if not wait:
-                return False
 
-            # Check if we've exceeded wait timeout
-            if time.time() - start_time > wait_timeout:
+class _LockServerHandler(socketserver.StreamRequestHandler):
+    """
+    Line protocol, one lock per connection:
+
+        client: ACQUIRE <name> <wait 0|1> <holder-json>
+        server: OK                    (granted; held until RELEASE or disconnect)
+                BUSY <holder-json>    (wait=0 and the lock is held)
+        client: RELEASE
+    """
+
+    def handle(self) -> None:
+        server: "LockServer" = self.server  # type: ignore[assignment]
+        line = self.rfile.readline().decode("utf-8").rstrip("\n")
+        parts = line.split(" ", 3)
+        if len(parts) < 3 or parts[0] != "ACQUIRE":
+            self.wfile.write(b"ERR bad request\n")
+            return
+        name, wait = parts[1], parts[2] == "1"
+        try:
+            info = json.loads(parts[3]) if len(parts) > 3 else {}
+        except json.JSONDecodeError:
+            info = {}
+
+        if not server._enqueue(name, self, info, wait):
+            holder = server._holders.get(name, {})
+            self.wfile.write(f"BUSY {json.dumps(holder)}\n".encode("utf-8"))
+            return
+        try:
+            if not server._wait_turn(name, self):
+                return
+            self.wfile.write(b"OK\n")
+            self.wfile.flush()
+            # Held until the client says RELEASE or the connection drops.
+            self.rfile.readline()
+        finally:
+            server._dequeue(name, self)
+
+
+class LockServer(socketserver.ThreadingTCPServer):
+    """Minimal FIFO lock service; a lock is tied to its client connection."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 0)):
+        super().__init__(address, _LockServerHandler)
+        self._cond = threading.Condition()
+        self._queues: Dict[str, Deque[object]] = {}
+        self._holders: Dict[str, dict] = {}
+        self._infos: Dict[int, dict] = {}
+
+    def _enqueue(self, name: str, handler: object, info: dict, wait: bool) -> bool:
+        with self._cond:
+            queue = self._queues.setdefault(name, deque())
+            if queue and not wait:
                 return False
+            queue.append(handler)
+            self._infos[id(handler)] = info
+            return True
+
+    def _wait_turn(self, name: str, handler: _LockServerHandler) -> bool:
+        import select
+
+        with self._cond:
+            while self._queues[name][0] is not handler:
+                self._cond.wait(timeout=0.2)
+                # A waiting client that hung up (timed out) leaves the queue.
+                readable, _, _ = select.select([handler.connection], [], [], 0)
+                if readable and not handler.connection.recv(1, socket.MSG_PEEK):
+                    return False
+            self._holders[name] = self._infos.get(id(handler), {})
+            return True
+
+    def _dequeue(self, name: str, handler: object) -> None:
+        with self._cond:
+            queue = self._queues.get(name)
+            if queue and handler in queue:
+                if queue[0] is handler:
+                    self._holders.pop(name, None)
+                queue.remove(handler)
+            if queue is not None and not queue:
+                del self._queues[name]
+            self._infos.pop(id(handler), None)
+            self._cond.notify_all()
+
+    def serve_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
 
-            # Wait a bit and retry
-            time.sleep(5)
+
+class RemoteNovaLock:
+    """NovaLock-compatible client for ``LockServer``."""
+
+    def __init__(self, address: str, name: str):
+        host, _, port = address.rpartition(":")
+        self.address = (host or "127.0.0.1", int(port))
+        self.name = name.replace(" ", "_")
+        self.lock_file = f"lock://{host}:{port}/{self.name}"
+        self._sock: Optional[socket.socket] = None
+        self._holder: Optional[dict] = None
+
+    def _read_lock_info(self) -> Optional[dict]:
+        return self._holder
+
+    def acquire(self, wait: bool = False, wait_timeout: int = 300) -> bool:
+        sock = socket.create_connection(self.address, timeout=10)
+        request = f"ACQUIRE {self.name} {int(wait)} {json.dumps(_holder_info())}\n"
+        sock.sendall(request.encode("utf-8"))
+        sock.settimeout(wait_timeout if wait else 10)
+        reader = sock.makefile("rb")
+        try:
+            reply = reader.readline().decode("utf-8").rstrip("\n")
+        except socket.timeout:
+            reply = ""
+        finally:
+            reader.close()
+        if reply == "OK":
+            sock.settimeout(None)
+            self._sock = sock
+            return True
+        if reply.startswith("BUSY "):
+            try:
+                self._holder = json.loads(reply[5:])
+            except json.JSONDecodeError:
+                self._holder = None
+        sock.close()
+        return False
 
     def release(self) -> None:
-        """Release the lock if we own it."""
-        lock_info = self._read_lock_info()
-        if lock_info and lock_info.get("pid") == os.getpid():
-            self.lock_file.unlink(missing_ok=True)
+        if self._sock is None:
+            return
+        sock, self._sock = self._sock, None
+        try:
+            sock.sendall(b"RELEASE\n")
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+
+def _lock_key(repo_path: Path) -> str:
+    """
+    Host-independent lock name: the origin URL if ``repo_path`` is the top of
+    a checkout with one, else the resolved path.
+
+    Lock directories that merely sit inside a checkout (cache and serve lock
+    dirs) keep their own path rather than the enclosing checkout's origin.
+    Credentials in the URL are stripped; the key is sent to the lock server.
+    """
+    resolved = Path(repo_path).resolve()
+    try:
+        executor = get_executor()
+        top = executor.run(
+            ["git", "rev-parse", "--show-toplevel"], resolved, label="git"
+        )
+        if not top.ok or Path(top.stdout.strip()).resolve() != resolved:
+            return str(resolved)
+        result = executor.run(
+            ["git", "config", "--get", "remote.origin.url"], resolved, label="git"
+        )
+        url = result.stdout.strip()
+        if result.ok and url:
+            parts = urlsplit(url)
+            if parts.scheme and "@" in parts.netloc:
+                url = urlunsplit(parts._replace(netloc=parts.netloc.rsplit("@", 1)[1]))
+            return url
+    except Exception:
+        pass
+    return str(resolved)
 
 
 @contextmanager
-def nova_lock(repo_path: Path, timeout: int = 3600, wait: bool = False):
+def nova_lock(
+    repo_path: Path,
+    timeout: int = 3600,
+    wait: bool = False,
+    fifo: bool = False,
+    wait_timeout: int = 300,
+):
     """
     Context manager for Nova file locking.
 
@@ -134,6 +500,8 @@ def nova_lock(repo_path: Path, timeout: int = 3600, wait: bool = False):
         repo_path: Repository path to lock
         timeout: Lock timeout in seconds
         wait: Whether to wait for lock availability
+        fifo: Serve concurrent waiters in arrival order
+        wait_timeout: Maximum time to wait in seconds
 
     Yields:
         None if lock acquired
@@ -141,10 +509,14 @@ def nova_lock(repo_path: Path, timeout: int = 3600, wait: bool = False):
     Raises:
         RuntimeError: If lock cannot be acquired
     """
-    lock = NovaLock(repo_path, timeout)
+    server = os.environ.get("NOVA_LOCK_SERVER")
+    if server:
+        lock = RemoteNovaLock(server, _lock_key(repo_path))
+    else:
+        lock = NovaLock(repo_path, timeout, fifo=fifo)
 
     try:
-        if not lock.acquire(wait=wait):
+        if not lock.acquire(wait=wait, wait_timeout=wait_timeout):
             lock_info = lock._read_lock_info()
             if lock_info:
                 pid = lock_info.get("pid", "unknown")
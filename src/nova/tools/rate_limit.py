@@ -0,0 +1,325 @@
+"""
+Host-wide rate limiting and retry scheduling for LLM and HTTP calls.
+
+Each (provider, API key) pair has two token buckets, one for requests/min and
+one for tokens/min. The buckets are stored in a small SQLite database that is
+updated under ``BEGIN IMMEDIATE``, so every Nova process on the host draws
+from the same quota. Only a hash of the key is stored. When any process gets
+a 429, the ``Retry-After`` it received pauses the bucket for all of them.
+Retries use full-jitter backoff so that many waiting rescues don't all retry
+at the same moment.
+
+Usage:
+    limiter = RateLimiter.for_key("openai", api_key, requests_per_min=500,
+                                  tokens_per_min=200_000)
+    response = limiter.call(lambda: client.chat.completions.create(**kw),
+                            tokens=estimate)
+    limiter.settle(estimate, response.usage.total_tokens)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Callable, Mapping, Optional, TypeVar
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+_RETRYABLE_ERRORS = frozenset(
+    {
+        "APIConnectionError",
+        "APITimeoutError",
+        "ConnectError",
+        "ReadTimeout",
+        "RemoteProtocolError",
+    }
+)
+MAX_BACKOFF_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    bucket TEXT PRIMARY KEY,
+    requests REAL NOT NULL,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Seconds to wait from ``retry-after-ms`` / ``Retry-After`` (delta or HTTP date)."""
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def backoff_delay(
+    attempt: int, base: float = 0.5, retry_after: Optional[float] = None
+) -> float:
+    """Delay before retry ``attempt`` (0-based): server hint, else full-jitter backoff."""
+    if retry_after is not None:
+        # A little jitter on top so callers released together don't collide
+        return min(retry_after, MAX_BACKOFF_SECONDS) + random.uniform(0, 0.1 * base)
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, base * (2**attempt)))
+
+
+def _error_status(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether an SDK/httpx error is worth retrying (rate limits, 5xx, transport)."""
+    status = _error_status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return any(cls.__name__ in _RETRYABLE_ERRORS for cls in type(exc).__mro__)
+
+
+def _error_retry_after(exc: BaseException) -> Optional[float]:
+    return parse_retry_after(getattr(getattr(exc, "response", None), "headers", None))
+
+
+class RateLimiter:
+    """Requests/min and tokens/min buckets for one provider key, shared on the host."""
+
+    def __init__(
+        self,
+        path: Path,
+        bucket: str,
+        requests_per_min: int = 0,
+        tokens_per_min: int = 0,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+    ):
+        """
+        Open (creating if needed) the shared bucket state.
+
+        Args:
+            path: SQLite file holding bucket state for all processes
+            bucket: Bucket name, e.g. ``"openai:<key hash>"``
+            requests_per_min: Request quota; 0 disables the request bucket
+            tokens_per_min: Token quota; 0 disables the token bucket
+            max_retries: Retries for retryable errors in ``call``
+            backoff_base: Base delay for exponential backoff without Retry-After
+        """
+        self.path = Path(path).expanduser()
+        self.bucket = bucket
+        self.requests_per_min = max(0, int(requests_per_min))
+        self.tokens_per_min = max(0, int(tokens_per_min))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_key(
+        cls, provider: str, api_key: Optional[str], settings=None, **kwargs: Any
+    ) -> "RateLimiter":
+        """Limiter for ``provider`` + ``api_key``, with quotas from settings if given."""
+        digest = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        if settings is not None:
+            kwargs.setdefault("requests_per_min", settings.llm_requests_per_min)
+            kwargs.setdefault("tokens_per_min", settings.llm_tokens_per_min)
+            kwargs.setdefault("max_retries", settings.llm_max_retries)
+            path = Path(settings.rate_limit_db_path)
+        else:
+            path = Path("~/.nova/ratelimit.db")
+        return cls(path, f"{provider}:{digest}", **kwargs)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _update(self, fn: Callable[[float, float, float], Any]) -> Any:
+        """
+        Run ``fn(requests, tokens, blocked_until)`` on the refilled bucket in one
+        transaction. ``fn`` returns ``(requests, tokens, blocked_until, result)``.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT requests, tokens, updated, blocked_until FROM buckets "
+                "WHERE bucket = ?",
+                (self.bucket,),
+            ).fetchone()
+            if row is None:
+                requests, tokens, blocked = (
+                    float(self.requests_per_min),
+                    float(self.tokens_per_min),
+                    0.0,
+                )
+            else:
+                requests, tokens, updated, blocked = row
+                elapsed = max(0.0, now - updated)
+                requests = min(
+                    float(self.requests_per_min),
+                    requests + elapsed * self.requests_per_min / 60,
+                )
+                tokens = min(
+                    float(self.tokens_per_min),
+                    tokens + elapsed * self.tokens_per_min / 60,
+                )
+            requests, tokens, blocked, result = fn(requests, tokens, blocked)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets "
+                "(bucket, requests, tokens, updated, blocked_until) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.bucket, requests, tokens, now, blocked),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    # ---------------------------
+    # Buckets
+    # ---------------------------
+    def try_acquire(self, tokens: int = 0) -> float:
+        """Take one request and ``tokens`` if available; else return seconds to wait."""
+        now = time.time()
+
+        def take(requests: float, level: float, blocked: float):
+            if blocked > now:
+                return requests, level, blocked, blocked - now
+            wait = 0.0
+            if self.requests_per_min and requests < 1:
+                wait = (1 - requests) * 60 / self.requests_per_min
+            # A call larger than the whole bucket waits for a full bucket, then runs
+            need = min(float(tokens), float(self.tokens_per_min))
+            if self.tokens_per_min and level < need:
+                wait = max(wait, (need - level) * 60 / self.tokens_per_min)
+            if wait > 0:
+                return requests, level, blocked, wait
+            if self.requests_per_min:
+                requests -= 1
+            if self.tokens_per_min:
+                level -= tokens
+            return requests, level, blocked, 0.0
+
+        return self._update(take)
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """
+        Block until the buckets admit one request of ``tokens`` tokens.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            TimeoutError: If ``timeout`` elapses first
+        """
+        if not self.requests_per_min and not self.tokens_per_min:
+            # Unmetered key: still honour a shared Retry-After pause
+            wait = self.blocked_for()
+            if wait > 0:
+                time.sleep(wait + random.uniform(0, 0.1))
+            return wait
+        start = time.monotonic()
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return time.monotonic() - start
+            if timeout is not None and time.monotonic() - start + wait > timeout:
+                raise TimeoutError(
+                    f"Rate limit for {self.bucket} not available within {timeout}s"
+                )
+            # Jitter spreads out waiters woken for the same refill
+            time.sleep(wait + random.uniform(0, min(1.0, wait * 0.1)))
+
+    def settle(self, reserved_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once a call's real usage is known."""
+        if not self.tokens_per_min or reserved_tokens == actual_tokens:
+            return
+        delta = float(reserved_tokens - actual_tokens)
+        self._update(
+            lambda r, t, b: (r, min(float(self.tokens_per_min), t + delta), b, None)
+        )
+
+    def pause(self, seconds: float) -> None:
+        """Block the key for every process on the host (server asked us to back off)."""
+        until = time.time() + seconds
+        self._update(lambda r, t, b: (min(r, 0.0), t, max(b, until), None))
+
+    def blocked_for(self) -> float:
+        row = (
+            self._conn()
+            .execute(
+                "SELECT blocked_until FROM buckets WHERE bucket = ?", (self.bucket,)
+            )
+            .fetchone()
+        )
+        return max(0.0, row[0] - time.time()) if row else 0.0
+
+    # ---------------------------
+    # Retry scheduling
+    # ---------------------------
+    def call(self, fn: Callable[[], T], tokens: int = 0) -> T:
+        """
+        Run ``fn`` once the buckets admit it. Retry rate limits, 5xx and transport
+        errors up to ``max_retries`` times, honouring ``Retry-After``.
+        """
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                return fn()
+            except Exception as e:
+                if tokens:
+                    self.settle(tokens, 0)  # rejected calls don't use the quota
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                retry_after = _error_retry_after(e)
+                delay = backoff_delay(attempt, self.backoff_base, retry_after)
+                if _error_status(e) == 429:
+                    # Tell the other processes on this key to back off too
+                    self.pause(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+__all__ = [
+    "RateLimiter",
+    "backoff_delay",
+    "is_retryable",
+    "parse_retry_after",
+]
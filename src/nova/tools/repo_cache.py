@@ -0,0 +1,336 @@
+"""
+Local repository cache for multi-repo (fleet) runs.
+
+Each remote gets one bare mirror under ``<cache_dir>/mirrors`` that is fetched
+incrementally; jobs check out the failing SHA as a detached ``git worktree``
+under ``<cache_dir>/worktrees`` instead of doing a fresh clone. Mirrors are
+evicted by age and by total cache size, least recently used first.
+
+Every fetch, worktree change and eviction of a mirror holds that mirror's
+lock, kept under ``<cache_dir>/locks`` so evicting a mirror never deletes a
+lock someone holds.
+
+Usage:
+    cache = RepoCache.from_settings(get_settings())
+    with cache.checkout("https://github.com/owner/repo.git", head_sha) as path:
+        ...  # run `nova fix` against `path`
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import ContextManager, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from nova.tools.executor import get_executor
+from nova.tools.lock import nova_lock
+
+_LAST_USED_MARKER = "nova-last-used"
+
+# Only branches and tags are mirrored; PR refs and other namespaces are fetched
+# on demand by SHA so large hosting-side ref sets don't bloat the mirror.
+_MIRROR_REFSPECS = ["+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"]
+
+
+def _strip_credentials(url: str) -> str:
+    """Remove any user:token@ component from an http(s) URL."""
+    parts = urlsplit(url)
+    if parts.scheme in ("http", "https") and "@" in parts.netloc:
+        return urlunsplit(parts._replace(netloc=parts.netloc.rsplit("@", 1)[1]))
+    return url
+
+
+def _mirror_key(url: str) -> str:
+    """Stable, filesystem-safe directory name for a remote URL."""
+    clean = _strip_credentials(url).rstrip("/")
+    if clean.endswith(".git"):
+        clean = clean[:-4]
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", "/".join(clean.split("/")[-2:]))
+    digest = hashlib.sha1(clean.encode("utf-8")).hexdigest()[:12]
+    return f"{slug}-{digest}"
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _worktrees(mirror: Path) -> int:
+    admin = mirror / "worktrees"
+    return len(list(admin.iterdir())) if admin.is_dir() else 0
+
+
+@dataclass
+class MirrorInfo:
+    """Size and recency of one cached mirror."""
+
+    path: Path
+    size_bytes: int
+    last_used: float
+    active_worktrees: int
+
+
+class RepoCache:
+    """Bare-mirror + worktree cache shared by Nova jobs on one host."""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = 20 * 1024**3,
+        max_age_seconds: int = 7 * 24 * 3600,
+        git_timeout: int = 600,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Root directory for mirrors and worktrees
+            max_bytes: Evict least recently used mirrors above this total size
+            max_age_seconds: Evict mirrors unused for longer than this
+            git_timeout: Timeout in seconds for clone/fetch operations
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.git_timeout = git_timeout
+        self.mirrors_dir = self.cache_dir / "mirrors"
+        self.worktrees_dir = self.cache_dir / "worktrees"
+        self.locks_dir = self.cache_dir / "locks"
+        self.mirrors_dir.mkdir(parents=True, exist_ok=True)
+        self.worktrees_dir.mkdir(parents=True, exist_ok=True)
+        self.locks_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, settings) -> "RepoCache":
+        return cls(
+            Path(settings.repo_cache_dir).expanduser(),
+            max_bytes=settings.repo_cache_max_bytes,
+            max_age_seconds=settings.repo_cache_max_age_sec,
+        )
+
+    # ---------------------------
+    # Low-level command helpers
+    # ---------------------------
+    def _git(
+        self, *args: str, git_dir: Optional[Path] = None, timeout: Optional[int] = None
+    ) -> Tuple[bool, str]:
+        """Run a git command and return (success, output)."""
+        cmd = ["git"]
+        if git_dir is not None:
+            cmd += ["--git-dir", str(git_dir)]
+        cmd += list(args)
+        try:
+            result = get_executor().run(
+                cmd,
+                Path.cwd(),
+                timeout=timeout,
+                env={"GIT_TERMINAL_PROMPT": "0"},
+                label="git",
+            )
+            if result.timed_out:
+                return False, f"git {' '.join(args)} timed out after {timeout}s"
+            return result.returncode == 0, result.output
+        except Exception as e:
+            return False, f"git {' '.join(args)} failed: {e}"
+
+    def _lock(self, mirror: Path) -> ContextManager[None]:
+        """The mirror's lock; not reentrant, so helpers below expect it held."""
+        return nova_lock(
+            self.locks_dir / mirror.stem, wait=True, wait_timeout=self.git_timeout
+        )
+
+    def _touch(self, mirror: Path) -> None:
+        marker = mirror / _LAST_USED_MARKER
+        try:
+            marker.touch()
+            os.utime(marker, None)
+        except OSError:
+            pass
+
+    # ---------------------------
+    # Mirrors
+    # ---------------------------
+    def mirror_path(self, url: str) -> Path:
+        return self.mirrors_dir / f"{_mirror_key(url)}.git"
+
+    def ensure_mirror(self, url: str, fetch: bool = True) -> Path:
+        """
+        Create the bare mirror for ``url`` if missing, else fetch incrementally.
+
+        The URL (which may carry a token) is passed per fetch and never written
+        to the mirror's config.
+
+        Raises:
+            RuntimeError: If the mirror cannot be created or fetched
+        """
+        mirror = self.mirror_path(url)
+        with self._lock(mirror):
+            self._update_mirror(mirror, url, fetch)
+        return mirror
+
+    def _update_mirror(self, mirror: Path, url: str, fetch: bool = True) -> None:
+        """``ensure_mirror`` with the mirror's lock already held."""
+        if not (mirror / "HEAD").exists():
+            ok, out = self._git("init", "--bare", "--quiet", str(mirror))
+            if not ok:
+                raise RuntimeError(f"Failed to initialize mirror {mirror}: {out}")
+            fetch = True
+        if fetch:
+            ok, out = self._git(
+                "fetch",
+                "--prune",
+                "--no-tags",
+                "--quiet",
+                url,
+                *_MIRROR_REFSPECS,
+                git_dir=mirror,
+                timeout=self.git_timeout,
+            )
+            if not ok:
+                raise RuntimeError(f"Failed to fetch {_strip_credentials(url)}: {out}")
+        self._touch(mirror)
+
+    def _ensure_commit(self, mirror: Path, url: str, sha: str) -> None:
+        """
+        Fetch ``sha`` directly if the branch fetch didn't bring it in (e.g.
+        fork PRs). The caller holds the mirror's lock.
+        """
+        ok, _ = self._git("cat-file", "-e", f"{sha}^{{commit}}", git_dir=mirror)
+        if ok:
+            return
+        ok, out = self._git(
+            "fetch",
+            "--no-tags",
+            "--quiet",
+            url,
+            sha,
+            git_dir=mirror,
+            timeout=self.git_timeout,
+        )
+        if not ok:
+            raise RuntimeError(
+                f"Commit {sha} not found in {_strip_credentials(url)}: {out}"
+            )
+
+    # ---------------------------
+    # Worktrees
+    # ---------------------------
+    def add_worktree(self, url: str, sha: str, job_id: Optional[str] = None) -> Path:
+        """
+        Check out ``sha`` of ``url`` as a detached worktree and return its path.
+
+        The mirror is only fetched when ``sha`` is not already present, so a
+        warm cache starts a job with a single ``worktree add``.
+        """
+        mirror = self.mirror_path(url)
+        job_id = job_id or uuid.uuid4().hex[:12]
+        worktree = self.worktrees_dir / f"{mirror.stem}-{job_id}"
+        with self._lock(mirror):
+            if not (mirror / "HEAD").exists():
+                self._update_mirror(mirror, url)
+            try:
+                self._ensure_commit(mirror, url, sha)
+            except RuntimeError:
+                self._update_mirror(mirror, url)
+                self._ensure_commit(mirror, url, sha)
+            ok, out = self._git(
+                "worktree",
+                "add",
+                "--detach",
+                "--force",
+                str(worktree),
+                sha,
+                git_dir=mirror,
+            )
+            self._touch(mirror)
+        if not ok:
+            raise RuntimeError(f"Failed to create worktree for {sha}: {out}")
+        return worktree
+
+    def remove_worktree(self, worktree: Path) -> None:
+        """Remove a job worktree and prune its administrative files."""
+        worktree = Path(worktree)
+        ok, common = self._git("-C", str(worktree), "rev-parse", "--git-common-dir")
+        if ok:
+            mirror = Path(common)
+            if not mirror.is_absolute():
+                mirror = (worktree / mirror).resolve()
+            with self._lock(mirror):
+                self._git(
+                    "worktree", "remove", "--force", str(worktree), git_dir=mirror
+                )
+                self._git("worktree", "prune", git_dir=mirror)
+        shutil.rmtree(worktree, ignore_errors=True)
+
+    @contextmanager
+    def checkout(
+        self, url: str, sha: str, job_id: Optional[str] = None
+    ) -> Iterator[Path]:
+        """Context manager yielding a worktree at ``sha``; removed on exit."""
+        worktree = self.add_worktree(url, sha, job_id)
+        try:
+            yield worktree
+        finally:
+            self.remove_worktree(worktree)
+
+    # ---------------------------
+    # Eviction
+    # ---------------------------
+    def list_mirrors(self) -> List[MirrorInfo]:
+        infos: List[MirrorInfo] = []
+        for mirror in self.mirrors_dir.glob("*.git"):
+            marker = mirror / _LAST_USED_MARKER
+            try:
+                last_used = marker.stat().st_mtime
+            except OSError:
+                last_used = mirror.stat().st_mtime
+            infos.append(
+                MirrorInfo(mirror, _dir_size(mirror), last_used, _worktrees(mirror))
+            )
+        return infos
+
+    def evict(self, now: Optional[float] = None) -> List[Path]:
+        """
+        Remove mirrors older than ``max_age_seconds``, then the least recently
+        used ones until the cache fits in ``max_bytes``. Mirrors with live
+        worktrees are never evicted.
+
+        Returns:
+            Paths of the evicted mirrors
+        """
+        now = now if now is not None else time.time()
+        evicted: List[Path] = []
+        mirrors = sorted(self.list_mirrors(), key=lambda m: m.last_used)
+        total = sum(m.size_bytes for m in mirrors)
+
+        for info in mirrors:
+            if info.active_worktrees:
+                continue
+            too_old = now - info.last_used > self.max_age_seconds
+            too_big = total > self.max_bytes
+            if not (too_old or too_big):
+                continue
+            with self._lock(info.path):
+                if _worktrees(info.path):
+                    continue  # a job checked it out since it was listed
+                shutil.rmtree(info.path, ignore_errors=True)
+            total -= info.size_bytes
+            evicted.append(info.path)
+        return evicted
+
+
+__all__ = ["RepoCache", "MirrorInfo"]
@@ -1,43 +1,316 @@
+"""
+Sandboxed subprocess execution with resource limits and accounting.
+
+Output is streamed into bounded buffers (the first and last bytes of each
+stream are kept, optionally with the full stream spilled to a file), so a
+runaway test suite can't exhaust Nova's memory. Memory, CPU and process
+limits are enforced through a per-command cgroup v2 when a delegated cgroup
+root is writable, falling back to rlimits otherwise. Every result carries
+peak RSS, CPU time and I/O counters under ``"resources"``.
+
+Commands are run from worker threads, where ``preexec_fn`` is unsafe, so the
+child starts in its own session via ``start_new_session`` and, when there are
+limits to apply, through a small Python shim that joins the cgroup, sets the
+rlimits and then execs the command.
+"""
+
 from __future__ import annotations
 
 import os
+import shutil
 import signal
 import subprocess
+import sys
+import threading
 import time
+import uuid
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional
 
+_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class SandboxLimits:
+    """Resource limits for one sandboxed command (None/0 disables a limit)."""
+
+    memory_bytes: Optional[int] = 2 * 1024 * 1024 * 1024
+    cpu_cores: Optional[float] = None  # cgroup cpu.max throttle
+    cpu_seconds: Optional[int] = None  # hard RLIMIT_CPU per process
+    pids_max: Optional[int] = None
+    max_output_bytes: int = 1024 * 1024  # kept in memory per stream
+    spill_dir: Optional[Path] = None  # full streams written here when set
+    cgroup_root: Optional[Path] = Path("/sys/fs/cgroup/nova")
+
+    @classmethod
+    def from_settings(cls, settings) -> "SandboxLimits":
+        return cls(
+            memory_bytes=settings.sandbox_memory_bytes or None,
+            cpu_cores=settings.sandbox_cpu_cores or None,
+            max_output_bytes=settings.sandbox_max_output_bytes,
+            cgroup_root=(
+                Path(settings.sandbox_cgroup_root)
+                if settings.sandbox_cgroup_root
+                else None
+            ),
+        )
+
 
-def _limits_preexec(
-    cpu_seconds: Optional[int] = None, max_address_space_bytes: Optional[int] = None
-):
+class _StreamCapture:
+    """Keeps the head and a tail ring of a stream, optionally spilling it all."""
+
+    def __init__(self, max_bytes: int, spill_path: Optional[Path] = None):
+        self.head_limit = max_bytes // 4
+        self.tail_limit = max_bytes - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+        self.spill_path = spill_path
+        self._spill = open(spill_path, "wb") if spill_path else None
+
+    def write(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        if self._spill is not None:
+            self._spill.write(chunk)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk:
+            self.tail += chunk
+            excess = len(self.tail) - self.tail_limit
+            if excess > 0:
+                del self.tail[:excess]
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self.head) + len(self.tail)
+
+    def text(self) -> str:
+        data = bytes(self.head)
+        if self.truncated:
+            dropped = self.total - len(self.head) - len(self.tail)
+            data += f"\n... [{dropped} bytes truncated] ...\n".encode()
+        data += bytes(self.tail)
+        return data.decode("utf-8", errors="replace")
+
+
+def _pump(stream, capture: _StreamCapture) -> None:
     try:
-        import resource  # type: ignore
-    except Exception:
-        resource = None  # type: ignore
+        fd = stream.fileno()
+        while True:
+            chunk = os.read(fd, _CHUNK_SIZE)
+            if not chunk:
+                break
+            capture.write(chunk)
+    except (OSError, ValueError):
+        pass
+
+
+class _Cgroup:
+    """A throwaway cgroup v2 leaf under a delegated root."""
+
+    def __init__(self, path: Path):
+        self.path = path
 
-    def _apply():
+    @classmethod
+    def create(cls, root: Optional[Path], limits: SandboxLimits) -> Optional["_Cgroup"]:
+        if root is None or sys.platform != "linux":
+            return None
+        root = Path(root)
+        if not (root / "cgroup.procs").exists() or not os.access(root, os.W_OK):
+            return None
         try:
-            os.setsid()
-        except Exception:
+            (root / "cgroup.subtree_control").write_text("+memory +cpu +pids +io")
+        except OSError:
+            pass  # already enabled, or only some controllers delegated
+        path = root / f"nova-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        try:
+            path.mkdir()
+        except OSError:
+            return None
+        cg = cls(path)
+        if limits.memory_bytes:
+            cg._write("memory.max", str(limits.memory_bytes))
+            cg._write("memory.swap.max", "0")
+        if limits.cpu_cores:
+            cg._write("cpu.max", f"{int(limits.cpu_cores * 100000)} 100000")
+        if limits.pids_max:
+            cg._write("pids.max", str(limits.pids_max))
+        return cg
+
+    def _write(self, name: str, value: str) -> bool:
+        try:
+            (self.path / name).write_text(value)
+            return True
+        except OSError:
+            return False
+
+    def _read_kv(self, name: str) -> Dict[str, int]:
+        values: Dict[str, int] = {}
+        try:
+            for line in (self.path / name).read_text().splitlines():
+                key, _, val = line.partition(" ")
+                if val.isdigit():
+                    values[key] = int(val)
+        except OSError:
             pass
-        if resource is None:
-            return
+        return values
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        cpu = self._read_kv("cpu.stat")
+        try:
+            peak: Optional[int] = int((self.path / "memory.peak").read_text())
+        except (OSError, ValueError):
+            peak = None
+        read_bytes: Optional[int] = None
+        write_bytes: Optional[int] = None
         try:
-            if cpu_seconds and cpu_seconds > 0:
-                resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
-        except Exception:
+            io_lines = (self.path / "io.stat").read_text().splitlines()
+            read_bytes = write_bytes = 0
+            for line in io_lines:
+                for field in line.split()[1:]:
+                    key, _, val = field.partition("=")
+                    if key == "rbytes":
+                        read_bytes += int(val)
+                    elif key == "wbytes":
+                        write_bytes += int(val)
+        except (OSError, ValueError):
             pass
+        return {
+            "peak_rss_bytes": peak,
+            "cpu_user_seconds": (
+                cpu["user_usec"] / 1e6 if "user_usec" in cpu else None
+            ),
+            "cpu_system_seconds": (
+                cpu["system_usec"] / 1e6 if "system_usec" in cpu else None
+            ),
+            "io_read_bytes": read_bytes,
+            "io_write_bytes": write_bytes,
+            "oom_killed": self._read_kv("memory.events").get("oom_kill", 0) > 0,
+        }
+
+    def kill(self) -> None:
+        if self._write("cgroup.kill", "1"):
+            return
         try:
-            if max_address_space_bytes and max_address_space_bytes > 0:
-                resource.setrlimit(
-                    resource.RLIMIT_AS,
-                    (max_address_space_bytes, max_address_space_bytes),
-                )
-        except Exception:
+            for pid in (self.path / "cgroup.procs").read_text().split():
+                try:
+                    os.kill(int(pid), signal.SIGKILL)
+                except OSError:
+                    pass
+        except OSError:
             pass
 
-    return _apply
+    def remove(self) -> None:
+        for _ in range(50):
+            try:
+                self.path.rmdir()
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                self.kill()
+                time.sleep(0.02)
+
+
+# Runs in the child: join the cgroup, set rlimits, then become the command.
+# argv: cpu_seconds, data_bytes, cgroup.procs path, executable, *command argv
+_LIMITS_SHIM = """
+import os, sys
+
+cpu_seconds, data_bytes, cgroup_procs = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+if cgroup_procs:
+    try:
+        with open(cgroup_procs, "w") as f:
+            f.write(str(os.getpid()))
+    except OSError:
+        pass
+try:
+    import resource
+except ImportError:
+    resource = None
+if resource is not None and cpu_seconds > 0:
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+    except (OSError, ValueError):
+        pass
+if resource is not None and data_bytes > 0:
+    # RLIMIT_DATA counts committed heap rather than reserved address
+    # space, so runtimes that map large arenas up front still start.
+    kind = resource.RLIMIT_DATA if sys.platform == "linux" else resource.RLIMIT_AS
+    try:
+        resource.setrlimit(kind, (data_bytes, data_bytes))
+    except (OSError, ValueError):
+        pass
+os.execv(sys.argv[4], sys.argv[5:])
+"""
+
+
+def _with_limits(
+    cmd: List[str],
+    executable: str,
+    cpu_seconds: Optional[int] = None,
+    max_data_bytes: Optional[int] = None,
+    cgroup_procs: Optional[str] = None,
+) -> List[str]:
+    """``cmd`` wrapped in the shim that applies limits in the child, if any."""
+    if not (cpu_seconds or max_data_bytes or cgroup_procs):
+        return cmd
+    return [
+        sys.executable,
+        "-I",
+        "-S",
+        "-c",
+        _LIMITS_SHIM,
+        str(cpu_seconds or 0),
+        str(max_data_bytes or 0),
+        cgroup_procs or "",
+        executable,
+        *cmd,
+    ]
+
+
+def _resolve(cmd: List[str], cwd: Path, env: Dict[str, str]) -> str:
+    """The executable ``cmd[0]`` names, as ``Popen`` would find it."""
+    program = cmd[0]
+    if os.sep in program:
+        path = Path(cwd) / program
+        if not (path.is_file() and os.access(path, os.X_OK)):
+            raise FileNotFoundError(2, "No such file or directory", program)
+        return str(path)
+    found = shutil.which(program, path=env.get("PATH", os.defpath))
+    if found is None:
+        raise FileNotFoundError(2, "No such file or directory", program)
+    return found
+
+
+def _rusage_resources(rusage) -> Dict[str, Optional[float]]:
+    if rusage is None:
+        return {
+            "peak_rss_bytes": None,
+            "cpu_user_seconds": None,
+            "cpu_system_seconds": None,
+            "io_read_bytes": None,
+            "io_write_bytes": None,
+            "oom_killed": None,
+        }
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "peak_rss_bytes": rusage.ru_maxrss * scale,
+        "cpu_user_seconds": rusage.ru_utime,
+        "cpu_system_seconds": rusage.ru_stime,
+        "io_read_bytes": rusage.ru_inblock * 512,
+        "io_write_bytes": rusage.ru_oublock * 512,
+        "oom_killed": None,
+    }
 
 
 essential_env_keys = {
@@ -49,90 +322,161 @@ essential_env_keys = {
 }
 
 
+def _signal_group(proc: subprocess.Popen, sig: int) -> None:
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, sig)
+        elif sig == signal.SIGTERM:
+            proc.terminate()
+        else:
+            proc.kill()
+    except Exception:
+        pass
+
+
 def run_command(
     cmd: List[str],
     cwd: Path,
     timeout: int,
     env: Optional[Dict[str, str]] = None,
     capture_output: bool = True,
+    limits: Optional[SandboxLimits] = None,
 ) -> Dict[str, object]:
     """Run a command in a sandboxed subprocess with resource limits.
 
-    Returns a dict with keys: returncode, stdout, stderr, timed_out, duration.
+    Returns a dict with keys: returncode, stdout, stderr, timed_out, duration,
+    truncated, spawn_failed, stdout_path, stderr_path (spill files or None) and
+    resources (peak_rss_bytes, cpu_user_seconds, cpu_system_seconds,
+    io_read_bytes, io_write_bytes, oom_killed, governor).
     """
+    limits = limits or SandboxLimits()
     start = time.time()
-    stdout_pipe = subprocess.PIPE if capture_output else None
-    stderr_pipe = subprocess.PIPE if capture_output else None
-
-    cpu_limit = max(1, int(timeout)) if timeout and timeout > 0 else None
-    two_gib = 2 * 1024 * 1024 * 1024
 
     env_vars = dict(os.environ)
     if env:
         env_vars.update(env)
     # Optionally, we could restrict environment here. Keep essentials.
 
+    cgroup = _Cgroup.create(limits.cgroup_root, limits) if os.name == "posix" else None
+    captures: Dict[str, _StreamCapture] = {}
+    if capture_output:
+        tag = uuid.uuid4().hex[:8]
+        for name in ("stdout", "stderr"):
+            spill = None
+            if limits.spill_dir is not None:
+                Path(limits.spill_dir).mkdir(parents=True, exist_ok=True)
+                spill = Path(limits.spill_dir) / f"{tag}.{name}.log"
+            captures[name] = _StreamCapture(limits.max_output_bytes, spill)
+
     try:
+        argv = cmd
+        if os.name == "posix":
+            argv = _with_limits(
+                cmd,
+                _resolve(cmd, cwd, env_vars),
+                cpu_seconds=limits.cpu_seconds,
+                max_data_bytes=None if cgroup is not None else limits.memory_bytes,
+                cgroup_procs=str(cgroup.path / "cgroup.procs") if cgroup else None,
+            )
         proc = subprocess.Popen(
-            cmd,
+            argv,
             cwd=str(cwd),
             env=env_vars,
-            stdout=stdout_pipe,
-            stderr=stderr_pipe,
-            text=False,
-            preexec_fn=(
-                _limits_preexec(cpu_seconds=cpu_limit, max_address_space_bytes=two_gib)
-                if os.name == "posix"
-                else None
-            ),
+            stdout=subprocess.PIPE if capture_output else None,
+            stderr=subprocess.PIPE if capture_output else None,
+            start_new_session=os.name == "posix",
         )
-
-        try:
-            out, err = proc.communicate(timeout=timeout)
-            timed_out = False
-        except subprocess.TimeoutExpired:
-            timed_out = True
-            try:
-                if os.name == "posix":
-                    os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-                else:
-                    proc.terminate()
-            except Exception:
-                pass
-            try:
-                out, err = proc.communicate(timeout=5)
-            except Exception:
-                try:
-                    if os.name == "posix":
-                        os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
-                    else:
-                        proc.kill()
-                except Exception:
-                    pass
-                out, err = proc.communicate()
-
-        duration = time.time() - start
-        if capture_output:
-            stdout_text = (out or b"").decode("utf-8", errors="replace")
-            stderr_text = (err or b"").decode("utf-8", errors="replace")
-        else:
-            stdout_text = ""
-            stderr_text = ""
-        return {
-            "returncode": proc.returncode,
-            "stdout": stdout_text,
-            "stderr": stderr_text,
-            "timed_out": timed_out,
-            "duration": duration,
-        }
     except FileNotFoundError as e:
+        for capture in captures.values():
+            capture.close()
+        if cgroup is not None:
+            cgroup.remove()
         return {
             "returncode": 127,
             "stdout": "",
             "stderr": str(e),
             "timed_out": False,
             "duration": time.time() - start,
+            "truncated": False,
+            "spawn_failed": True,
+            "stdout_path": None,
+            "stderr_path": None,
+            "resources": dict(_rusage_resources(None), governor="none"),
         }
 
+    readers = []
+    if capture_output:
+        for name, stream in (("stdout", proc.stdout), ("stderr", proc.stderr)):
+            t = threading.Thread(
+                target=_pump, args=(stream, captures[name]), daemon=True
+            )
+            t.start()
+            readers.append(t)
+
+    # Reap in a helper thread so wait4() can hand back the child's rusage.
+    exited = threading.Event()
+    reaped: Dict[str, object] = {}
+
+    def _reap():
+        try:
+            if hasattr(os, "wait4"):
+                _, status, rusage = os.wait4(proc.pid, 0)
+                proc.returncode = os.waitstatus_to_exitcode(status)
+                reaped["rusage"] = rusage
+            else:
+                proc.wait()
+        finally:
+            exited.set()
+
+    threading.Thread(target=_reap, daemon=True).start()
+
+    timed_out = not exited.wait(timeout if timeout and timeout > 0 else None)
+    if timed_out:
+        _signal_group(proc, signal.SIGTERM)
+        if not exited.wait(5):
+            _signal_group(proc, signal.SIGKILL)
+            if cgroup is not None:
+                cgroup.kill()
+            exited.wait()
+    if cgroup is not None and timed_out:
+        cgroup.kill()  # reach children that left the process group
+
+    for t in readers:
+        # Orphaned grandchildren may keep a pipe open; don't wait on them forever.
+        t.join(timeout=5)
+    for stream in (proc.stdout, proc.stderr):
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+    for capture in captures.values():
+        capture.close()
+
+    resources = _rusage_resources(reaped.get("rusage"))
+    governor = "rlimit" if os.name == "posix" else "none"
+    if cgroup is not None:
+        for key, value in cgroup.stats().items():
+            if value is not None:
+                resources[key] = value
+        cgroup.remove()
+        governor = "cgroup"
+    resources["governor"] = governor
+
+    out = captures.get("stdout")
+    err = captures.get("stderr")
+    return {
+        "returncode": proc.returncode,
+        "stdout": out.text() if out else "",
+        "stderr": err.text() if err else "",
+        "timed_out": timed_out,
+        "duration": time.time() - start,
+        "truncated": bool((out and out.truncated) or (err and err.truncated)),
+        "spawn_failed": False,
+        "stdout_path": str(out.spill_path) if out and out.spill_path else None,
+        "stderr_path": str(err.spill_path) if err and err.spill_path else None,
+        "resources": resources,
+    }
+
 
-__all__ = ["run_command"]
+__all__ = ["run_command", "SandboxLimits"]
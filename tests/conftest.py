@@ -0,0 +1,67 @@
+"""
+Shared fixtures for tests that drive real git repositories or run offline
+against the LLM stand-in.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import nova.config
+
+
+def run_git(repo, *args):
+    """Run git in ``repo`` and return its stripped stdout."""
+    return subprocess.run(
+        ["git", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+@pytest.fixture
+def git(monkeypatch):
+    """``run_git`` with a fixed commit identity, so commits work anywhere."""
+    for var in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{var}_NAME", "t")
+        monkeypatch.setenv(f"GIT_{var}_EMAIL", "t@t")
+    return run_git
+
+
+@pytest.fixture
+def make_repo(git):
+    """Create a repo at a path with one commit of a buggy ``calc.py``."""
+
+    def make(path):
+        path.mkdir(parents=True, exist_ok=True)
+        git(path, "init", "-q", "-b", "main")
+        (path / "calc.py").write_text("def add(a, b):\n    return a - b\n")
+        git(path, "add", "-A")
+        git(path, "commit", "-qm", "init")
+        return path
+
+    return make
+
+
+@pytest.fixture
+def offline_env(monkeypatch, tmp_path):
+    """Settings for an LLMClient with no API keys, pointed at a stand-in."""
+
+    def point_at(server, model="gpt-5"):
+        for name in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "GROK_API_KEY"):
+            monkeypatch.delenv(name, raising=False)
+        monkeypatch.setenv("NOVA_LLM_BASE_URL", server.base_url)
+        monkeypatch.setenv("NOVA_DEFAULT_LLM_MODEL", model)
+        monkeypatch.setenv("NOVA_USAGE_DB", str(tmp_path / "usage.db"))
+        monkeypatch.setenv("NOVA_RATE_LIMIT_DB", str(tmp_path / "ratelimit.db"))
+        monkeypatch.setenv("NOVA_LLM_RECORD", str(tmp_path / "recording.jsonl"))
+        monkeypatch.setattr(nova.config, "_CACHED_SETTINGS", None)
+        return tmp_path / "recording.jsonl"
+
+    return point_at
@@ -0,0 +1,102 @@
+"""
+Tests for fix-run checkpoints and resuming from them.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.agent.checkpoint import Checkpointer, load_checkpoint
+from nova.agent.state import AgentState
+from nova.tools.git import GitBranchManager
+
+
+def test_agent_state_round_trips_through_json(tmp_path):
+    state = AgentState(repo_path=tmp_path, max_iterations=4)
+    state.add_failing_tests(
+        [{"name": "test_add", "file": "tests/test_calc.py", "line": 3}]
+    )
+    state.plan = {"approach": "fix add", "steps": ["edit calc.py"]}
+    state.critic_feedback = "handle negatives"
+    state.current_iteration = 2
+    state.used_actions.add(("read_file", ("calc.py",), 0))
+    state.file_cache["calc.py"] = "def add(a, b): ..."
+    state.patches_applied.append("--- a/calc.py\n+++ b/calc.py\n")
+
+    restored = AgentState.from_dict(json.loads(json.dumps(state.to_dict())))
+
+    assert restored == state
+    assert restored.initial_failing_tests == state.failing_tests
+
+
+def test_interrupted_run_resumes_on_saved_branch(tmp_path, git, make_repo):
+    make_repo(tmp_path)
+
+    manager = GitBranchManager(tmp_path)
+    branch = manager.create_fix_branch()
+    state = AgentState(repo_path=tmp_path, current_iteration=1)
+    state.add_failing_tests(
+        [{"name": "test_add", "file": "tests/test_calc.py", "line": 3}]
+    )
+    (tmp_path / "calc.py").write_text("def add(a, b):\n    return a + b\n")
+    checkpointer = Checkpointer(state, manager)
+    checkpointer.save("discovery")
+    assert manager.commit_patch(1)
+    saved_sha = manager._get_current_head()
+    checkpointer.save("verified")
+
+    # What the signal handler does once the checkpoint is saved
+    manager.cleanup(success=False, keep_branch=True)
+    assert git(tmp_path, "rev-parse", "--abbrev-ref", "HEAD") == "main"
+    assert "checkpoint.json" not in git(tmp_path, "show", "--stat", saved_sha)
+
+    checkpoint = load_checkpoint(tmp_path)
+    assert checkpoint.step == "verified"
+    assert [t.name for t in checkpoint.failing_tests()] == ["test_add"]
+
+    resumed = GitBranchManager(tmp_path)
+    assert resumed.resume_fix_branch(checkpoint) == branch
+    assert resumed._get_current_head() == saved_sha
+    assert resumed.original_branch == "main"
+    assert checkpoint.state.current_iteration == 1
+
+
+def test_interrupt_records_the_last_completed_step(
+    tmp_path, monkeypatch, git, make_repo
+):
+    monkeypatch.setenv("NOVA_TELEMETRY_DIR", str(tmp_path / "telemetry"))
+    repo = make_repo(tmp_path / "repo")
+
+    manager = GitBranchManager(repo)
+    branch = manager.create_fix_branch()
+    state = AgentState(repo_path=repo, current_iteration=1)
+    checkpointer = Checkpointer(state, manager)
+    (repo / "calc.py").write_text("def add(a, b):\n    return a + b\n")
+    assert manager.commit_patch(1)
+    verified_sha = manager._get_current_head()
+    checkpointer.save("verified")
+
+    # Interrupted after committing the next patch, before its tests ran
+    (repo / "calc.py").write_text("def add(a, b):\n    return 0\n")
+    assert manager.commit_patch(2)
+    state.patches_applied.append("unverified")
+    checkpointer.save("interrupted")
+    manager.cleanup(success=False, keep_branch=True)
+
+    checkpoint = load_checkpoint(repo)
+    assert checkpoint.step == "interrupted"
+    assert checkpoint.branch_sha == verified_sha
+    assert checkpoint.state.patches_applied == []
+
+    from typer.testing import CliRunner
+
+    from nova.cli import app
+
+    result = CliRunner().invoke(app, ["fix", str(repo), "--resume"])
+
+    assert result.exit_code == 0, result.output
+    assert "Resuming from checkpoint (interrupted" in result.output
+    assert git(repo, "rev-parse", "--abbrev-ref", "HEAD") == branch
+    assert git(repo, "rev-parse", "HEAD") == verified_sha
@@ -0,0 +1,92 @@
+"""
+Tests for the `nova eval` benchmark harness.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.evaluation import (
+    CaseResult,
+    compare,
+    load_suite,
+    render_markdown,
+    run_suite,
+    summarize,
+)
+
+
+def _suite_file(tmp_path, body):
+    for name in ("alpha", "beta", "gamma"):
+        (tmp_path / name).mkdir()
+    path = tmp_path / "suite.yaml"
+    path.write_text(body)
+    return path
+
+
+def test_load_suite_applies_defaults(tmp_path):
+    path = _suite_file(
+        tmp_path,
+        "name: s\nconcurrency: 3\ndefaults: {max_iters: 2, timeout: 90}\n"
+        "cases:\n  - alpha\n  - {name: b, path: beta, max_iters: 7}\n",
+    )
+    suite = load_suite(path)
+    assert suite.name == "s" and suite.concurrency == 3
+    alpha, beta = suite.cases
+    assert (alpha.name, alpha.max_iters, alpha.timeout) == ("alpha", 2, 90)
+    assert (beta.name, beta.max_iters) == ("b", 7)
+    assert beta.path == (tmp_path / "beta").resolve()
+
+
+def test_load_suite_rejects_missing_and_duplicate_cases(tmp_path):
+    with pytest.raises(ValueError, match="not found"):
+        load_suite(_suite_file(tmp_path, "cases: [nope]\n"))
+    path = tmp_path / "dup.yaml"
+    path.write_text("cases: [alpha, {name: alpha, path: beta}]\n")
+    with pytest.raises(ValueError, match="Duplicate"):
+        load_suite(path)
+
+
+def test_run_suite_runs_cases_concurrently_in_suite_order(tmp_path):
+    suite = load_suite(_suite_file(tmp_path, "cases: [alpha, beta, gamma]\n"))
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def fake_runner(case, out_dir, keep):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return CaseResult(case.name, "success", True, 0, 1.0, iterations=1)
+
+    results = run_suite(suite, tmp_path / "out", jobs=3, runner=fake_runner)
+    assert [r.name for r in results] == ["alpha", "beta", "gamma"]
+    assert peak[0] > 1
+
+
+def test_compare_flags_regressions():
+    def case(name, success, wall, tokens):
+        return CaseResult(
+            name,
+            "success" if success else "failed",
+            success,
+            0,
+            wall,
+            prompt_tokens=tokens,
+        )
+
+    baseline = summarize("s", [case("a", True, 10, 1000), case("b", True, 10, 1000)])
+    current = summarize("s", [case("a", True, 10, 1000), case("b", False, 30, 1000)])
+    comparison = compare(current, baseline, tolerance_pct=20)
+
+    assert "b no longer fixed" in comparison["regressions"]
+    assert any("success rate" in r for r in comparison["regressions"])
+    assert any("median_wall_seconds" in r for r in comparison["regressions"])
+    assert "Regressions" in render_markdown(current, comparison)
+    assert compare(baseline, baseline)["regressions"] == []
@@ -0,0 +1,59 @@
+"""
+Tests for the shared command executor.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.tools.executor import CommandExecutor
+
+
+@pytest.fixture
+def executor():
+    ex = CommandExecutor(max_concurrency=2)
+    yield ex
+    ex.shutdown()
+
+
+def test_plain_run_passes_stdin(executor, tmp_path):
+    result = executor.run(
+        [sys.executable, "-c", "import sys; print(sys.stdin.read().upper())"],
+        tmp_path,
+        input_text="nova",
+    )
+    assert result.ok
+    assert result.output == "NOVA"
+
+
+def test_plain_run_timeout(executor, tmp_path):
+    result = executor.run(
+        [sys.executable, "-c", "import time; time.sleep(5)"], tmp_path, timeout=0.5
+    )
+    assert result.timed_out
+    assert not result.ok
+
+
+def test_missing_executable_raises(executor, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        executor.run(["nova-no-such-binary"], tmp_path, sandboxed=True)
+
+
+def test_sandboxed_calls_share_slots(executor, tmp_path):
+    cmd = [sys.executable, "-c", "import time; time.sleep(0.5)"]
+    futures = [
+        executor.submit(cmd, tmp_path, sandboxed=True, label="sleep") for _ in range(4)
+    ]
+    results = [f.result() for f in futures]
+    assert all(r.ok for r in results)
+    # Only two run at once, so two of the four had to queue.
+    assert sum(1 for r in results if r.queued_seconds > 0.3) == 2
+
+    totals = executor.metrics()["by_label"]["sleep"]
+    assert totals["calls"] == 4
+    assert totals["failures"] == 0
@@ -0,0 +1,105 @@
+"""
+Tests for grouping failing tests by root cause.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.agent.clustering import cluster_failures, representatives
+from nova.agent.llm_client_complete_fix import build_complete_fix_prompt
+from nova.agent.state import AgentState
+from nova.runner.test_runner import TestRunner
+
+TYPE_ERROR = (
+    "tests/test_calc.py:{i}: in test_add_{i}\n"
+    "    assert add({i}, '{i}') == {i}\n"
+    "src/calc.py:3: in add\n"
+    "    return a + b\n"
+    "E   TypeError: unsupported operand type(s) for +: 'int' and 'str'"
+)
+WRONG_RESULT = "E   assert {i} == 4\nE    +  where {i} = multiply(2, 2)"
+
+
+def _failing(template, prefix, count):
+    return [
+        {
+            "name": f"{prefix}_{i}",
+            "file": "tests/test_calc.py",
+            "line": i,
+            "short_traceback": template.format(i=i),
+        }
+        for i in range(count)
+    ]
+
+
+def test_failures_cluster_by_signature_largest_first():
+    tests = _failing(WRONG_RESULT, "test_mul", 3) + _failing(TYPE_ERROR, "test_add", 30)
+    tests.append(
+        {
+            "name": "test_parse",
+            "file": "tests/test_parse.py",
+            "line": 1,
+            "short_traceback": "src/parse.py:8: in parse\nE   KeyError: 'id'",
+        }
+    )
+
+    clusters = cluster_failures(tests)
+
+    assert [c.size for c in clusters] == [30, 3, 1]
+    top = clusters[0].signature
+    assert top.exception_type == "TypeError"
+    assert top.frame == "src/calc.py:add"
+    assert top.suspect_file == "src/calc.py"
+    assert clusters[1].signature.frame == "multiply"
+    assert clusters[2].signature.suspect_file == "src/parse.py"
+
+
+def test_prompt_carries_one_traceback_per_cluster():
+    tests = _failing(TYPE_ERROR, "test_add", 200) + _failing(
+        WRONG_RESULT, "test_mul", 2
+    )
+
+    prompt = build_complete_fix_prompt({}, representatives(cluster_failures(tests)))
+
+    assert "(202 total" in prompt
+    assert prompt.count("TypeError: unsupported operand") == 2  # traceback + summary
+    assert "Same failure in 199 more tests" in prompt
+    assert "test_add_10 and 189 more" in prompt
+    assert "test_add_150" not in prompt
+    assert "test_mul_0" in prompt
+
+
+def test_runner_failures_cluster_after_entering_agent_state(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "calc.py").write_text("def add(a, b):\n    return a + b\n")
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_calc.py").write_text(
+        "import sys, os\n"
+        "sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))\n"
+        "from calc import add\n\n"
+        + "".join(
+            f"def test_{i}():\n    assert add({i}, 'x') == {i}\n\n" for i in range(3)
+        )
+    )
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    failures, _ = TestRunner(tmp_path).run_tests()
+    assert len(failures) == 3
+    state = AgentState(repo_path=tmp_path)
+    state.add_failing_tests(failures)
+
+    clusters = cluster_failures(state.failing_tests, state.full_tracebacks)
+
+    assert len(clusters) == 1
+    signature = clusters[0].signature
+    assert signature.exception_type == "TypeError"
+    assert signature.frame == "src/calc.py:add"
+    (rep,) = representatives(clusters, state.full_tracebacks)
+    assert "E   TypeError: unsupported operand" in rep["short_traceback"]
+    assert "full_traceback" not in rep
+    # The full output stays out of what telemetry and checkpoints serialize
+    assert "full_traceback" not in json.dumps(state.to_dict())
+    assert all("full_traceback" not in test for test in state.failing_tests)
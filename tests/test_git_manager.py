@@ -0,0 +1,32 @@
+"""
+Tests for the plumbing commit writer in GitBranchManager.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.tools.git import GitBranchManager
+
+
+@pytest.fixture
+def repo(tmp_path, make_repo):
+    return make_repo(tmp_path)
+
+
+def test_commit_fails_if_head_moved_since_it_was_read(repo, git):
+    manager = GitBranchManager(repo)
+    manager.create_fix_branch()
+    (repo / "calc.py").write_text("def add(a, b):\n    return a + b\n")
+    assert manager.commit_patch(1, changed_files=[repo / "calc.py"])
+    step = git(repo, "rev-parse", "HEAD")
+
+    # Someone else commits on the branch between reading HEAD and moving it
+    tree = git(repo, "rev-parse", "HEAD^{tree}")
+    other = git(repo, "commit-tree", tree, "-p", step, "-m", "other")
+    git(repo, "update-ref", "HEAD", other)
+    assert manager._commit_tree(tree, [step], "stale", expected_head=step) is None
+    assert git(repo, "rev-parse", "HEAD") == other
@@ -0,0 +1,29 @@
+"""
+Tests for the JUnit XML fallback of the test runner.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.runner.test_runner import TestRunner
+
+
+def test_junit_failures_without_child_elements_are_parsed(tmp_path):
+    report = tmp_path / "report.xml"
+    report.write_text(
+        '<testsuite><testcase classname="tests.test_a" name="test_ok"/>'
+        '<testcase classname="tests.test_a" name="test_bad">'
+        '<failure message="assert 1 == 2">trace</failure></testcase>'
+        '<testcase classname="tests.test_b" name="test_err">'
+        '<error message="boom"/></testcase></testsuite>'
+    )
+    failures = TestRunner(tmp_path)._parse_junit_report(str(report))
+
+    assert [f.name for f in failures] == [
+        "tests.test_a::test_bad",
+        "tests.test_b::test_err",
+    ]
+    assert failures[0].short_traceback == "assert 1 == 2"
+    assert failures[0].file == "tests/test_a.py"
@@ -0,0 +1,171 @@
+"""
+Tests for multi-turn LLM sessions shared by planner, actor and critic.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.agent.llm_agent_enhanced import EnhancedLLMAgent
+from nova.agent.llm_client import CacheablePrompt, LLMSession
+from nova.agent.model_router import ModelRouter
+
+
+class FakeLLM:
+    """Answers by phase and records what each call sent."""
+
+    provider = "openai"
+    model = "gpt-5"
+
+    def __init__(self):
+        self.calls = []
+        self._last_usage = None
+
+    def session(self, system, context, max_turns=9):
+        return LLMSession(self, system, context, max_turns=max_turns)
+
+    def complete(self, system, user, history=None, **kwargs):
+        self.calls.append(
+            {
+                "system": system,
+                "user": user,
+                "history": history or [],
+                "model": kwargs.get("model"),
+            }
+        )
+        sent = len(system) + len(user) + sum(len(m["content"]) for m in history or [])
+        cached = sum(len(m["content"]) for m in history or [])
+        self._last_usage = {
+            "prompt_tokens": sent,
+            "cached_tokens": cached,
+            "completion_tokens": 10,
+        }
+        if "Respond with JSON only, in this format" in user:
+            return '{"approach": "fix add", "steps": ["return a + b"]}'
+        if "FILE: <filename>" in user:
+            return "FILE: calc.py\n```python\ndef add(a, b):\n    return a + b\n```"
+        return '{"approved": false, "reason": "try again"}'
+
+
+def _agent(tmp_path, sessions=True):
+    (tmp_path / "calc.py").write_text("def add(a, b):\n    return a - b\n")
+    (tmp_path / "test_calc.py").write_text(
+        "from calc import add\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+    )
+    agent = EnhancedLLMAgent.__new__(EnhancedLLMAgent)
+    agent.repo_path = tmp_path
+    agent.verbose = False
+    agent.settings = SimpleNamespace(llm_sessions=sessions, llm_session_max_turns=9)
+    agent.llm = FakeLLM()
+    agent.router = ModelRouter("gpt-5", enabled=False)
+    agent._plan_route = agent._actor_route = None
+    agent._unverified = (None, None)
+    agent._session = None
+    agent._session_key = None
+    agent._last_patch = None
+    agent.closed_sessions = []
+    return agent
+
+
+FAILING = [{"name": "test_add", "file": "test_calc.py", "line": 4}]
+
+
+def test_session_sends_context_once():
+    llm = FakeLLM()
+    session = llm.session("system", "CONTEXT", max_turns=2)
+    session.ask("first")
+    session.ask("second")
+
+    first, second = llm.calls
+    assert isinstance(first["user"], CacheablePrompt)
+    assert first["user"].prefix == "CONTEXT"
+    assert second["user"] == "second"
+    assert [m["role"] for m in second["history"]] == ["user", "assistant"]
+    assert session.full
+    assert session.usage["turns"] == 2 and session.usage["context_reuses"] == 1
+
+
+def test_phases_share_one_session(tmp_path):
+    agent = _agent(tmp_path)
+    plan = agent.create_plan(FAILING, iteration=1)
+    patch = agent.generate_patch(FAILING, 1, plan=plan)
+    approved, _ = agent.review_patch(patch, FAILING)
+
+    planner, actor, critic = agent.llm.calls
+    assert "calc.py" in planner["user"].prefix
+    for call in (actor, critic):
+        assert "return a - b" not in call["user"]  # files are not re-sent
+    assert "previous reply" in critic["user"] and patch not in critic["user"]
+    assert len(critic["history"]) == 4
+    assert not approved
+    usage = agent.session_usage()
+    assert usage["sessions"] == 1 and usage["turns"] == 3
+    assert usage["cached_tokens"] > 0
+
+
+def test_new_context_starts_new_session(tmp_path):
+    agent = _agent(tmp_path)
+    agent.create_plan(FAILING, iteration=1)
+    (tmp_path / "calc.py").write_text("def add(a, b):\n    return a + b + 0\n")
+    agent.create_plan(FAILING, iteration=2)
+
+    assert agent.llm.calls[1]["history"] == []
+    assert agent.session_usage()["sessions"] == 2
+
+
+def test_sessions_disabled_uses_single_turn_prompts(tmp_path):
+    agent = _agent(tmp_path, sessions=False)
+    plan = agent.create_plan(FAILING, iteration=1)
+    agent.generate_patch(FAILING, 1, plan=plan)
+
+    assert all(call["history"] == [] for call in agent.llm.calls)
+    assert "return a - b" in agent.llm.calls[1]["user"]
+    assert agent.session_usage() == {"sessions": 0}
+
+
+def test_discarded_speculative_plan_is_undone(tmp_path):
+    agent = _agent(tmp_path)
+    plan = agent.create_plan(FAILING, iteration=1)
+    session = agent._session
+
+    # A plan for different failures opens its own conversation
+    undo = agent.conversation_mark()
+    agent.create_plan(FAILING + [dict(FAILING[0], name="test_sub")], iteration=2)
+    assert agent._session is not session
+    undo()
+
+    assert agent._session is session and len(session.history) == 2
+    agent.generate_patch(FAILING, 1, plan=plan)
+    assert len(agent.llm.calls[-1]["history"]) == 2
+    assert agent.session_usage()["sessions"] == 2
+
+    # Same conversation: the extra turn is rolled back
+    undo = agent.conversation_mark()
+    agent.create_plan(FAILING, iteration=2)
+    undo()
+    assert len(session.history) == 4 and session.turns == 2
+
+
+def test_fast_patch_is_reviewed_by_default_model_and_credited_by_tests(tmp_path):
+    agent = _agent(tmp_path)
+    agent.router = ModelRouter("gpt-5", fast_model="gpt-5-mini")
+    complete = agent.llm.complete
+
+    def approving(system, user, history=None, **kwargs):
+        reply = complete(system, user, history, **kwargs)
+        return reply.replace('"approved": false', '"approved": true')
+
+    agent.llm.complete = approving
+    plan = agent.create_plan(FAILING, iteration=1)
+    patch = agent.generate_patch(FAILING, 1, plan=plan)
+    approved, _ = agent.review_patch(patch, FAILING)
+
+    planner, actor, critic = agent.llm.calls
+    assert planner["model"] == actor["model"] == "gpt-5-mini"
+    assert critic["model"] == "gpt-5"
+    # The critic's approval alone is not a success for the fast tier
+    assert approved and agent.router.fast_failures == 0
+    agent.record_verification(False)
+    assert agent.router.escalated
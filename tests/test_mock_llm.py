@@ -0,0 +1,129 @@
+"""
+Tests for the offline LLM stand-in server.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.agent.llm_client import CacheablePrompt, LLMClient
+from nova.agent.mock_llm import MockLLMServer, MockRule, MockScript, load_script
+
+
+def test_llm_client_runs_offline_against_stand_in(offline_env):
+    script = MockScript(rules=[MockRule("FILE: calc.py", match="fix it")])
+    with MockLLMServer(script) as server:
+        recording = offline_env(server)
+        client = LLMClient()
+        prompt = CacheablePrompt("x" * 8000, "\nplease fix it")
+        assert client.complete("system", prompt) == "FILE: calc.py"
+        client.complete("system", prompt)
+
+        assert client.provider == "openai"
+        assert client._last_usage["cached_tokens"] > 1900
+        assert server.stats()["requests"] == 2
+
+    lines = [json.loads(line) for line in recording.read_text().splitlines()]
+    assert [line["response"] for line in lines] == ["FILE: calc.py"] * 2
+
+
+def test_recording_replays_in_order_with_its_latency(tmp_path):
+    recording = tmp_path / "recording.jsonl"
+    recording.write_text(
+        '{"response": "first", "latency_ms": 200, "completion_tokens": 50}\n'
+        '{"response": "second", "latency_ms": 0}\n'
+    )
+    with MockLLMServer(load_script(recording)) as server:
+        url = server.base_url + "/chat/completions"
+        body = {"model": "gpt-5", "messages": [{"role": "user", "content": "hi"}]}
+        started = time.monotonic()
+        first = httpx.post(url, json=body).json()
+        assert time.monotonic() - started >= 0.2
+        second = httpx.post(url, json=body).json()
+
+    assert first["choices"][0]["message"]["content"] == "first"
+    assert first["usage"]["completion_tokens"] == 50
+    assert second["choices"][0]["message"]["content"] == "second"
+
+
+def test_anthropic_format_reads_back_cached_breakpoint():
+    body = {
+        "model": "claude-3-5-sonnet-20241022",
+        "max_tokens": 100,
+        "system": [{"type": "text", "text": "system"}],
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "y" * 400,
+                        "cache_control": {"type": "ephemeral"},
+                    },
+                    {"type": "text", "text": 'Respond with {"approved": ...}'},
+                ],
+            }
+        ],
+    }
+    with MockLLMServer() as server:
+        url = server.base_url + "/messages"
+        write = httpx.post(url, json=body).json()["usage"]
+        reply = httpx.post(url, json=body).json()
+
+    assert write["cache_creation_input_tokens"] > 0
+    assert (
+        reply["usage"]["cache_read_input_tokens"]
+        == write["cache_creation_input_tokens"]
+    )
+    assert json.loads(reply["content"][0]["text"])["approved"] is True
+
+
+def test_error_rules_send_retry_after():
+    script = MockScript(
+        rules=[MockRule("slow down", status=429, retry_after=1.5, times=1)],
+        default="ok",
+    )
+    with MockLLMServer(script) as server:
+        url = server.base_url + "/chat/completions"
+        body = {"messages": [{"role": "user", "content": "hi"}]}
+        limited = httpx.post(url, json=body)
+        retried = httpx.post(url, json=body)
+
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "1.5"
+    assert retried.json()["choices"][0]["message"]["content"] == "ok"
+
+
+def test_llm_agent_import_path_runs_offline(offline_env, tmp_path):
+    from nova.agent.llm_agent import LLMAgent
+
+    (tmp_path / "calc.py").write_text("def add(a, b):\n    return a - b\n")
+    (tmp_path / "test_calc.py").write_text(
+        "from calc import add\n\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+    )
+    failing = [
+        {
+            "name": "test_add",
+            "file": "test_calc.py",
+            "line": 5,
+            "short_traceback": "E   assert -1 == 3",
+        }
+    ]
+    fix = "FILE: calc.py\n```python\ndef add(a, b):\n    return a + b\n```"
+    with MockLLMServer(
+        MockScript(rules=[MockRule(fix, match="FILE: <filename>")])
+    ) as server:
+        offline_env(server)
+        agent = LLMAgent(tmp_path)
+        plan = agent.create_plan(failing, iteration=1)
+        patch = agent.generate_patch(failing, iteration=1, plan=plan)
+        approved, _ = agent.review_patch(patch, failing)
+
+    assert plan["steps"]
+    assert "+    return a + b" in patch
+    assert approved
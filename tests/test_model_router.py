@@ -0,0 +1,57 @@
+"""
+Tests for per-call model routing.
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.agent.model_router import ModelRouter, default_fast_model
+from nova.telemetry.usage import UsageLedger
+
+
+def _router(**kwargs):
+    return ModelRouter("gpt-5", "high", fast_model="gpt-5-mini", **kwargs)
+
+
+def test_simple_failures_use_fast_tier():
+    route = _router().choose("actor", failing_count=1, context_chars=2_000)
+    assert (route.model, route.reasoning_effort, route.tier) == (
+        "gpt-5-mini",
+        "low",
+        "fast",
+    )
+
+
+def test_complex_failures_use_default_model():
+    router = _router()
+    assert router.choose("actor", 10, 2_000).model == "gpt-5"
+    assert router.choose("actor", 1, 100_000).model == "gpt-5"
+
+
+def test_escalates_after_fast_failure():
+    router = _router(escalate_after=2)
+    route = router.choose("actor", 1, 100)
+    router.record("planner", route, False, counts_toward_escalation=False)
+    router.record("actor", route, False)
+    assert router.choose("actor", 1, 100).tier == "fast"
+    router.record("actor", route, False)
+    assert router.choose("actor", 1, 100).tier == "default"
+    assert router.choose("critic", 1, 100).tier == "default"
+
+
+def test_low_historical_success_rate_skips_fast_tier(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.db")
+    for i in range(10):
+        ledger.record_outcome("actor", "gpt-5-mini", success=i < 2)
+    router = _router(ledger=ledger)
+    assert router.choose("actor", 1, 100).tier == "default"
+    assert router.choose("planner", 1, 100).tier == "fast"
+
+
+def test_disabled_when_fast_model_matches_default():
+    assert default_fast_model("grok", "grok-code-fast-1") == "grok-code-fast-1"
+    router = ModelRouter("grok-code-fast-1", fast_model="grok-code-fast-1")
+    assert router.choose("actor", 1, 100).tier == "default"
@@ -0,0 +1,126 @@
+"""
+Tests for the pipelined fix loop.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.agent.pipeline import PipelinedFixLoop, PipelineStages
+from nova.agent.state import AgentState
+
+STAGE = 0.2
+
+
+def _failing(*names):
+    return [{"name": n, "file": f"tests/test_{n}.py", "line": 1} for n in names]
+
+
+class FakeStages:
+    """Stages that each take STAGE seconds and replay scripted test results."""
+
+    def __init__(self, trials, full_runs, plan_delay=STAGE):
+        self.trials = list(trials)
+        self.full_runs = list(full_runs)
+        self.plan_delay = plan_delay
+        self.plans = []
+        self.calls = []
+        self.undone = 0
+        self.verified = []
+        self.llm_active = 0
+        self.max_llm_active = 0
+        self.lock = threading.Lock()
+
+    def _stage(self, name, result=None, delay=STAGE):
+        llm = name in ("plan", "patch", "review", "pr_text")
+        with self.lock:
+            self.calls.append(name)
+            if llm:
+                self.llm_active += 1
+                self.max_llm_active = max(self.max_llm_active, self.llm_active)
+        time.sleep(delay)
+        if llm:
+            with self.lock:
+                self.llm_active -= 1
+        return result
+
+    def _mark(self):
+        def undo():
+            self.undone += 1
+
+        return undo
+
+    def stages(self):
+        return PipelineStages(
+            plan=lambda tests, iteration, feedback: self.plans.append(iteration)
+            or self._stage("plan", {"iteration": iteration}, self.plan_delay),
+            patch=lambda state: self._stage("patch", "--- a/x.py\n+++ b/x.py\n"),
+            review=lambda state, patch: self._stage("review", (True, "ok")),
+            apply=lambda state, patch: {"success": True},
+            run_tests=lambda files: self._stage("full", (self.full_runs.pop(0), None)),
+            trial=lambda patch, files: self._stage("trial", self.trials.pop(0)),
+            pr_text=lambda state: self._stage("pr_text", "Fix tests"),
+            speculation_mark=self._mark,
+            verified=self.verified.append,
+        )
+
+
+def test_pipeline_overlaps_stages_and_reuses_speculative_plan(tmp_path):
+    fake = FakeStages(trials=[_failing("b"), []], full_runs=[_failing("b"), []])
+    state = AgentState(repo_path=tmp_path, max_iterations=3)
+    state.add_failing_tests(_failing("a", "b"))
+    loop = PipelinedFixLoop(state, fake.stages())
+
+    started = time.monotonic()
+    assert loop.run() is True
+    elapsed = time.monotonic() - started
+
+    # Sequentially: 2 plans + 2 x (patch, review, trial, full) + pr_text = 11 stages
+    assert elapsed < 9 * STAGE
+    assert fake.plans == [1, 2]
+    assert state.plan == {"iteration": 2}
+    assert loop.pr_text == "Fix tests"
+    assert state.final_status == "success"
+    assert fake.verified == [True, True]
+
+
+def test_speculative_plan_is_discarded_when_full_run_differs(tmp_path):
+    fake = FakeStages(trials=[_failing("b"), []], full_runs=[_failing("b", "c"), []])
+    state = AgentState(repo_path=tmp_path, max_iterations=3)
+    state.add_failing_tests(_failing("a", "b"))
+    events = []
+    loop = PipelinedFixLoop(
+        state, fake.stages(), on_event=lambda event, data: events.append(event)
+    )
+
+    assert loop.run() is True
+    assert fake.plans == [1, 2, 2]
+    assert "speculation_discarded" in events
+    assert "plan_reused" not in events
+    # Two failures before and after the first patch: it didn't verify
+    assert fake.verified == [False, True]
+
+
+def test_discarded_speculation_finishes_before_the_next_llm_stage(tmp_path):
+    # Plan outlives the full run, which fails on more tests than the trial
+    fake = FakeStages(
+        trials=[_failing("b"), []],
+        full_runs=[_failing("b", "c"), []],
+        plan_delay=2.5 * STAGE,
+    )
+    state = AgentState(repo_path=tmp_path, max_iterations=3)
+    state.add_failing_tests(_failing("a", "b"))
+    assert PipelinedFixLoop(state, fake.stages()).run() is True
+    assert fake.max_llm_active == 1
+    assert fake.undone == 1
+
+    # Green trial drafts PR text, but the full run still fails
+    fake = FakeStages(trials=[[], []], full_runs=[_failing("c"), []])
+    state = AgentState(repo_path=tmp_path, max_iterations=3)
+    state.add_failing_tests(_failing("a"))
+    assert PipelinedFixLoop(state, fake.stages()).run() is True
+    assert fake.max_llm_active == 1
+    assert fake.undone == 1
@@ -0,0 +1,108 @@
+"""
+Tests for prompt-prefix caching: stable prompt layout and cache accounting.
+"""
+
+import sys
+from collections import deque
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.agent.llm_client import CacheablePrompt, LLMClient, build_patch_prompt
+from nova.agent.llm_client_complete_fix import build_complete_fix_prompt
+from nova.telemetry.pricing import estimate_cost
+from nova.telemetry.usage import UsageLedger
+
+
+class FakeMessages:
+    def __init__(self):
+        self.kwargs = None
+
+    def create(self, **kwargs):
+        self.kwargs = kwargs
+        usage = SimpleNamespace(
+            input_tokens=100,
+            output_tokens=20,
+            cache_read_input_tokens=900,
+            cache_creation_input_tokens=0,
+        )
+        return SimpleNamespace(content=[SimpleNamespace(text="ok")], usage=usage)
+
+
+def _anthropic_client(prompt_cache=True):
+    client = LLMClient.__new__(LLMClient)
+    client.settings = SimpleNamespace(prompt_cache=prompt_cache)
+    client.client = SimpleNamespace(messages=FakeMessages())
+    client.provider = "anthropic"
+    client.model = "claude-3-haiku-20240307"
+    client.repo = None
+    client.token_usage = {
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "cached_tokens": 0,
+        "calls": deque(maxlen=100),
+    }
+    client._limiter = None
+    client._reserved_tokens = 0
+    return client
+
+
+def test_prompt_builders_keep_prefix_stable_across_iterations():
+    files = {"src/b.py": "B", "src/a.py": "A"}
+    tests = {"tests/test_a.py": "T"}
+    first = build_complete_fix_prompt(
+        {"approach": "one"}, [{"name": "t1"}], tests, files
+    )
+    second = build_complete_fix_prompt(
+        {"approach": "two"},
+        [{"name": "t2"}],
+        tests,
+        dict(reversed(list(files.items()))),
+        critic_feedback="missed t2",
+    )
+    assert first.prefix == second.prefix
+    assert "missed t2" in second.suffix and "missed t2" not in second.prefix
+    assert first.prefix.index("src/a.py") < first.prefix.index("tests/test_a.py")
+
+    patch = build_patch_prompt({}, [{"name": "t"}], tests, files, "bad")
+    assert isinstance(patch, str) and patch == patch.prefix + patch.suffix
+    assert "bad" in patch.suffix
+
+
+def test_anthropic_marks_prefix_and_counts_cache_reads():
+    client = _anthropic_client()
+    client._complete_anthropic("system", CacheablePrompt("stable", "volatile"))
+
+    kwargs = client.client.messages.kwargs
+    blocks = kwargs["messages"][0]["content"]
+    assert blocks[0] == {
+        "type": "text",
+        "text": "stable",
+        "cache_control": {"type": "ephemeral"},
+    }
+    assert blocks[1] == {"type": "text", "text": "volatile"}
+    assert client._last_usage["prompt_tokens"] == 1000
+    assert client._last_usage["cached_tokens"] == 900
+    assert client.token_usage["cached_tokens"] == 900
+
+
+def test_prompt_cache_disabled_sends_plain_prompt():
+    client = _anthropic_client(prompt_cache=False)
+    client._complete_anthropic("system", CacheablePrompt("stable", "volatile"))
+
+    kwargs = client.client.messages.kwargs
+    assert kwargs["system"] == "system"
+    assert kwargs["messages"][0]["content"] == "stablevolatile"
+
+
+def test_cached_tokens_are_billed_lower(tmp_path):
+    full = estimate_cost("claude-3-haiku-20240307", 1000, 0)
+    cached = estimate_cost("claude-3-haiku-20240307", 1000, 0, cached_tokens=900)
+    assert cached < full
+
+    ledger = UsageLedger(tmp_path / "usage.db")
+    ledger.record("anthropic", "claude-3-haiku-20240307", 1000, 0, cached_tokens=900)
+    assert ledger.today()["cached_tokens"] == 900
+    assert ledger.today()["cost_usd"] == round(cached, 6)
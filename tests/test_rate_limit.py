@@ -0,0 +1,91 @@
+"""
+Tests for the host-wide LLM rate limiter and retry scheduler.
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.tools.rate_limit import (
+    RateLimiter,
+    backoff_delay,
+    is_retryable,
+    parse_retry_after,
+)
+
+
+class _APIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def test_parse_retry_after_forms():
+    assert parse_retry_after({"retry-after": "2"}) == 2.0
+    assert parse_retry_after({"retry-after-ms": "250"}) == 0.25
+    assert parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+    assert parse_retry_after({}) is None
+
+
+def test_backoff_prefers_server_hint():
+    assert 3.0 <= backoff_delay(5, base=0.5, retry_after=3.0) <= 3.05
+    assert 0.0 <= backoff_delay(2, base=0.5) <= 2.0
+
+
+def test_retryable_classification():
+    assert is_retryable(_APIError(429))
+    assert is_retryable(_APIError(503))
+    assert not is_retryable(_APIError(400))
+    assert not is_retryable(ValueError("bad prompt"))
+
+
+def test_request_bucket_shared_between_instances(tmp_path):
+    path = tmp_path / "rl.db"
+    first = RateLimiter(path, "openai:k", requests_per_min=2)
+    second = RateLimiter(path, "openai:k", requests_per_min=2)
+    assert first.try_acquire() == 0.0
+    assert second.try_acquire() == 0.0
+    assert first.try_acquire() > 0
+    assert RateLimiter(path, "other", requests_per_min=2).try_acquire() == 0.0
+
+
+def test_token_bucket_settles_to_actual_usage(tmp_path):
+    limiter = RateLimiter(tmp_path / "rl.db", "k", tokens_per_min=1000)
+    assert limiter.try_acquire(800) == 0.0
+    assert limiter.try_acquire(800) > 0
+    limiter.settle(800, 100)
+    assert limiter.try_acquire(800) == 0.0
+
+
+def test_call_retries_429_and_pauses_key(tmp_path):
+    limiter = RateLimiter(tmp_path / "rl.db", "k", max_retries=2)
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise _APIError(429, {"retry-after": "0.2"})
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert attempts[1] - attempts[0] >= 0.2
+
+
+def test_call_does_not_retry_client_errors(tmp_path):
+    limiter = RateLimiter(tmp_path / "rl.db", "k", max_retries=3)
+    calls = []
+
+    def bad():
+        calls.append(1)
+        raise _APIError(400)
+
+    with pytest.raises(_APIError):
+        limiter.call(bad)
+    assert len(calls) == 1
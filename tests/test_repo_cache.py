@@ -0,0 +1,91 @@
+"""
+Tests for the bare-mirror + worktree repository cache.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.tools.repo_cache import RepoCache
+
+
+@pytest.fixture
+def origin(tmp_path, make_repo):
+    return make_repo(tmp_path / "origin")
+
+
+def _commit(git, repo, text):
+    (repo / "calc.py").write_text(text)
+    git(repo, "commit", "-qam", text)
+    return git(repo, "rev-parse", "HEAD")
+
+
+def _recording(cache):
+    calls = []
+    run = cache._git
+
+    def git(*args, **kwargs):
+        calls.append(args[0])
+        return run(*args, **kwargs)
+
+    cache._git = git
+    return calls
+
+
+def test_warm_add_worktree_skips_the_fetch(tmp_path, origin, git):
+    cache = RepoCache(tmp_path / "cache")
+    sha = git(origin, "rev-parse", "HEAD")
+    url = str(origin)
+    with cache.checkout(url, sha, "cold") as worktree:
+        assert (worktree / "calc.py").read_text().endswith("a - b\n")
+
+    calls = _recording(cache)
+    worktree = cache.add_worktree(url, sha, "warm")
+    assert "fetch" not in calls
+    assert git(worktree, "rev-parse", "HEAD") == sha
+    cache.remove_worktree(worktree)
+
+    # A commit the mirror hasn't seen is fetched on demand
+    newer = _commit(git, origin, "def add(a, b):\n    return a + b\n")
+    with cache.checkout(url, newer) as worktree:
+        assert (worktree / "calc.py").read_text().endswith("a + b\n")
+    assert "fetch" in calls
+
+    # Locks live outside the mirror, so evicting it can't delete a held lock
+    mirror = cache.mirror_path(url)
+    assert not (mirror / ".nova").exists()
+    assert (cache.locks_dir / mirror.stem).is_dir()
+
+
+def test_evict_by_age_and_size_skips_live_worktrees(tmp_path, origin, git):
+    other = tmp_path / "other"
+    git(tmp_path, "clone", "-q", str(origin), str(other))
+    busy = tmp_path / "busy"
+    git(tmp_path, "clone", "-q", str(origin), str(busy))
+    sha = git(origin, "rev-parse", "HEAD")
+
+    cache = RepoCache(tmp_path / "cache", max_age_seconds=3600)
+    mirrors = {
+        name: cache.ensure_mirror(str(tmp_path / name))
+        for name in ("origin", "other", "busy")
+    }
+    worktree = cache.add_worktree(str(busy), sha)
+    now = time.time()
+    for name, age in (("origin", 7200), ("other", 60), ("busy", 7200)):
+        os.utime(mirrors[name] / "nova-last-used", (now - age, now - age))
+
+    # `origin` is too old; `busy` is too but has a job's worktree checked out
+    assert cache.evict(now) == [mirrors["origin"]]
+    assert mirrors["busy"].exists() and mirrors["other"].exists()
+
+    # Over the size budget: least recently used first, still sparing `busy`
+    cache.max_bytes = 0
+    assert cache.evict(now) == [mirrors["other"]]
+
+    cache.remove_worktree(worktree)
+    assert cache.evict(now) == [mirrors["busy"]]
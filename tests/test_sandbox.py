@@ -0,0 +1,77 @@
+"""
+Tests for the sandboxed command runner.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.tools.sandbox import SandboxLimits, run_command
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX sandbox")
+
+
+def test_output_is_capped_and_spilled(tmp_path):
+    result = run_command(
+        [sys.executable, "-c", "print('a' * 100000)"],
+        tmp_path,
+        30,
+        limits=SandboxLimits(max_output_bytes=1000, spill_dir=tmp_path / "spill"),
+    )
+    assert result["returncode"] == 0
+    assert result["truncated"]
+    assert "bytes truncated" in result["stdout"]
+    assert len(result["stdout"]) < 2000
+    assert Path(result["stdout_path"]).stat().st_size == 100001
+
+
+def test_timeout_kills_process_group(tmp_path):
+    result = run_command(["sh", "-c", "sleep 30 & sleep 30"], tmp_path, 1)
+    assert result["timed_out"]
+    assert result["duration"] < 10
+
+
+def test_resources_reported(tmp_path):
+    result = run_command(
+        [sys.executable, "-c", "b = bytearray(64 * 1024 * 1024)"], tmp_path, 30
+    )
+    resources = result["resources"]
+    assert result["returncode"] == 0
+    assert resources["peak_rss_bytes"] >= 64 * 1024 * 1024
+    assert resources["cpu_user_seconds"] is not None
+    assert resources["governor"] in ("cgroup", "rlimit")
+
+
+def test_missing_binary(tmp_path):
+    result = run_command(["nova-no-such-binary"], tmp_path, 5)
+    assert result["returncode"] == 127
+
+
+def test_rlimits_apply_when_run_from_a_thread(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    limits = SandboxLimits(memory_bytes=256 * 1024 * 1024, cgroup_root=None)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        result = pool.submit(
+            run_command,
+            [sys.executable, "-c", "b = bytearray(512 * 1024 * 1024)"],
+            tmp_path,
+            30,
+            limits=limits,
+        ).result()
+    assert result["returncode"] != 0
+    assert "MemoryError" in result["stderr"]
+
+    # The shim execs the command in place, as the leader of a new session
+    result = run_command(
+        [sys.executable, "-c", "import os; print(os.getpid(), os.getsid(0))"],
+        tmp_path,
+        30,
+        limits=limits,
+    )
+    pid, sid = result["stdout"].split()
+    assert pid == sid
@@ -0,0 +1,286 @@
+"""
+Tests for the nova serve job queue and rescue daemon.
+"""
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.serve import (
+    IntakeServer,
+    JobCancelled,
+    JobInterrupted,
+    JobQueue,
+    RescueDaemon,
+    RescueJob,
+    run_job,
+)
+
+
+def _repos(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.mkdir()
+        paths.append(str(path))
+    return paths
+
+
+def _results(queue):
+    return [
+        json.loads(row["result"])
+        for row in queue._conn().execute(
+            "SELECT result FROM jobs WHERE status = 'done'"
+        )
+    ]
+
+
+def test_claim_orders_by_priority_and_serializes_repos(tmp_path):
+    queue = JobQueue(tmp_path / "queue.db")
+    a, b = _repos(tmp_path, "a", "b")
+    first = queue.submit({"repo": a})
+    second = queue.submit({"repo": a, "priority": 5})
+    other = queue.submit({"repo": b})
+
+    assert queue.claim().id == second
+    # `a` is busy, so its older job waits while `b` runs
+    assert queue.claim().id == other
+    assert queue.claim() is None
+
+    queue.finish(second, {"success": True})
+    assert queue.claim().id == first
+    assert queue.stats() == {
+        "queued": 0,
+        "running": 2,
+        "done": 1,
+        "failed": 0,
+        "cancelled": 0,
+    }
+
+
+def test_errored_jobs_retry_with_backoff_then_fail(tmp_path):
+    queue = JobQueue(tmp_path / "queue.db", retry_base_seconds=0.2)
+    (repo,) = _repos(tmp_path, "a")
+    job_id = queue.submit({"repo": repo, "max_attempts": 2})
+
+    assert queue.fail(queue.claim().id, "TimeoutError: slow") is True
+    assert queue.claim() is None
+    time.sleep(0.25)
+    assert queue.claim().attempts == 2
+    assert queue.fail(job_id, "TimeoutError: slow") is False
+    assert queue.get(job_id).status == "failed"
+
+
+def test_pull_request_jobs_coalesce_by_head_sha(tmp_path):
+    queue = JobQueue(tmp_path / "queue.db")
+    (repo,) = _repos(tmp_path, "a")
+    pr = {"repo": repo, "repository": "acme/a", "pr_number": 7}
+    first = queue.submit({**pr, "sha": "aaa"})
+    assert queue.submit({**pr, "sha": "aaa"}) == first
+
+    second = queue.submit({**pr, "sha": "bbb"})
+    assert second != first
+    assert queue.get(first).status == "cancelled"
+    assert queue.get(first).error == "superseded by bbb"
+    assert queue.claim().id == second
+
+    # A newer head while `bbb` runs flags it for its daemon to stop
+    third = queue.submit({**pr, "sha": "ccc"})
+    assert queue.get(second).status == "cancelling"
+    assert queue.cancelling() == [second]
+    assert queue.claim() is None
+    queue.finish(second, {"success": False})
+    assert queue.get(second).status == "cancelled"
+    assert queue.claim().id == third
+
+    # A push that hasn't failed CI yet supersedes the old head without a new job
+    assert queue.supersede("acme/a", 7, "ccc") == []
+    assert queue.supersede("acme/a", 7, "ddd") == [third]
+    assert queue.get(third).status == "cancelling"
+
+
+def test_cancel_stops_a_running_job(tmp_path):
+    queue = JobQueue(tmp_path / "queue.db")
+    (repo,) = _repos(tmp_path, "a")
+    started = threading.Event()
+
+    def runner(job, workdir, log_dir, cancel):
+        started.set()
+        if cancel.wait(5):
+            raise JobCancelled(f"job {job.id} was cancelled")
+        return {"success": True}
+
+    daemon = RescueDaemon(queue, workers=1, poll_interval=0.05, runner=runner)
+    server = IntakeServer(queue)
+    server.serve_in_background()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    job_id = queue.submit({"repo": repo})
+    thread = threading.Thread(target=daemon.run_forever, daemon=True)
+    thread.start()
+    try:
+        assert started.wait(5)
+        cancelled = httpx.post(f"{url}/jobs/{job_id}/cancel")
+        assert cancelled.json() == {"id": job_id, "status": "cancelling"}
+        deadline = time.monotonic() + 5
+        while queue.get(job_id).status != "cancelled" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert httpx.post(f"{url}/jobs/999/cancel").status_code == 404
+
+        pr = {"repository": "acme/a", "pr_number": 7}
+        queued = queue.submit({"repo": repo, "sha": "aaa", **pr})
+        superseded = httpx.post(f"{url}/jobs/supersede", json={**pr, "sha": "bbb"})
+        assert superseded.json() == {"cancelled": [queued]}
+        assert httpx.post(f"{url}/jobs/supersede", json=pr).status_code == 400
+    finally:
+        daemon.stop()
+        server.shutdown()
+        server.server_close()
+
+    assert queue.get(job_id).status == "cancelled"
+
+
+def test_daemon_runs_jobs_from_http_and_inbox(tmp_path):
+    queue = JobQueue(tmp_path / "serve" / "queue.db")
+    a, b = _repos(tmp_path, "a", "b")
+    running = []
+    overlap = threading.Event()
+
+    def runner(job, workdir, log_dir, cancel):
+        running.append(job.id)
+        if len(running) == 2:
+            overlap.set()
+        overlap.wait(2)
+        return {"success": True, "workdir": str(workdir)}
+
+    daemon = RescueDaemon(queue, workers=2, poll_interval=0.05, runner=runner)
+    server = IntakeServer(queue, token="secret")
+    server.serve_in_background()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    remote = {"repo": "https://example.com/x.git", "sha": "abc"}
+    try:
+        assert httpx.post(f"{url}/jobs", json=remote).status_code == 401
+        wrong = {"Authorization": "Bearer secreT"}
+        assert httpx.post(f"{url}/jobs", json=remote, headers=wrong).status_code == 401
+        headers = {"Authorization": "Bearer secret"}
+        posted = httpx.post(
+            f"{url}/jobs",
+            json={**remote, "args": ["--verbose"]},
+            headers={**headers, "X-Nova-Push-Token": "ghs_push"},
+        )
+        assert posted.status_code == 202
+        # Local paths, unlisted flags and missing SHAs are refused over HTTP
+        for bad in (
+            {"repo": a},
+            {**remote, "args": ["--config", "/etc/passwd"]},
+            {"repo": remote["repo"]},
+        ):
+            assert (
+                httpx.post(f"{url}/jobs", json=bad, headers=headers).status_code == 400
+            )
+        remote_id = posted.json()["id"]
+        queue.cancel(remote_id)
+
+        queue.inbox.mkdir(parents=True)
+        (queue.inbox / "a.json").write_text(json.dumps({"repo": a}))
+        (queue.inbox / "b.json").write_text(json.dumps({"repo": b}))
+
+        thread = threading.Thread(target=daemon.run_forever, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while queue.stats()["done"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        job = httpx.get(f"{url}/jobs/{remote_id}", headers=headers).json()
+    finally:
+        daemon.stop()
+        server.shutdown()
+        server.server_close()
+
+    assert overlap.is_set()
+    assert job["status"] == "cancelled"
+    assert sorted(r["workdir"] for r in _results(queue)) == sorted(
+        str(Path(p).resolve()) for p in (a, b)
+    )
+    assert not list(queue.inbox.glob("*.json"))
+    # The push token never reaches the queue database
+    assert b"ghs_push" not in (tmp_path / "serve" / "queue.db").read_bytes()
+
+
+def test_intake_needs_a_token_beyond_loopback(tmp_path):
+    queue = JobQueue(tmp_path / "queue.db")
+    with pytest.raises(ValueError):
+        IntakeServer(queue, ("0.0.0.0", 0))
+    server = IntakeServer(queue, ("0.0.0.0", 0), token="secret")
+    server.server_close()
+
+
+def test_interrupted_runs_are_queued_again(tmp_path):
+    queue = JobQueue(tmp_path / "queue.db")
+    (repo,) = _repos(tmp_path, "a")
+    job_id = queue.submit({"repo": repo, "max_attempts": 1})
+    runs = []
+
+    def runner(job, workdir, log_dir, cancel):
+        runs.append(job.attempts)
+        if len(runs) == 1:
+            raise JobInterrupted("nova fix was interrupted (exit 130)")
+        return {"success": True}
+
+    daemon = RescueDaemon(queue, workers=1, runner=runner)
+    daemon.process(queue.claim())
+    assert queue.get(job_id).status == "queued"
+    daemon.process(queue.claim())
+
+    # The interrupted run didn't use up the job's only attempt
+    assert runs == [1, 1]
+    assert queue.get(job_id).status == "done"
+
+
+@pytest.fixture
+def fixed_clone(tmp_path, monkeypatch, git, make_repo):
+    """A clone of a bare origin, with `nova fix` replaced by a successful no-op."""
+    origin = tmp_path / "origin.git"
+    git(make_repo(tmp_path / "src"), "clone", "-q", "--bare", ".", str(origin))
+    clone = tmp_path / "clone"
+    git(tmp_path, "clone", "-q", str(origin), str(clone))
+    git(clone, "checkout", "-qb", "nova-fix")
+    fake = tmp_path / "fake-python"
+    fake.write_text("#!/bin/sh\nexit 0\n")
+    fake.chmod(0o755)
+    monkeypatch.setattr(sys, "executable", str(fake))
+    return origin, clone
+
+
+def test_run_job_pushes_the_fix_branch(tmp_path, git, fixed_clone):
+    origin, clone = fixed_clone
+    job = RescueJob(repo="https://example.com/owner/repo.git", push=True)
+
+    result = run_job(job, clone, tmp_path / "logs", push_url=str(origin))
+
+    assert result["success"] and result["branch"] == "nova-fix"
+    assert git(origin, "rev-parse", "nova-fix") == git(clone, "rev-parse", "HEAD")
+
+
+def test_run_job_refuses_to_push_a_detached_head(tmp_path, git, fixed_clone):
+    origin, clone = fixed_clone
+    git(clone, "checkout", "-q", "--detach")
+    job = RescueJob(repo=str(origin), push=True)
+
+    with pytest.raises(RuntimeError, match="which branch"):
+        run_job(job, clone, tmp_path / "logs")
+
+
+def test_failed_push_hides_the_credentialed_url(tmp_path, fixed_clone):
+    _, clone = fixed_clone
+    job = RescueJob(repo=str(tmp_path / "missing.git"), push=True)
+    push_url = str(tmp_path / "ghs_secret" / "missing.git")
+
+    with pytest.raises(RuntimeError, match="Push failed") as failed:
+        run_job(job, clone, tmp_path / "logs", push_url=push_url)
+    assert "ghs_secret" not in str(failed.value)
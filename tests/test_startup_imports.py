@@ -0,0 +1,39 @@
+"""
+Guard the fast `nova` startup path against eager heavy imports.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).parent.parent / "src"
+
+
+def _modules_after(statement: str) -> set:
+    code = f"import sys; {statement}; print('\\n'.join(sys.modules))"
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=str(SRC),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(out.split())
+
+
+def test_cli_import_defers_agent_stack():
+    loaded = _modules_after("import nova.cli")
+    for heavy in (
+        "openai",
+        "anthropic",
+        "rich.console",
+        "nova.runner",
+        "nova.tools.git",
+    ):
+        assert heavy not in loaded, heavy
+
+
+def test_llm_client_import_defers_provider_sdks():
+    loaded = _modules_after("import nova.agent.llm_client")
+    assert "openai" not in loaded
+    assert "anthropic" not in loaded
@@ -0,0 +1,172 @@
+"""
+Tests for the JSONL telemetry logger.
+"""
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.config import NovaSettings
+from nova.telemetry.logger import JSONLLogger, _TraceWriter
+
+
+@pytest.fixture
+def telemetry(tmp_path):
+    settings = NovaSettings(telemetry_dir=str(tmp_path), openai_api_key="sk-test-123")
+    logger = JSONLLogger(settings)
+    logger.start_run(tmp_path)
+    yield logger
+    logger.close()
+
+
+def _read_trace(logger):
+    with open(logger.run_dir / "trace.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_events_written_in_order_after_flush(telemetry):
+    for i in range(1000):
+        telemetry.log_event("tick", {"i": i})
+    telemetry.flush()
+    records = _read_trace(telemetry)
+    assert records[0]["event"] == "start"
+    assert [r["data"]["i"] for r in records[1:]] == list(range(1000))
+
+
+def test_end_run_closes_and_later_events_reopen(telemetry):
+    telemetry.end_run(True, {"note": "done"})
+    telemetry.log_event("late", {})
+    telemetry.close()
+    events = [r["event"] for r in _read_trace(telemetry)]
+    assert events == ["start", "end", "late"]
+
+
+def test_secrets_redacted(telemetry):
+    telemetry.log_event("llm", {"headers": ["Bearer sk-test-123"]})
+    telemetry.flush()
+    assert _read_trace(telemetry)[-1]["data"]["headers"] == ["Bearer [REDACTED]"]
+
+
+def test_encoded_secret_forms_redacted():
+    import base64
+    from urllib.parse import quote
+
+    from nova.telemetry.logger import SecretRedactor
+
+    secret = "sk-ant-api03-AbC/dEf+ghIJ"
+    redactor = SecretRedactor([secret, None])
+    for prefix in ("", "u", "us", "user:"):
+        blob = base64.b64encode(f"{prefix}{secret}!".encode()).decode()
+        assert "[REDACTED]" in redactor.redact(f"Authorization: Basic {blob}")
+    assert redactor.redact({"url": [f"?key={quote(secret, safe='')}"]}) == {
+        "url": ["?key=[REDACTED]"]
+    }
+    # Overlapping secrets: the longest match wins, in one pass.
+    assert SecretRedactor(["abc", "abcdef"]).redact("abcdefabc") == (
+        "[REDACTED][REDACTED]"
+    )
+
+
+def test_spans_nest_and_export_otlp(telemetry):
+    from nova.telemetry.tracing import export_otlp, span, traced
+
+    @traced("inner")
+    def inner():
+        return 42
+
+    with span("outer", iteration=1) as outer:
+        assert inner() == 42
+        outer.set("done", True)
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("boom")
+    telemetry.flush()
+
+    spans = {
+        r["data"]["name"]: r["data"]
+        for r in _read_trace(telemetry)
+        if r["event"] == "span"
+    }
+    assert spans["inner"]["parent_id"] == spans["outer"]["span_id"]
+    assert spans["outer"]["parent_id"] is None
+    assert spans["outer"]["trace_id"] == telemetry.trace_id
+    assert spans["outer"]["attrs"] == {"iteration": 1, "done": True}
+    assert spans["failing"]["status"] == "error"
+
+    out = export_otlp(telemetry.run_dir / "trace.jsonl")
+    otlp = json.loads(out.read_text())["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert {s["name"] for s in otlp} == {"inner", "outer", "failing"}
+
+
+def test_payload_snapshotted_and_bad_records_dropped(telemetry):
+    class Unprintable:
+        def __str__(self):
+            raise RuntimeError("no str")
+
+    payload = {"items": [1]}
+    telemetry.log_event("snapshot", payload)
+    payload["items"].append(2)
+    telemetry.log_event("bad", {"value": Unprintable()})
+    telemetry.log_event("after", {})
+    telemetry.flush()
+
+    events = {r["event"]: r for r in _read_trace(telemetry)}
+    assert events["snapshot"]["data"] == {"items": [1]}
+    assert "bad" not in events and "after" in events
+    assert telemetry._writer.dropped == 1
+
+
+def test_write_errors_do_not_stall_flush(telemetry):
+    telemetry.log_event("first", {})
+    telemetry.flush()
+    writer = telemetry._writer
+    writer._file.close()
+    telemetry.log_event("lost", {})
+    telemetry.flush()  # would block forever if the writer thread had died
+    assert writer.is_alive()
+    assert writer.dropped == 1
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    release = threading.Event()
+    writer = _TraceWriter(tmp_path / "trace.jsonl", max_queue=2)
+    # Hold the writer thread on its first batch, as a stalled disk would
+    writer._redact = lambda line: release.wait() and line
+    started = time.monotonic()
+    for i in range(20):
+        writer.put({"i": i})
+    assert time.monotonic() - started < 0.5
+    release.set()
+    writer.close()
+
+    lines = [json.loads(line) for line in writer.path.read_text().splitlines()]
+    written = [r for r in lines if "i" in r]
+    assert writer.dropped > 0
+    assert len(written) + writer.dropped == 20
+    assert lines[-1]["event"] == "trace_dropped"
+    assert lines[-1]["count"] == writer.dropped
+
+
+def test_drops_from_many_threads_are_all_counted(tmp_path):
+    writer = _TraceWriter(tmp_path / "trace.jsonl")
+    bad = {"value": object()}
+    bad["self"] = bad  # circular: json.dumps raises on the caller
+
+    def spam():
+        for _ in range(2000):
+            writer.put(bad)
+
+    threads = [threading.Thread(target=spam) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert writer.dropped == 16000
+    writer.close()
@@ -0,0 +1,61 @@
+"""
+Tests for the telemetry trace analyzer behind `nova trace`.
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.config import NovaSettings
+from nova.telemetry.analyze import TraceReport, iter_trace_files, summarize_run
+from nova.telemetry.logger import JSONLLogger
+
+
+def _fake_run(settings, iterations, llm_ms, test_seconds):
+    telemetry = JSONLLogger(settings)
+    telemetry.start_run("/repo")
+    telemetry.log_event("test_discovery", {"failing_tests": [{"name": "t"}] * 100})
+    for _ in range(iterations):
+        telemetry.log_span(
+            {
+                "name": "llm_call",
+                "duration_ms": llm_ms,
+                "attrs": {
+                    "model": "gpt-4o",
+                    "prompt_tokens": 1000,
+                    "completion_tokens": 100,
+                },
+            }
+        )
+        telemetry.log_span({"name": "test_run", "duration_ms": 200.0, "attrs": {}})
+    telemetry.save_test_report(
+        1,
+        '<testsuite><testcase classname="tests.test_x" name="test_slow" '
+        f'time="{test_seconds}"/></testsuite>',
+    )
+    telemetry.log_event("completion", {"status": "success", "iterations": iterations})
+    telemetry.end_run(True)
+
+
+def test_report_aggregates_runs(tmp_path):
+    settings = NovaSettings(telemetry_dir=str(tmp_path))
+    _fake_run(settings, 1, 1000.0, 0.5)
+    _fake_run(settings, 3, 3000.0, 2.5)
+
+    report = TraceReport(top_tests=1)
+    for trace in iter_trace_files([tmp_path]):
+        report.add(summarize_run(trace))
+    data = report.to_dict()
+
+    assert data["runs"] == 2
+    assert data["iterations_to_success"]["mean"] == 2
+    assert data["phases"]["llm_call"]["count"] == 4
+    assert data["phases"]["llm_call"]["max_ms"] == 3000.0
+    assert data["llm_seconds"] == 10.0
+    assert data["test_seconds"] == 0.8
+    assert data["prompt_tokens"] == 4000
+    # gpt-4o list price: $2.50 / 1M input, $10 / 1M output
+    assert abs(data["cost_usd"] - (4000 * 2.5 + 400 * 10.0) / 1e6) < 1e-9
+    assert [t["seconds"] for t in data["slowest_tests"]] == [2.5]
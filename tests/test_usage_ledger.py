@@ -0,0 +1,72 @@
+"""
+Tests for the SQLite LLM usage ledger.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from nova.telemetry.pricing import estimate_cost
+from nova.telemetry.usage import UsageLedger
+
+
+def test_record_updates_daily_rollup(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.db")
+    cost = ledger.record("openai", "gpt-4o", 1000, 200, latency_ms=12.5, repo="a")
+    ledger.record("openai", "gpt-4o", 500, 100, repo="b")
+    ledger.record("anthropic", "claude-3-opus", 0, 0, repo="a", status="error")
+
+    assert cost == estimate_cost("gpt-4o", 1000, 200)
+    today = ledger.today()
+    assert today["calls"] == 3
+    assert today["prompt_tokens"] == 1500
+    assert today["completion_tokens"] == 300
+    assert ledger.today(repo="a")["calls"] == 2
+    models = {row["model"]: row for row in ledger.by_model()}
+    assert models["gpt-4o"]["calls"] == 2
+
+
+def test_ledger_shared_between_connections(tmp_path):
+    path = tmp_path / "usage.db"
+    first, second = UsageLedger(path), UsageLedger(path)
+    for _ in range(5):
+        first.record("openai", "gpt-4o", 10, 1)
+        second.record("openai", "gpt-4o", 10, 1)
+    assert first.today()["calls"] == 10
+
+
+def test_compact_keeps_daily_totals(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.db", retain_days=7)
+    old = time.time() - 30 * 86400
+    ledger.record("openai", "gpt-4o", 10, 1, ts=old)
+    ledger.record("openai", "gpt-4o", 10, 1)
+
+    assert ledger.compact() == 1
+    assert ledger.by_model()[0]["calls"] == 2
+
+
+def test_compaction_runs_once_a_day_on_open(tmp_path):
+    path = tmp_path / "usage.db"
+    ledger = UsageLedger(path, retain_days=7)
+    ledger.record("openai", "gpt-4o", 10, 1, ts=time.time() - 30 * 86400)
+
+    # Opening the ledger compacted it already today; reopening leaves the row
+    UsageLedger(path, retain_days=7)
+    assert ledger._conn().execute("SELECT COUNT(*) FROM calls").fetchone()[0] == 1
+
+    assert ledger.compact_if_due(now=time.time() + 86400) == 1
+    assert ledger.by_model()[0]["calls"] == 1
+
+
+def test_legacy_usage_json_imported_once(tmp_path):
+    legacy = tmp_path / "usage.json"
+    legacy.write_text(json.dumps({"2024-01-02": {"calls": 7}}))
+
+    ledger = UsageLedger(tmp_path / "usage.db")
+    assert ledger.day_totals("2024-01-02")["calls"] == 7
+    assert not legacy.exists()
+    UsageLedger(tmp_path / "usage.db")
+    assert ledger.day_totals("2024-01-02")["calls"] == 7